@@ -0,0 +1,17 @@
+from fastapi import HTTPException, Request, status
+from api.ocr.providers import create_async_provider
+from api.v1.schemas.base import AsyncOCRProvider
+
+
+def get_ocr_provider(request: Request) -> AsyncOCRProvider:
+    """
+    Async OCR provider (see OCR_PROVIDER) bound to the application's shared
+    HTTP client.
+    """
+    try:
+        return create_async_provider(request.app.state.http_client)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
@@ -0,0 +1,271 @@
+from api.ocr.webhooks import job_waiters, parse_callback
+from api.v1.schemas.base import (
+    AsyncOCRProvider,
+    OCRCapabilities,
+    OCRDocument,
+    OCRJob,
+    OCRProvider,
+    OCRRequest,
+    OCRResult,
+    OCRStatus,
+    _HandwritingOCRBase,
+)
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+import asyncio, json, os, random, threading, time, uuid
+
+
+# Defaults for the fake provider and the standalone stand-in server
+FAKE_OCR_QUEUE_LATENCY_SECONDS = float(os.getenv("FAKE_OCR_QUEUE_LATENCY_SECONDS", "2.0"))
+FAKE_OCR_CALL_LATENCY_SECONDS = float(os.getenv("FAKE_OCR_CALL_LATENCY_SECONDS", "0.05"))
+# Share of jobs that end with status "failed"
+FAKE_OCR_FAILURE_RATE = float(os.getenv("FAKE_OCR_FAILURE_RATE", "0"))
+# Share of calls answered with 503 Service Unavailable, and its Retry-After
+FAKE_OCR_ERROR_RATE = float(os.getenv("FAKE_OCR_ERROR_RATE", "0"))
+FAKE_OCR_RETRY_AFTER_SECONDS = 1
+FAKE_OCR_PAGES = int(os.getenv("FAKE_OCR_PAGES", "1"))
+FAKE_OCR_CHARS_PER_PAGE = int(os.getenv("FAKE_OCR_CHARS_PER_PAGE", "1500"))
+FAKE_OCR_MAX_JOBS = 10_000
+# Complete in-process webhook waiters (api.ocr.webhooks) when a job that
+# asked for a callback finishes, as the real service's POST would
+FAKE_OCR_WEBHOOKS = os.getenv("FAKE_OCR_WEBHOOKS", "false").lower() in ("1", "true", "yes")
+
+_WORDS = (
+    "the quick brown fox jumps over lazy dog dear sir thank you for your "
+    "letter of march we received the parcel today and all is well"
+).split()
+
+
+class FakeOCRBackend:
+    """
+    In-memory stand-in for the HandwritingOCR v3 documents API.
+
+    Returns (HTTP status, JSON payload) pairs in the shapes the real API
+    uses, so the providers' response parsing runs unchanged. A job is
+    "processing" until its queue latency (jittered ±50%) has elapsed, then
+    "processed" or, at `failure_rate`, "failed". Any call fails with 503 at
+    `error_rate`. Jobs are kept until FAKE_OCR_MAX_JOBS newer ones arrive.
+    """
+
+    def __init__(
+        self, *,
+        queue_latency: float = FAKE_OCR_QUEUE_LATENCY_SECONDS,
+        failure_rate: float = FAKE_OCR_FAILURE_RATE,
+        error_rate: float = FAKE_OCR_ERROR_RATE,
+        pages: int = FAKE_OCR_PAGES,
+        chars_per_page: int = FAKE_OCR_CHARS_PER_PAGE,
+        seed: Optional[int] = None,
+    ):
+        if queue_latency < 0:
+            raise ValueError("queue_latency must be >= 0")
+        if not 0 <= failure_rate <= 1 or not 0 <= error_rate <= 1:
+            raise ValueError("failure_rate and error_rate must be within [0, 1]")
+        if pages < 1 or chars_per_page < 0:
+            raise ValueError("pages must be >= 1 and chars_per_page >= 0")
+
+        self.queue_latency = queue_latency
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.pages = pages
+        self.chars_per_page = chars_per_page
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._transcript = self._text(chars_per_page)
+
+    def _text(self, length: int) -> str:
+        words, size = [], 0
+        while size < length:
+            word = self._rng.choice(_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        return " ".join(words)[:length]
+
+    def _unavailable(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return 503, {"error": "Service temporarily unavailable"}
+        return None
+
+    def submit(self, filename: str, size: int, action: str = "transcribe") -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            error = self._unavailable()
+            if error:
+                return error
+
+            document_id = uuid.uuid4().hex
+            self._jobs[document_id] = {
+                "filename": filename,
+                "size": size,
+                "action": action,
+                "ready_at": time.monotonic() + self.queue_latency * self._rng.uniform(0.5, 1.5),
+                "failed": self._rng.random() < self.failure_rate,
+            }
+            while len(self._jobs) > FAKE_OCR_MAX_JOBS:
+                self._jobs.popitem(last=False)
+
+        return 201, {"id": document_id, "status": "queued"}
+
+    def status_of(self, document_id: str) -> Tuple[Optional[str], float]:
+        """
+        (terminal status or None, seconds until it is reached) for a job.
+        """
+        job = self._jobs.get(document_id)
+        if job is None:
+            return None, 0.0
+        return ("failed" if job["failed"] else "processed"), max(0.0, job["ready_at"] - time.monotonic())
+
+    def document(self, document_id: str) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            error = self._unavailable()
+            if error:
+                return error
+
+            job = self._jobs.get(document_id)
+
+        if job is None:
+            return 404, {"error": "Document not found"}
+
+        if time.monotonic() < job["ready_at"]:
+            return 200, {"id": document_id, "status": "processing"}
+
+        if job["failed"]:
+            return 200, {"id": document_id, "status": "failed"}
+
+        return 200, {
+            "id": document_id,
+            "status": "processed",
+            "action": job["action"],
+            "original_file_name": job["filename"],
+            "page_count": self.pages,
+            "results": [
+                {"page_number": page, "transcript": self._transcript}
+                for page in range(1, self.pages + 1)
+            ],
+        }
+
+
+class _FakeResponse:
+    """
+    The parts of a requests/httpx response the providers' parsers use.
+    """
+
+    def __init__(self, status_code: int, payload: Dict[str, Any]):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = (
+            {"Retry-After": str(FAKE_OCR_RETRY_AFTER_SECONDS)} if status_code == 503 else {}
+        )
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._payload)
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+
+class _FakeOCRBase(_HandwritingOCRBase):
+    """
+    HandwritingOCR request validation and response parsing on top of a
+    FakeOCRBackend instead of the network.
+    """
+
+    def __init__(
+        self, backend: Optional[FakeOCRBackend] = None,
+        call_latency: float = FAKE_OCR_CALL_LATENCY_SECONDS, name: str = "fake",
+        webhooks: bool = FAKE_OCR_WEBHOOKS
+    ):
+        super().__init__(api_key="fake", name=name)
+        self.backend = backend or fake_backend
+        self.call_latency = call_latency
+        self.webhooks = webhooks
+
+    @property
+    def capabilities(self) -> OCRCapabilities:
+        # Callbacks are delivered in-process, straight to the job waiters
+        return OCRCapabilities(
+            supports_handwriting=True,
+            supports_tables=True,
+            supports_extractors=True,
+            supports_webhooks=self.webhooks,
+            supports_async=True,
+        )
+
+    def _call_back(self, document_id: str) -> None:
+        """
+        Once the job is terminal, hand its callback payload to the waiters
+        the same way the webhook route does.
+        """
+        terminal, delay = self.backend.status_of(document_id)
+        if terminal is None:
+            return
+
+        def deliver() -> None:
+            payload = {"id": document_id, "status": terminal}
+            provider_job_id, status = parse_callback(payload)
+            job_waiters.complete(provider_job_id, status, payload)
+
+        timer = threading.Timer(delay, deliver)
+        timer.daemon = True
+        timer.start()
+
+    def _submit(self, document: OCRDocument, request: OCRRequest) -> OCRJob:
+        data = self._submit_data(document, request)
+        size = len(document.data) if document.data is not None else os.path.getsize(document.path)
+        job = self._parse_submit(
+            _FakeResponse(*self.backend.submit(document.filename, size, data["action"]))
+        )
+
+        if self.webhooks and request.webhook_url:
+            self._call_back(job.provider_job_id)
+        return job
+
+    def _status(self, job: OCRJob) -> OCRStatus:
+        return self._parse_status(job, _FakeResponse(*self.backend.document(job.provider_job_id)))
+
+    def _result(self, job: OCRJob) -> OCRResult:
+        response = self._final_response(job)
+        if response is None:
+            response = _FakeResponse(*self.backend.document(job.provider_job_id))
+        return self._parse_result(job, response)
+
+
+class FakeOCRProvider(_FakeOCRBase, OCRProvider):
+    """
+    Offline OCRProvider for load and latency testing.
+    """
+
+    def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        time.sleep(self.call_latency)
+        return self._submit(OCRDocument.coerce(document), request)
+
+    def get_status(self, job: OCRJob) -> OCRStatus:
+        time.sleep(self.call_latency)
+        return self._status(job)
+
+    def fetch_result(self, job: OCRJob) -> OCRResult:
+        time.sleep(self.call_latency)
+        return self._result(job)
+
+
+class AsyncFakeOCRProvider(_FakeOCRBase, AsyncOCRProvider):
+    """
+    Async counterpart of FakeOCRProvider.
+    """
+
+    async def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        await asyncio.sleep(self.call_latency)
+        return self._submit(OCRDocument.coerce(document), request)
+
+    async def get_status(self, job: OCRJob) -> OCRStatus:
+        await asyncio.sleep(self.call_latency)
+        return self._status(job)
+
+    async def fetch_result(self, job: OCRJob) -> OCRResult:
+        await asyncio.sleep(self.call_latency)
+        return self._result(job)
+
+
+# Shared by all fake providers in the process, like the real service
+fake_backend = FakeOCRBackend()
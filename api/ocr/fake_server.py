@@ -0,0 +1,119 @@
+"""
+Standalone HTTP stand-in for the HandwritingOCR v3 documents API.
+
+Serves the same submit / status / result shapes as the real service from a
+FakeOCRBackend, so the real HTTP providers can be load tested offline:
+
+    python -m api.ocr.fake_server --port 7010 --queue-latency 3 --failure-rate 0.02
+    HANDWRITING_OCR_API_URL=http://localhost:7010/api/v3/documents \
+        HANDWRITING_OCR_API_KEY=anything uvicorn main:app
+
+When a submit carries a webhook_url, the job's terminal status is POSTed
+there once it is reached, as the real service does, signed with
+OCR_WEBHOOK_SECRET.
+"""
+
+from api.ocr.fake import (
+    FAKE_OCR_CALL_LATENCY_SECONDS,
+    FAKE_OCR_CHARS_PER_PAGE,
+    FAKE_OCR_ERROR_RATE,
+    FAKE_OCR_FAILURE_RATE,
+    FAKE_OCR_PAGES,
+    FAKE_OCR_QUEUE_LATENCY_SECONDS,
+    FAKE_OCR_RETRY_AFTER_SECONDS,
+    FakeOCRBackend,
+)
+from api.ocr.webhooks import OCR_WEBHOOK_SECRET, OCR_WEBHOOK_SIGNATURE_HEADER, sign_callback
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from typing import Optional, Set
+import argparse, asyncio, httpx, json, uvicorn
+
+
+def create_app(
+    backend: Optional[FakeOCRBackend] = None,
+    call_latency: float = FAKE_OCR_CALL_LATENCY_SECONDS,
+    webhook_secret: Optional[str] = OCR_WEBHOOK_SECRET
+) -> FastAPI:
+    app = FastAPI(title="Fake HandwritingOCR v3")
+    app.state.backend = backend or FakeOCRBackend()
+    callbacks: Set[asyncio.Task] = set()
+
+    def authorize(authorization: Optional[str]) -> None:
+        # Any bearer token is accepted; only its presence is checked
+        if not authorization or not authorization.startswith("Bearer "):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthenticated")
+
+    def reply(code: int, payload: dict) -> JSONResponse:
+        headers = {"Retry-After": str(FAKE_OCR_RETRY_AFTER_SECONDS)} if code == 503 else None
+        return JSONResponse(payload, status_code=code, headers=headers)
+
+    async def callback(document_id: str, url: str) -> None:
+        terminal, delay = app.state.backend.status_of(document_id)
+        await asyncio.sleep(delay)
+        body = json.dumps({"id": document_id, "status": terminal}).encode()
+        headers = {"Content-Type": "application/json"}
+        if webhook_secret:
+            headers[OCR_WEBHOOK_SIGNATURE_HEADER] = sign_callback(body, webhook_secret)
+        async with httpx.AsyncClient() as client:
+            try:
+                await client.post(url, content=body, headers=headers, timeout=10)
+            except httpx.HTTPError:
+                pass
+
+    @app.post("/api/v3/documents")
+    async def submit(
+        file: UploadFile = File(...),
+        action: str = Form(...),
+        webhook_url: Optional[str] = Form(None),
+        authorization: Optional[str] = Header(None),
+    ):
+        authorize(authorization)
+        await asyncio.sleep(call_latency)
+
+        data = await file.read()
+        code, payload = app.state.backend.submit(file.filename, len(data), action)
+
+        if code == 201 and webhook_url:
+            task = asyncio.create_task(callback(payload["id"], webhook_url))
+            callbacks.add(task)
+            task.add_done_callback(callbacks.discard)
+
+        return reply(code, payload)
+
+    @app.get("/api/v3/documents/{document_id}")
+    async def document(document_id: str, authorization: Optional[str] = Header(None)):
+        authorize(authorization)
+        await asyncio.sleep(call_latency)
+        code, payload = app.state.backend.document(document_id)
+        return reply(code, payload)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake HandwritingOCR v3 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7010)
+    parser.add_argument("--queue-latency", type=float, default=FAKE_OCR_QUEUE_LATENCY_SECONDS)
+    parser.add_argument("--call-latency", type=float, default=FAKE_OCR_CALL_LATENCY_SECONDS)
+    parser.add_argument("--failure-rate", type=float, default=FAKE_OCR_FAILURE_RATE)
+    parser.add_argument("--error-rate", type=float, default=FAKE_OCR_ERROR_RATE)
+    parser.add_argument("--pages", type=int, default=FAKE_OCR_PAGES)
+    parser.add_argument("--chars-per-page", type=int, default=FAKE_OCR_CHARS_PER_PAGE)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    backend = FakeOCRBackend(
+        queue_latency=args.queue_latency,
+        failure_rate=args.failure_rate,
+        error_rate=args.error_rate,
+        pages=args.pages,
+        chars_per_page=args.chars_per_page,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(backend, args.call_latency), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
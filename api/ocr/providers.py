@@ -0,0 +1,85 @@
+from api.ocr.fake import AsyncFakeOCRProvider, FakeOCRProvider
+from api.ocr.registry import AsyncRoutedOCRProvider, RoutedOCRProvider
+from api.v1.schemas.base import (
+    AsyncHandwritingOCRProvider,
+    AsyncOCRProvider,
+    HandwritingOCRProvider,
+    OCRProvider,
+)
+from typing import List, Optional, Tuple
+import httpx, os, re
+
+
+# "handwritingocr", or "fake" for the offline provider in api.ocr.fake. A
+# comma-separated list routes each job between them (see api.ocr.registry).
+# Entries of the form "kind:instance" name distinct instances of one kind,
+# e.g. "handwritingocr:primary,handwritingocr:backup", each configured by
+# HANDWRITING_OCR_API_URL_<INSTANCE> and HANDWRITING_OCR_API_KEY_<INSTANCE>
+# (falling back to the unsuffixed settings). The fake is only ever routed
+# with other fakes.
+OCR_PROVIDER = os.getenv("OCR_PROVIDER", "handwritingocr")
+OCR_PROVIDERS = ("handwritingocr", "fake")
+
+
+def _provider_specs(names: str | None) -> List[Tuple[str, str]]:
+    """
+    (kind, name) of each configured provider, in order; a provider's name
+    is its entry, e.g. "handwritingocr:backup".
+    """
+    # dict.fromkeys drops repeats but keeps the configured order
+    names = list(dict.fromkeys(n.strip() for n in (names or OCR_PROVIDER).split(",") if n.strip()))
+    specs = [(name.partition(":")[0], name) for name in names]
+
+    unknown = [name for kind, name in specs if kind not in OCR_PROVIDERS]
+    if not specs or unknown:
+        raise RuntimeError(
+            f"Unknown OCR provider '{','.join(unknown)}', expected one of {OCR_PROVIDERS}"
+        )
+    # Routed jobs and failovers would silently get the fake's canned text
+    if len({kind == "fake" for kind, _ in specs}) > 1:
+        raise RuntimeError("The offline 'fake' OCR provider cannot be routed with real providers")
+    return specs
+
+
+def _instance_setting(setting: str, name: str) -> Optional[str]:
+    # "handwritingocr:backup" reads e.g. HANDWRITING_OCR_API_KEY_BACKUP first
+    instance = name.partition(":")[2]
+    if instance:
+        value = os.getenv(f"{setting}_{re.sub(r'[^0-9A-Za-z]', '_', instance).upper()}")
+        if value:
+            return value
+    return os.getenv(setting)
+
+
+def create_provider(name: str | None = None) -> OCRProvider:
+    """
+    Sync provider selected by `name`, defaulting to OCR_PROVIDER; a router
+    over all of them when several are named.
+    """
+    providers = [
+        FakeOCRProvider(name=name) if kind == "fake" else HandwritingOCRProvider(
+            api_key=_instance_setting("HANDWRITING_OCR_API_KEY", name),
+            api_url=_instance_setting("HANDWRITING_OCR_API_URL", name),
+            name=name,
+        )
+        for kind, name in _provider_specs(name)
+    ]
+    return providers[0] if len(providers) == 1 else RoutedOCRProvider(providers)
+
+
+def create_async_provider(client: httpx.AsyncClient, name: str | None = None) -> AsyncOCRProvider:
+    """
+    Async provider selected by `name`, defaulting to OCR_PROVIDER; a router
+    over all of them when several are named. Network providers share
+    `client`.
+    """
+    providers = [
+        AsyncFakeOCRProvider(name=name) if kind == "fake" else AsyncHandwritingOCRProvider(
+            client,
+            api_key=_instance_setting("HANDWRITING_OCR_API_KEY", name),
+            api_url=_instance_setting("HANDWRITING_OCR_API_URL", name),
+            name=name,
+        )
+        for kind, name in _provider_specs(name)
+    ]
+    return providers[0] if len(providers) == 1 else AsyncRoutedOCRProvider(providers)
@@ -0,0 +1,432 @@
+from api.utils.metrics import (
+    PROVIDER_CIRCUIT_STATE,
+    PROVIDER_ERROR_RATE,
+    PROVIDER_FAILOVERS,
+    PROVIDER_LATENCY,
+    PROVIDER_ROUTED,
+)
+from api.v1.schemas.base import (
+    AsyncOCRProvider,
+    OCRAction,
+    OCRCapabilities,
+    OCRDocument,
+    OCRJob,
+    OCRProvider,
+    OCRRequest,
+    OCRRequestError,
+    OCRResult,
+    OCRStatus,
+    check_submit_request,
+)
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar, Union
+import os, random, threading, time
+
+
+# Consecutive failed calls that open a provider's circuit breaker
+OCR_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("OCR_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# How long an open circuit refuses new jobs before a trial job is let through
+OCR_CIRCUIT_OPEN_SECONDS = float(os.getenv("OCR_CIRCUIT_OPEN_SECONDS", "30"))
+
+# Weight of the newest call in the moving latency and error-rate averages
+ROUTING_EWMA_ALPHA = 0.2
+# Share weight never drops below this fraction, so a provider that is
+# erroring but not yet cut off still sees enough traffic to recover
+ROUTING_MIN_SUCCESS_WEIGHT = 0.02
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+P = TypeVar("P", OCRProvider, AsyncOCRProvider)
+
+
+def _ewma(average: Optional[float], value: float) -> float:
+    if average is None:
+        return value
+    return (1 - ROUTING_EWMA_ALPHA) * average + ROUTING_EWMA_ALPHA * value
+
+
+def supports(capabilities: OCRCapabilities, request: OCRRequest) -> bool:
+    """
+    Whether a provider with `capabilities` can serve `request`.
+    """
+    if request.action == OCRAction.TABLES:
+        return capabilities.supports_tables
+    if request.action == OCRAction.EXTRACT:
+        return capabilities.supports_extractors
+    return capabilities.supports_handwriting
+
+
+class ProviderHealth:
+    """
+    Observed latency and error rate of one provider, plus its circuit
+    breaker.
+
+    Submission latency, which covers the upload, is tracked apart from
+    that of status and result calls, which carry none; only the former
+    steers routing. The breaker opens after `failure_threshold` consecutive failed calls
+    and refuses new jobs for `open_seconds`. Then it is half-open: one
+    trial job is let through, whose success closes the circuit and whose
+    failure opens it again. Calls for jobs already on the provider are
+    never refused, and their outcomes count too.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = OCR_CIRCUIT_FAILURE_THRESHOLD,
+        open_seconds: float = OCR_CIRCUIT_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be >= 1")
+        if open_seconds < 0:
+            raise ValueError("open_seconds must be >= 0")
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._clock = clock
+
+        self.submit_latency: Optional[float] = None
+        self.poll_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self._opened_at = 0.0
+        # When the half-open trial was handed out; it expires like the open
+        # period, in case its caller never reports back
+        self._trial_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        PROVIDER_CIRCUIT_STATE.labels(provider=name).set(_STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        PROVIDER_CIRCUIT_STATE.labels(provider=self.name).set(_STATE_VALUES[state])
+
+    def acquire(self) -> bool:
+        """
+        Whether a new job may be sent to the provider now. In the half-open
+        state this claims the single trial.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._set_state(HALF_OPEN)
+                self._trial_at = None
+
+            if self.state == CLOSED:
+                return True
+
+            if self.state == HALF_OPEN and (
+                self._trial_at is None or now - self._trial_at >= self.open_seconds
+            ):
+                self._trial_at = now
+                return True
+
+            return False
+
+    def release(self) -> None:
+        """
+        Give back a trial that ended without telling anything about the
+        provider.
+        """
+        with self._lock:
+            self._trial_at = None
+
+    def record(self, seconds: float, ok: bool, call: str = "submit") -> None:
+        """
+        Outcome of one `call` ("submit", or "status"/"result" for a job
+        already on the provider) that took `seconds`.
+        """
+        with self._lock:
+            if call == "submit":
+                latency = self.submit_latency = _ewma(self.submit_latency, seconds)
+            else:
+                latency = self.poll_latency = _ewma(self.poll_latency, seconds)
+            self.error_rate = _ewma(self.error_rate, 0.0 if ok else 1.0)
+
+            if ok:
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    self._set_state(CLOSED)
+            else:
+                self.consecutive_failures += 1
+                if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                    self._opened_at = self._clock()
+                    self._set_state(OPEN)
+
+            self._trial_at = None
+
+        PROVIDER_LATENCY.labels(provider=self.name, call="submit" if call == "submit" else "poll").set(latency)
+        PROVIDER_ERROR_RATE.labels(provider=self.name).set(self.error_rate)
+
+    def weight(self, default_latency: float) -> float:
+        """
+        Share of new jobs relative to other providers: expected successes
+        per second of submission latency.
+        """
+        latency = self.submit_latency if self.submit_latency is not None else default_latency
+        return max(1 - self.error_rate, ROUTING_MIN_SUCCESS_WEIGHT) / max(latency, 1e-3)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "submit_latency_seconds": self.submit_latency,
+                "poll_latency_seconds": self.poll_latency,
+                "error_rate": round(self.error_rate, 4),
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+class ProviderRegistry:
+    """
+    Process-wide health of the OCR providers, and the routing decisions
+    made from it.
+
+    Providers are keyed by name, so the health observed through routers
+    built for different requests accumulates in one place.
+    """
+
+    def __init__(
+        self, failure_threshold: int = OCR_CIRCUIT_FAILURE_THRESHOLD,
+        open_seconds: float = OCR_CIRCUIT_OPEN_SECONDS, seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._rng = random.Random(seed)
+        self._health: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def health(self, name: str) -> ProviderHealth:
+        with self._lock:
+            health = self._health.get(name)
+            if health is None:
+                health = ProviderHealth(name, self.failure_threshold, self.open_seconds, self._clock)
+                self._health[name] = health
+            return health
+
+    def candidates(self, providers: Iterable[P], request: OCRRequest) -> List[P]:
+        """
+        Providers that can serve `request`, in the order to try them.
+
+        The order is a weighted draw without replacement (see
+        ProviderHealth.weight), so new jobs are spread over the providers in
+        proportion to their observed throughput, and the rest of the list
+        is the failover order. Providers not yet observed are assumed to be
+        as fast as the average of the others.
+        """
+        capable = [p for p in providers if supports(p.capabilities, request)]
+        if not capable:
+            raise RuntimeError(f"No OCR provider supports action '{request.action.value}'")
+
+        health = {p.name: self.health(p.name) for p in capable}
+        observed = [h.submit_latency for h in health.values() if h.submit_latency is not None]
+        default_latency = sum(observed) / len(observed) if observed else 1.0
+        weights = {name: h.weight(default_latency) for name, h in health.items()}
+
+        order = []
+        while capable:
+            with self._lock:
+                point = self._rng.random() * sum(weights[p.name] for p in capable)
+
+            chosen = capable[-1]
+            for provider in capable:
+                point -= weights[provider.name]
+                if point < 0:
+                    chosen = provider
+                    break
+
+            capable.remove(chosen)
+            order.append(chosen)
+
+        return order
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            health = sorted(self._health.items())
+        return {name: h.stats() for name, h in health}
+
+
+provider_registry = ProviderRegistry()
+
+
+class _RoutedBase:
+    """
+    Routing shared by the sync and async routed providers.
+
+    New jobs go to the first candidate (see ProviderRegistry.candidates)
+    whose circuit admits them; a submission that fails moves on to the
+    next. A job stays with the provider it was submitted to, found again
+    through OCRJob.provider, and every call's outcome feeds that
+    provider's health. A job that ends "failed" counts as a failure.
+    """
+
+    def __init__(self, providers: Sequence[P], registry: ProviderRegistry = provider_registry):
+        if not providers:
+            raise ValueError("At least one OCR provider is required")
+
+        self.providers: Dict[str, P] = {p.name: p for p in providers}
+        if len(self.providers) != len(providers):
+            raise ValueError("OCR provider names must be unique")
+
+        self.registry = registry
+
+    @property
+    def name(self) -> str:
+        return "routed"
+
+    @property
+    def capabilities(self) -> OCRCapabilities:
+        # Webhooks only if every job, wherever it lands, calls back
+        members = [p.capabilities for p in self.providers.values()]
+        return OCRCapabilities(
+            supports_handwriting=any(c.supports_handwriting for c in members),
+            supports_tables=any(c.supports_tables for c in members),
+            supports_extractors=any(c.supports_extractors for c in members),
+            supports_webhooks=all(c.supports_webhooks for c in members),
+            supports_async=all(c.supports_async for c in members),
+        )
+
+    def _provider(self, job: OCRJob) -> P:
+        provider = self.providers.get(job.provider)
+        if provider is None:
+            raise RuntimeError(f"OCR job {job.job_id} belongs to unknown provider '{job.provider}'")
+        return provider
+
+    def _admitted(self, document: OCRDocument, request: OCRRequest) -> Iterable[P]:
+        # Requests every provider would refuse are not retried elsewhere,
+        # and say nothing about the providers' health
+        check_submit_request(document, request)
+
+        for provider in self.registry.candidates(self.providers.values(), request):
+            if self.registry.health(provider.name).acquire():
+                yield provider
+
+    def _failed_over(self, provider: P, seconds: float, error: Exception, errors: List[str]) -> None:
+        self.registry.health(provider.name).record(seconds, ok=False)
+        PROVIDER_FAILOVERS.labels(provider=provider.name).inc()
+        errors.append(f"{provider.name}: {error}")
+
+    def _submitted(self, provider: P, seconds: float) -> None:
+        self.registry.health(provider.name).record(seconds, ok=True)
+        PROVIDER_ROUTED.labels(provider=provider.name).inc()
+
+    @staticmethod
+    def _unavailable(errors: List[str]) -> RuntimeError:
+        if not errors:
+            return RuntimeError("No OCR provider available: every circuit is open")
+        return RuntimeError("All OCR providers failed: " + "; ".join(errors))
+
+
+class RoutedOCRProvider(_RoutedBase, OCRProvider):
+    """
+    OCRProvider that routes jobs over several providers.
+    """
+
+    def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        errors: List[str] = []
+
+        document = OCRDocument.coerce(document)
+
+        for provider in self._admitted(document, request):
+            start = time.perf_counter()
+            try:
+                job = provider.submit(document, request)
+            except OCRRequestError:
+                # Provider-specific request validation
+                self.registry.health(provider.name).release()
+                raise
+            except Exception as e:
+                self._failed_over(provider, time.perf_counter() - start, e, errors)
+                continue
+
+            self._submitted(provider, time.perf_counter() - start)
+            return job
+
+        raise self._unavailable(errors)
+
+    def get_status(self, job: OCRJob) -> OCRStatus:
+        provider = self._provider(job)
+        health = self.registry.health(provider.name)
+
+        start = time.perf_counter()
+        try:
+            status = provider.get_status(job)
+        except Exception:
+            health.record(time.perf_counter() - start, ok=False, call="status")
+            raise
+
+        health.record(time.perf_counter() - start, ok=status != OCRStatus.FAILED, call="status")
+        return status
+
+    def fetch_result(self, job: OCRJob) -> OCRResult:
+        provider = self._provider(job)
+        health = self.registry.health(provider.name)
+
+        start = time.perf_counter()
+        try:
+            result = provider.fetch_result(job)
+        except Exception:
+            health.record(time.perf_counter() - start, ok=False, call="result")
+            raise
+
+        health.record(time.perf_counter() - start, ok=True, call="result")
+        return result
+
+
+class AsyncRoutedOCRProvider(_RoutedBase, AsyncOCRProvider):
+    """
+    Async counterpart of RoutedOCRProvider.
+    """
+
+    async def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        errors: List[str] = []
+
+        document = OCRDocument.coerce(document)
+
+        for provider in self._admitted(document, request):
+            start = time.perf_counter()
+            try:
+                job = await provider.submit(document, request)
+            except OCRRequestError:
+                # Provider-specific request validation
+                self.registry.health(provider.name).release()
+                raise
+            except Exception as e:
+                self._failed_over(provider, time.perf_counter() - start, e, errors)
+                continue
+
+            self._submitted(provider, time.perf_counter() - start)
+            return job
+
+        raise self._unavailable(errors)
+
+    async def get_status(self, job: OCRJob) -> OCRStatus:
+        provider = self._provider(job)
+        health = self.registry.health(provider.name)
+
+        start = time.perf_counter()
+        try:
+            status = await provider.get_status(job)
+        except Exception:
+            health.record(time.perf_counter() - start, ok=False, call="status")
+            raise
+
+        health.record(time.perf_counter() - start, ok=status != OCRStatus.FAILED, call="status")
+        return status
+
+    async def fetch_result(self, job: OCRJob) -> OCRResult:
+        provider = self._provider(job)
+        health = self.registry.health(provider.name)
+
+        start = time.perf_counter()
+        try:
+            result = await provider.fetch_result(job)
+        except Exception:
+            health.record(time.perf_counter() - start, ok=False, call="result")
+            raise
+
+        health.record(time.perf_counter() - start, ok=True, call="result")
+        return result
@@ -0,0 +1,126 @@
+from concurrent.futures import Future
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from api.v1.schemas.base import OCRStatus
+import hashlib, hmac, os, threading
+
+
+# Public base URL the provider can reach (e.g. https://scan.example.com).
+OCR_WEBHOOK_BASE_URL = os.getenv("OCR_WEBHOOK_BASE_URL")
+# Secret the provider signs callbacks with: HMAC-SHA256 of the raw body,
+# sent as "sha256=<hex>" in OCR_WEBHOOK_SIGNATURE_HEADER. Webhooks are only
+# requested, and the callback route only mounted, when both are set.
+OCR_WEBHOOK_SECRET = os.getenv("OCR_WEBHOOK_SECRET")
+OCR_WEBHOOK_SIGNATURE_HEADER = "X-Webhook-Signature"
+OCR_WEBHOOK_PATH = "/api/v1/webhooks/ocr"
+
+# Callbacks that arrive before the waiter registers (fast providers)
+EARLY_CALLBACK_LIMIT = 1024
+
+_CALLBACK_STATUSES = {
+    "processed": OCRStatus.PROCESSED,
+    "failed": OCRStatus.FAILED,
+}
+
+
+def webhooks_enabled() -> bool:
+    return bool(OCR_WEBHOOK_BASE_URL and OCR_WEBHOOK_SECRET)
+
+
+def webhook_url() -> Optional[str]:
+    """
+    Callback URL to hand to providers, or None when webhooks are disabled.
+    """
+    if not webhooks_enabled():
+        return None
+    return OCR_WEBHOOK_BASE_URL.rstrip("/") + OCR_WEBHOOK_PATH
+
+
+def sign_callback(body: bytes, secret: str) -> str:
+    """
+    Signature header value for a callback body.
+    """
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_callback(body: bytes, signature: Optional[str]) -> bool:
+    """
+    Whether a callback body carries a valid signature. Nothing verifies
+    while no secret is configured.
+    """
+    if not OCR_WEBHOOK_SECRET or not signature:
+        return False
+    return hmac.compare_digest(signature, sign_callback(body, OCR_WEBHOOK_SECRET))
+
+
+def parse_callback(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[OCRStatus]]:
+    """
+    Extract (provider job id, terminal status) from a provider callback.
+    Non-terminal callbacks yield a None status.
+    """
+    document = payload.get("document") if isinstance(payload.get("document"), dict) else payload
+    provider_job_id = document.get("id") or document.get("document_id")
+    status = _CALLBACK_STATUSES.get(str(document.get("status", "")).lower())
+    return provider_job_id, status
+
+
+class JobWaiterRegistry:
+    """
+    In-process registry of OCR jobs waiting for a provider callback.
+
+    Waiters are concurrent.futures.Future objects so both sync code
+    (future.result(timeout)) and async code (asyncio.wrap_future) can wait
+    on them. The registry is per process: a callback delivered to another
+    worker is simply not seen here, and the waiter's fallback polling
+    picks the job up instead.
+    """
+
+    def __init__(self, early_limit: int = EARLY_CALLBACK_LIMIT):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Future] = {}
+        self._early: "OrderedDict[str, Tuple[OCRStatus, Dict[str, Any]]]" = OrderedDict()
+        self._early_limit = early_limit
+
+    def register(self, provider_job_id: str) -> Future:
+        future: Future = Future()
+
+        with self._lock:
+            early = self._early.pop(provider_job_id, None)
+            if early is not None:
+                future.set_result(early)
+            else:
+                self._waiters[provider_job_id] = future
+
+        return future
+
+    def complete(
+        self, provider_job_id: str, status: OCRStatus,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Resolve the waiter for a job. Returns False if nobody is waiting yet,
+        in which case the callback is kept for a later register().
+        """
+        with self._lock:
+            future = self._waiters.pop(provider_job_id, None)
+            if future is None:
+                self._early[provider_job_id] = (status, payload or {})
+                while len(self._early) > self._early_limit:
+                    self._early.popitem(last=False)
+                return False
+
+        if not future.done():
+            future.set_result((status, payload or {}))
+        return True
+
+    def discard(self, provider_job_id: str) -> None:
+        with self._lock:
+            self._waiters.pop(provider_job_id, None)
+            self._early.pop(provider_job_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+
+job_waiters = JobWaiterRegistry()
@@ -1,51 +1,275 @@
-from typing import List
+from api.utils.metrics import PDF_PAGES, PDF_RENDER_SECONDS
+from typing import Iterator, List, Optional, Union
 import cv2, os, fitz
 import numpy as np
 
 
-def pdf_to_images(pdf_path: str, dpi: int = 300) -> List[np.ndarray]:
+# Decode single-image scanned pages from the embedded image instead of
+# rendering them
+PDF_EXTRACT_EMBEDDED_IMAGES = os.getenv("PDF_EXTRACT_EMBEDDED_IMAGES", "true").lower() in ("1", "true", "yes")
+
+# Share of the page area the image must cover to count as the whole page
+EMBEDDED_MIN_COVERAGE = 0.98
+
+# Text render mode 3 (neither fill nor stroke): the invisible OCR layer
+# scanners add on top of the page image
+_INVISIBLE_TEXT = 3
+
+
+def _render_page(page: "fitz.Page", matrix: "fitz.Matrix", grayscale: bool = False) -> np.ndarray:
+    with PDF_RENDER_SECONDS.time():
+        pix = page.get_pixmap(
+            matrix=matrix, colorspace=fitz.csGRAY if grayscale else fitz.csRGB, alpha=False
+        )
+
+    # Convert to NumPy
+    img = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    img = img.reshape(pix.height, pix.width, pix.n)
+
+    if pix.n == 1:
+        return img[:, :, 0].copy()
+
+    # Convert RGB → BGR for OpenCV
+    return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def page_matrix(page: "fitz.Page", dpi: int = 300, target_width: Optional[int] = None) -> "fitz.Matrix":
     """
-    Convert PDF pages to OpenCV-compatible images using PyMuPDF.
+    Render transform for a page: `dpi`, or when `target_width` is given,
+    whatever zoom makes the visible (cropped and rotated) page exactly that
+    many pixels wide.
+    """
+    # PyMuPDF uses 72 DPI as base
+    zoom = target_width / page.rect.width if target_width else dpi / 72.0
+    return fitz.Matrix(zoom, zoom)
+
+
+def _single_page_image(page: "fitz.Page") -> Optional[int]:
+    """
+    xref of the one image that makes up the page, or None if the page has
+    anything else on it that rendering would draw.
+    """
+    images = page.get_image_info(xrefs=True)
+    # Inline images have no xref and cannot be extracted on their own
+    if len(images) != 1 or not images[0]["xref"] or images[0]["has-mask"]:
+        return None
+
+    info = images[0]
+    # Upright and unflipped: the pixel grid maps straight onto the page
+    a, b, c, d, _, _ = info["transform"]
+    if b or c or a <= 0 or d <= 0:
+        return None
+
+    # Image geometry is reported before the page's /Rotate is applied
+    area = page.rect * page.derotation_matrix
+    bbox = fitz.Rect(info["bbox"]) & area
+    if bbox.get_area() < EMBEDDED_MIN_COVERAGE * area.get_area():
+        return None
+
+    if any(span["type"] != _INVISIBLE_TEXT for span in page.get_texttrace()):
+        return None
+    if page.get_drawings():
+        return None
+
+    return info["xref"]
+
+
+def _embedded_image(page: "fitz.Page", xref: int, grayscale: bool) -> Optional[np.ndarray]:
+    doc = page.parent
+    # Stencil masks and soft masks need compositing with the page
+    for key in ("ImageMask", "Mask", "SMask"):
+        kind, value = doc.xref_get_key(xref, key)
+        if kind != "null" and value != "false":
+            return None
+
+    try:
+        # MuPDF applies Decode arrays and handles CCITT / JBIG2 / JPX alike
+        pix = fitz.Pixmap(doc, xref)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+    except RuntimeError:
+        return None
+
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    if pix.n == 1:
+        img = img[:, :, 0].copy()
+    else:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY if grayscale else cv2.COLOR_RGB2BGR)
+
+    # Page /Rotate turns the page clockwise
+    if page.rotation:
+        img = np.ascontiguousarray(np.rot90(img, k=-(page.rotation // 90)))
+
+    return img
+
+
+def embedded_page_image(page: "fitz.Page", grayscale: bool = False) -> Optional[np.ndarray]:
+    """
+    Decode a scanned page's embedded image at its native resolution.
+
+    Parameters
+    ----------
+    page : fitz.Page
+        Page to inspect.
+    grayscale : bool
+        Convert colour images to grayscale (default: False).
+
+    Returns
+    -------
+    np.ndarray | None
+        The image (BGR, or single-channel for grayscale and bilevel
+        sources or when `grayscale` is set), or None when the page is not a single upright image
+        covering the page with no visible text or vector drawings, in
+        which case it has to be rendered.
+    """
+
+    xref = _single_page_image(page)
+    if xref is None:
+        return None
+    return _embedded_image(page, xref, grayscale)
+
+
+class PdfPages:
+    """
+    Iterator over the page images of an open PDF, closing it when done.
+
+    `sources` lists, for each page produced so far, whether it was
+    "embedded" (decoded from its image) or "rendered".
+    """
+
+    def __init__(
+        self, doc: "fitz.Document", *, dpi: int, target_width: Optional[int],
+        grayscale: bool, extract_embedded: bool
+    ):
+        self.sources: List[str] = []
+        self._doc = doc
+        self._dpi = dpi
+        self._target_width = target_width
+        self._grayscale = grayscale
+        self._extract_embedded = extract_embedded
+        self._pages = self._iter()
+
+    def _iter(self) -> Iterator[np.ndarray]:
+        try:
+            for page in self._doc:
+                img = embedded_page_image(page, self._grayscale) if self._extract_embedded else None
+                source = "rendered" if img is None else "embedded"
+                if img is None:
+                    matrix = page_matrix(page, self._dpi, self._target_width)
+                    img = _render_page(page, matrix, self._grayscale)
+
+                self.sources.append(source)
+                PDF_PAGES.labels(source=source).inc()
+                yield img
+        finally:
+            self._doc.close()
+
+    def __iter__(self) -> "PdfPages":
+        return self
+
+    def __next__(self) -> np.ndarray:
+        return next(self._pages)
+
+    def close(self) -> None:
+        self._pages.close()
+
+
+def iter_pdf_pages(
+    pdf_path: Union[str, bytes], dpi: int = 300, extract_embedded: bool = PDF_EXTRACT_EMBEDDED_IMAGES,
+    target_width: Optional[int] = None, grayscale: bool = False
+) -> PdfPages:
+    """
+    Lazily rasterize PDF pages one at a time.
+
+    The document is opened eagerly so missing or corrupt files fail on the
+    call, but each page is only produced when the iterator is advanced.
+    Closing the iterator (or abandoning it) stops rendering and closes the
+    document.
+
+    Pages that are a single scanned image are decoded from that image at
+    its native resolution rather than rendered at `dpi`. Other pages
+    (visible text, vector content, masked, rotated or flipped images) are
+    rendered. The path taken per page is reported in `sources`.
 
     Parameters
     ----------
-    pdf_path : str
-        Path to PDF file.
+    pdf_path : str | bytes
+        Path to PDF file, or the PDF bytes themselves.
     dpi : int
         Target DPI for rasterization (default: 300).
+    extract_embedded : bool
+        Use the embedded image of single-image pages
+        (default: PDF_EXTRACT_EMBEDDED_IMAGES).
+    target_width : int, optional
+        Render each page at the zoom that makes it this many pixels wide
+        instead of at `dpi`. Embedded images keep their native size.
+    grayscale : bool
+        Produce single-channel grayscale pages (default: False).
 
     Returns
     -------
-    list[np.ndarray]
-        List of images in BGR format, one per page.
+    PdfPages
+        Iterator of images, one per page: BGR, or single-channel with
+        `grayscale` and for grayscale and bilevel embedded images.
     """
 
-    if not os.path.exists(pdf_path):
+    if target_width is not None and target_width <= 0:
+        raise ValueError("target_width must be > 0")
+
+    in_memory = isinstance(pdf_path, (bytes, bytearray, memoryview))
+
+    if not in_memory and not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
     try:
-        doc = fitz.open(pdf_path)
+        if in_memory:
+            doc = fitz.open(stream=pdf_path, filetype="pdf")
+        else:
+            doc = fitz.open(pdf_path)
     except Exception as e:
         raise RuntimeError(f"Failed to open PDF: {e}")
 
-    images: List[np.ndarray] = []
+    return PdfPages(
+        doc, dpi=dpi, target_width=target_width, grayscale=grayscale,
+        extract_embedded=extract_embedded,
+    )
 
-    # PyMuPDF uses 72 DPI as base
-    zoom = dpi / 72.0
-    matrix = fitz.Matrix(zoom, zoom)
 
-    for page in doc:
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
+def pdf_to_images(
+    pdf_path: Union[str, bytes], dpi: int = 300, extract_embedded: bool = PDF_EXTRACT_EMBEDDED_IMAGES,
+    target_width: Optional[int] = None, grayscale: bool = False
+) -> List[np.ndarray]:
+    """
+    Convert PDF pages to OpenCV-compatible images using PyMuPDF.
 
-        # Convert to NumPy
-        img = np.frombuffer(pix.samples, dtype=np.uint8)
-        img = img.reshape(pix.height, pix.width, pix.n)
+    Prefer iter_pdf_pages for large documents; this holds every page in
+    memory at once.
 
-        # Convert RGB → BGR for OpenCV
-        if pix.n == 3:
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    Parameters
+    ----------
+    pdf_path : str | bytes
+        Path to PDF file, or the PDF bytes themselves.
+    dpi : int
+        Target DPI for rasterization (default: 300).
+    extract_embedded : bool
+        Use the embedded image of single-image pages
+        (default: PDF_EXTRACT_EMBEDDED_IMAGES).
+    target_width : int, optional
+        Render each page at the zoom that makes it this many pixels wide
+        instead of at `dpi`. Embedded images keep their native size.
+    grayscale : bool
+        Produce single-channel grayscale pages (default: False).
 
-        images.append(img)
+    Returns
+    -------
+    list[np.ndarray]
+        List of images, one per page: BGR, or single-channel with
+        `grayscale` and for grayscale and bilevel embedded images.
+    """
 
-    doc.close()
-    return images
+    return list(iter_pdf_pages(
+        pdf_path, dpi=dpi, extract_embedded=extract_embedded,
+        target_width=target_width, grayscale=grayscale,
+    ))
@@ -1,7 +1,19 @@
+from typing import Tuple
 import numpy as np
 import cv2
 
 
+def ocr_resize_plan(shape: Tuple[int, ...], target_width: int = 2480) -> Tuple[Tuple[int, int], int]:
+    """
+    Output size (width, height) and interpolation flag used by resize_to_ocr
+    for an image of the given shape.
+    """
+    h, w = shape[:2]
+    scale = target_width / w
+    interpolation = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
+    return (target_width, int(h * scale)), interpolation
+
+
 def resize_to_ocr(image: np.ndarray, target_width: int = 2480) -> np.ndarray:
     """
     Resize image to OCR-friendly resolution (300 DPI equivalent).
@@ -33,17 +45,11 @@ def resize_to_ocr(image: np.ndarray, target_width: int = 2480) -> np.ndarray:
     if len(image.shape) != 2:
         raise ValueError(f"Resize expects image with shape (H, W), got {image.shape}")
 
-    h, w = image.shape
-
-    if w == target_width:
+    if image.shape[1] == target_width:
         return image
 
-    scale = target_width / w
-    new_width = target_width
-    new_height = int(h * scale)
-
-    interpolation = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
+    size, interpolation = ocr_resize_plan(image.shape, target_width)
 
-    resized = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+    resized = cv2.resize(image, size, interpolation=interpolation)
 
     return resized
@@ -2,7 +2,151 @@ import numpy as np
 import cv2
 
 
-def compute_quality_score(binary_image: np.ndarray) -> dict:
+# Sub-score thresholds
+FOREGROUND_RATIO_RANGE = (0.02, 0.35)
+MIN_COMPONENT_COUNT = 30
+MIN_AVG_COMPONENT_AREA = 15
+MIN_LAPLACIAN_VARIANCE = 50
+
+# Sampled (fast) mode: 1 in QUALITY_TILE_STRIDE tiles of QUALITY_TILE_SIZE px.
+# Tiles stay small enough for 16-bit connected-component labels.
+QUALITY_TILE_SIZE = 256
+QUALITY_TILE_STRIDE = 4
+QUALITY_FAST_MIN_TILES = 16
+
+# Relative distance to a threshold within which a sampled metric is
+# considered borderline and the full-resolution score is computed instead
+QUALITY_BORDERLINE_MARGIN = 0.15
+
+
+def _grade(
+    foreground_ratio: float, component_count: float,
+    avg_component_area: float, laplacian_var: float
+) -> dict:
+    # Normalized sub-scores
+    low, high = FOREGROUND_RATIO_RANGE
+    fg_score = 1.0 if low <= foreground_ratio <= high else 0.0
+    cc_score = 1.0 if component_count >= MIN_COMPONENT_COUNT else 0.0
+    area_score = 1.0 if avg_component_area >= MIN_AVG_COMPONENT_AREA else 0.0
+    blur_score = 1.0 if laplacian_var >= MIN_LAPLACIAN_VARIANCE else 0.0
+
+    score = 0.35 * fg_score + 0.25 * cc_score + 0.20 * area_score + 0.20 * blur_score
+
+    if score >= 0.75:
+        status = "pass"
+    elif score >= 0.45:
+        status = "warn"
+    else:
+        status = "fail"
+
+    return {
+        "score": round(score, 2),
+        "status": status,
+        "metrics": {
+            "foreground_ratio": round(foreground_ratio, 3),
+            "component_count": int(round(component_count)),
+            "avg_component_area": round(avg_component_area, 1),
+            "laplacian_variance": round(laplacian_var, 1),
+        },
+    }
+
+
+def _is_borderline(metrics: dict, margin: float) -> bool:
+    def near(value, threshold):
+        return abs(value - threshold) <= margin * threshold
+
+    return (
+        any(near(metrics["foreground_ratio"], t) for t in FOREGROUND_RATIO_RANGE)
+        or near(metrics["component_count"], MIN_COMPONENT_COUNT)
+        or near(metrics["avg_component_area"], MIN_AVG_COMPONENT_AREA)
+        or near(metrics["laplacian_variance"], MIN_LAPLACIAN_VARIANCE)
+    )
+
+
+def _sampled_quality_score(binary_image: np.ndarray, tile_size: int, stride: int) -> dict:
+    """
+    Estimate the quality metrics from a diagonal sample of full-resolution
+    tiles, extrapolated to the whole page so the regular thresholds apply
+    unchanged. With stride 1 every tile is read, in bounded memory.
+
+    A component touching an edge shared with another tile may continue
+    there, so tiles only count the components clear of those edges, each
+    weighted by the inverse of the chance that a component of its size
+    lands clear of them. Components that never fit in a tile, such as the
+    page background, are counted once, as the full computation does.
+    Every foreground pixel belongs to a component, so the average area is
+    the foreground estimate over the component estimate.
+    """
+
+    h, w = binary_image.shape
+
+    sampled_pixels = 0
+    foreground_pixels = 0
+    # Edge-corrected count of the components clear of shared tile edges
+    component_count = 0.0
+    spanning = False
+    lap_sum = 0.0
+    lap_sq_sum = 0.0
+
+    for ty, y in enumerate(range(0, h, tile_size)):
+        for tx, x in enumerate(range(0, w, tile_size)):
+            if (ty + tx) % stride:
+                continue
+
+            tile = binary_image[y:y + tile_size, x:x + tile_size]
+            th, tw = tile.shape
+            n = tile.size
+            sampled_pixels += n
+            foreground_pixels += cv2.countNonZero(tile)
+
+            # Tile-sized 16-bit labels, discarded immediately
+            _, _, stats, _ = cv2.connectedComponentsWithStats(
+                tile, connectivity=8, ltype=cv2.CV_16U
+            )
+            left, top, width, height = (stats[1:, i].astype(np.int64) for i in range(4))
+
+            # Only edges inside the page are shared with another tile
+            cut = (
+                ((left == 0) & (x > 0)) | ((top == 0) & (y > 0))
+                | ((left + width == tw) & (x + tw < w)) | ((top + height == th) & (y + th < h))
+            )
+            spanning |= bool(cut.any())
+
+            clear_x = np.maximum(tile_size - width[~cut] - 1, 0)
+            clear_y = np.maximum(tile_size - height[~cut] - 1, 0)
+            fits = (clear_x > 0) & (clear_y > 0)
+            component_count += float(
+                (tile_size * tile_size / (clear_x[fits] * clear_y[fits])).sum()
+            )
+
+            # Exact for uint8 input, without a float64 image
+            lap = cv2.Laplacian(tile, cv2.CV_16S)
+            mean, std = cv2.meanStdDev(lap)
+            lap_sum += mean[0, 0] * n
+            lap_sq_sum += (std[0, 0] ** 2 + mean[0, 0] ** 2) * n
+
+    fraction = sampled_pixels / (h * w)
+    lap_mean = lap_sum / sampled_pixels
+
+    component_count = component_count / fraction + int(spanning)
+    foreground_total = foreground_pixels / fraction
+
+    quality = _grade(
+        foreground_ratio=foreground_pixels / sampled_pixels,
+        component_count=component_count,
+        avg_component_area=foreground_total / component_count if component_count else 0,
+        laplacian_var=lap_sq_sum / sampled_pixels - lap_mean ** 2,
+    )
+    if stride > 1:
+        quality["mode"] = "sampled"
+        quality["sampled_fraction"] = round(fraction, 3)
+    else:
+        quality["mode"] = "tiled"
+
+    return quality
+
+
+def compute_quality_score(binary_image: np.ndarray, *, fast: bool = False, tiled: bool = False) -> dict:
     """
     Compute OCR preprocessing quality score.
 
@@ -10,6 +154,16 @@ def compute_quality_score(binary_image: np.ndarray) -> dict:
     ----------
     binary_image : np.ndarray
         Binary image (H, W), values {0, 255}
+    fast : bool, optional
+        Estimate the metrics from sampled tiles (1 in QUALITY_TILE_STRIDE)
+        and only fall back to the full-resolution computation when a
+        metric lands within QUALITY_BORDERLINE_MARGIN of its threshold.
+        Small images are always scored in full.
+    tiled : bool, optional
+        Compute the full-resolution metrics tile by tile (every tile of
+        QUALITY_TILE_SIZE px) instead of with page-sized float64 Laplacian
+        and int32 label images. For very large pages; components are
+        counted clear of tile edges, as in fast mode, not once per tile.
 
     Returns
     -------
@@ -17,7 +171,8 @@ def compute_quality_score(binary_image: np.ndarray) -> dict:
         {
           "score": float (0.0–1.0),
           "status": "pass" | "warn" | "fail",
-          "metrics": dict
+          "metrics": dict,
+          "mode": "full" | "sampled" | "tiled"
         }
     """
 
@@ -25,6 +180,19 @@ def compute_quality_score(binary_image: np.ndarray) -> dict:
         raise ValueError("Invalid binary image")
 
     h, w = binary_image.shape
+
+    if fast:
+        tiles = -(-h // QUALITY_TILE_SIZE) * -(-w // QUALITY_TILE_SIZE)
+        if tiles >= QUALITY_FAST_MIN_TILES:
+            quality = _sampled_quality_score(
+                binary_image, QUALITY_TILE_SIZE, QUALITY_TILE_STRIDE
+            )
+            if not _is_borderline(quality["metrics"], QUALITY_BORDERLINE_MARGIN):
+                return quality
+
+    if tiled:
+        return _sampled_quality_score(binary_image, QUALITY_TILE_SIZE, 1)
+
     total_pixels = h * w
 
     # Foreground ratio
@@ -45,28 +213,7 @@ def compute_quality_score(binary_image: np.ndarray) -> dict:
     # Blur detection (Laplacian variance)
     laplacian_var = cv2.Laplacian(binary_image, cv2.CV_64F).var()
 
-    # Normalized sub-scores
-    fg_score = 1.0 if 0.02 <= foreground_ratio <= 0.35 else 0.0
-    cc_score = 1.0 if component_count >= 30 else 0.0
-    area_score = 1.0 if avg_component_area >= 15 else 0.0
-    blur_score = 1.0 if laplacian_var >= 50 else 0.0
-
-    score = 0.35 * fg_score + 0.25 * cc_score + 0.20 * area_score + 0.20 * blur_score
-
-    if score >= 0.75:
-        status = "pass"
-    elif score >= 0.45:
-        status = "warn"
-    else:
-        status = "fail"
+    quality = _grade(foreground_ratio, component_count, avg_component_area, laplacian_var)
+    quality["mode"] = "full"
 
-    return {
-        "score": round(score, 2),
-        "status": status,
-        "metrics": {
-            "foreground_ratio": round(foreground_ratio, 3),
-            "component_count": component_count,
-            "avg_component_area": round(avg_component_area, 1),
-            "laplacian_variance": round(laplacian_var, 1),
-        },
-    }
+    return quality
@@ -0,0 +1,326 @@
+from api.utils.metrics import (
+    ADMISSION_DECISIONS,
+    ADMISSION_WAIT_SECONDS,
+    MEMORY_BUDGET_BYTES,
+    MEMORY_BUDGET_USED_BYTES,
+    MEMORY_BUDGET_WAITING,
+)
+from api.utils.page_store import PAGE_STORE_ENABLED
+from api.utils.parallel import PREPROCESS_EXECUTOR, PREPROCESS_WORKERS
+from api.utils.pipeline import DEFAULT_PARAMS, pipeline_contexts
+from api.utils.tiled import should_tile
+from api.v1.schemas.base import OCRDocument
+from typing import AsyncIterator, Callable, Deque, Iterator, List, Optional, Tuple, Union
+from collections import deque
+from PIL import Image
+import asyncio, contextlib, io, os, threading, time, fitz
+
+
+# Preprocessing memory each worker process may commit to admitted documents
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "2048"))
+# How long a synchronous request may queue for budget before a 429
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+# Documents allowed to queue for budget; beyond this requests are refused at once
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "32"))
+# Retry-After sent with a 429
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+# Peak bytes per input pixel while a page is preprocessed, on top of the
+# decoded page itself: stage outputs, pooled scratch buffers, the profile
+# predictor's and quality scorer's copies, and the resized result. Tiled
+# pages only hold the binary page and its rotation.
+PIPELINE_BYTES_PER_PIXEL = 8
+TILED_BYTES_PER_PIXEL = 2
+# Estimate per byte of a document whose pages cannot be measured: a JPEG
+# scan decodes to ~3 pixels per byte, each costing ~11 bytes in the pipeline
+UNMEASURED_BYTES_PER_FILE_BYTE = 32
+
+
+class AdmissionRejected(Exception):
+    """
+    The memory budget stayed exhausted for longer than the caller would
+    wait; retry after `retry_after` seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int = ADMISSION_RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _pdf_page_shapes(data: Union[str, bytes], target_width: int) -> List[Tuple[int, int, int]]:
+    """
+    (height, width, channels) each PDF page loads at, from page geometry
+    and image metadata alone; nothing is rendered or decoded.
+    """
+    if isinstance(data, bytes):
+        doc = fitz.open(stream=data, filetype="pdf")
+    else:
+        doc = fitz.open(data)
+
+    shapes = []
+    with doc:
+        for page in doc:
+            rect = page.rect
+            shape = (round(target_width * rect.height / rect.width), target_width, 1)
+            # A scanned page may be decoded at its native resolution instead
+            images = page.get_images()
+            if len(images) == 1:
+                width, height = images[0][2:4]
+                if width * height > shape[0] * shape[1]:
+                    shape = (height, width, 1)
+            shapes.append(shape)
+
+    return shapes
+
+
+def _image_shape(document: OCRDocument) -> Tuple[int, int, int]:
+    # Only the header is parsed; images are decoded as 3-channel BGR
+    source = io.BytesIO(document.data) if document.data is not None else document.path
+    with Image.open(source) as image:
+        width, height = image.size
+    return height, width, 3
+
+
+def estimate_document_bytes(
+    document: Union[str, OCRDocument], executor: Optional[str] = None,
+    workers: Optional[int] = None
+) -> int:
+    """
+    Peak preprocessing memory of a document, estimated from its page count
+    and dimensions without rendering or decoding anything.
+
+    Pages are preprocessed a bounded window at a time (one in serial mode,
+    2 * workers otherwise), so the estimate covers the largest pages that
+    can be in flight together, plus the processed pages when they are kept
+    in memory rather than spilled to the page store. Documents whose pages
+    cannot be measured (e.g. encrypted PDFs) are charged conservatively by
+    file size, and at least one target-width A4 page.
+    """
+
+    document = OCRDocument.coerce(document)
+    target_width = DEFAULT_PARAMS["target_width"]
+
+    try:
+        if document.suffix == ".pdf":
+            shapes = _pdf_page_shapes(
+                document.data if document.data is not None else document.path, target_width
+            )
+        else:
+            shapes = [_image_shape(document)]
+    except Exception:
+        shapes = None
+
+    def page_bytes(shape: Tuple[int, int, int]) -> int:
+        h, w, channels = shape
+        per_pixel = TILED_BYTES_PER_PIXEL if should_tile(shape) else PIPELINE_BYTES_PER_PIXEL
+        return h * w * (channels + per_pixel)
+
+    if shapes is None:
+        size = len(document.data) if document.data is not None else os.path.getsize(document.path)
+        a4 = (round(target_width * 297 / 210), target_width, 3)
+        return max(size * UNMEASURED_BYTES_PER_FILE_BYTE, page_bytes(a4))
+
+    workers = workers or PREPROCESS_WORKERS
+    serial = (executor or PREPROCESS_EXECUTOR) == "serial" or workers <= 1
+    in_flight = 1 if serial else workers * 2
+
+    costs = sorted((page_bytes(shape) for shape in shapes), reverse=True)
+    estimate = sum(costs[:in_flight])
+
+    if not PAGE_STORE_ENABLED:
+        estimate += sum(round(target_width * h / w) * target_width for h, w, _ in shapes)
+
+    return estimate
+
+
+class _Waiter:
+    """
+    A queued reservation, woken once its bytes have been granted.
+    """
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+        self.granted = False
+
+
+class _ThreadWaiter(_Waiter):
+    def __init__(self, nbytes: int):
+        super().__init__(nbytes)
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.event.set()
+
+
+class _TaskWaiter(_Waiter):
+    def __init__(self, nbytes: int):
+        super().__init__(nbytes)
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+    def wake(self) -> None:
+        # Grants may come from another thread than the waiting loop's
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class MemoryBudget:
+    """
+    Admits documents against a per-process preprocessing memory budget.
+
+    Callers hold their estimated bytes (see estimate_document_bytes) while
+    they preprocess, from a coroutine (reserve_async) or a thread
+    (reserve), sharing one FIFO queue. A document that does not fit waits
+    its turn, so large documents are not starved by a stream of small
+    ones; one larger than the whole budget is admitted alone once nothing
+    else is running. Waiting is refused outright once `max_waiting`
+    documents are queued, or after the caller's timeout. Memory reported
+    by `held` (by default, the idle pooled pipeline buffers) counts
+    against the budget too.
+    """
+
+    def __init__(
+        self, budget_bytes: int = MEMORY_BUDGET_MB * 1024 * 1024,
+        max_waiting: int = ADMISSION_MAX_WAITING,
+        held: Callable[[], int] = lambda: pipeline_contexts.idle_bytes
+    ):
+        if budget_bytes <= 0:
+            raise ValueError("budget_bytes must be > 0")
+        if max_waiting < 0:
+            raise ValueError("max_waiting must be >= 0")
+
+        self.budget_bytes = budget_bytes
+        self.max_waiting = max_waiting
+        self.used_bytes = 0
+        self._held = held
+
+        self._lock = threading.Lock()
+        self._queue: Deque[_Waiter] = deque()
+        MEMORY_BUDGET_BYTES.set(budget_bytes)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    def _fits(self, nbytes: int) -> bool:
+        if self.used_bytes == 0:
+            return True
+        return self.used_bytes + self._held() + nbytes <= self.budget_bytes
+
+    def _take(self, nbytes: int) -> None:
+        self.used_bytes += nbytes
+        MEMORY_BUDGET_USED_BYTES.set(self.used_bytes)
+
+    def _grant(self) -> None:
+        # Wake queued documents in order for as long as the head fits
+        while self._queue and self._fits(self._queue[0].nbytes):
+            waiter = self._queue.popleft()
+            self._take(waiter.nbytes)
+            waiter.granted = True
+            waiter.wake()
+        MEMORY_BUDGET_WAITING.set(self.waiting)
+
+    def _admit_or_enqueue(self, waiter_type: Callable[[int], _Waiter], nbytes: int) -> Optional[_Waiter]:
+        """
+        Take `nbytes` now (returns None) or queue a waiter for them.
+        """
+        with self._lock:
+            if not self._queue and self._fits(nbytes):
+                self._take(nbytes)
+                return None
+
+            if self.waiting >= self.max_waiting:
+                raise self._reject("queue_full", f"{self.waiting} documents already waiting for memory")
+
+            waiter = waiter_type(nbytes)
+            self._queue.append(waiter)
+            MEMORY_BUDGET_WAITING.set(self.waiting)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Leave the queue; True if the bytes were granted in the meantime.
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queue.remove(waiter)
+            # The next document may fit now that this one has left
+            self._grant()
+            return False
+
+    def _release(self, nbytes: int) -> None:
+        with self._lock:
+            self.used_bytes -= nbytes
+            MEMORY_BUDGET_USED_BYTES.set(self.used_bytes)
+            self._grant()
+
+    def _reject(self, reason: str, message: str) -> AdmissionRejected:
+        ADMISSION_DECISIONS.labels(outcome=reason).inc()
+        return AdmissionRejected(message)
+
+    def _admitted(self, start: float) -> None:
+        ADMISSION_DECISIONS.labels(outcome="admitted").inc()
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def reserve(self, nbytes: int, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold `nbytes` of the budget for the duration of the block,
+        blocking the calling thread while it waits.
+
+        Waits up to `timeout` seconds (None: indefinitely; 0: not at all)
+        for it to become available, else raises AdmissionRejected.
+        """
+
+        start = time.perf_counter()
+
+        waiter = self._admit_or_enqueue(_ThreadWaiter, nbytes)
+        if waiter is not None and not waiter.event.wait(timeout) and not self._abandon(waiter):
+            raise self._reject("timeout", f"No memory budget for {nbytes} bytes within {timeout}s")
+
+        self._admitted(start)
+        try:
+            yield
+        finally:
+            self._release(nbytes)
+
+    @contextlib.asynccontextmanager
+    async def reserve_async(self, nbytes: int, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Async counterpart of reserve; waits without holding a thread.
+        """
+
+        start = time.perf_counter()
+
+        waiter = self._admit_or_enqueue(_TaskWaiter, nbytes)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter.future, timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    raise self._reject("timeout", f"No memory budget for {nbytes} bytes within {timeout}s")
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self._release(nbytes)
+                raise
+
+        self._admitted(start)
+        try:
+            yield
+        finally:
+            self._release(nbytes)
+
+    def stats(self) -> dict:
+        return {
+            "budget_bytes": self.budget_bytes,
+            "used_bytes": self.used_bytes,
+            "held_bytes": self._held(),
+            "waiting": self.waiting,
+        }
+
+
+memory_budget = MemoryBudget()
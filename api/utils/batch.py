@@ -0,0 +1,143 @@
+from api.utils.process_documents import process_document_async
+from api.v1.schemas.base import (
+    AsyncOCRProvider,
+    OCRCapabilities,
+    OCRDocument,
+    OCRJob,
+    OCRRejected,
+    OCRRequest,
+    OCRResult,
+    OCRStatus,
+)
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio, os, time
+
+
+# Documents preprocessing at once (CPU bound)
+BATCH_CPU_CONCURRENCY = int(os.getenv("BATCH_CPU_CONCURRENCY", "0")) or (os.cpu_count() or 1)
+# Provider calls in flight at once (network bound)
+BATCH_NETWORK_CONCURRENCY = int(os.getenv("BATCH_NETWORK_CONCURRENCY", "16"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+
+
+class LimitedProvider(AsyncOCRProvider):
+    """
+    Wraps an async provider so every call holds a slot of a shared
+    semaphore. Waiting between polls holds no slot.
+    """
+
+    def __init__(self, provider: AsyncOCRProvider, slots: asyncio.Semaphore):
+        self.provider = provider
+        self.slots = slots
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    @property
+    def capabilities(self) -> OCRCapabilities:
+        return self.provider.capabilities
+
+    async def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        async with self.slots:
+            return await self.provider.submit(document, request)
+
+    async def get_status(self, job: OCRJob) -> OCRStatus:
+        async with self.slots:
+            return await self.provider.get_status(job)
+
+    async def fetch_result(self, job: OCRJob) -> OCRResult:
+        async with self.slots:
+            return await self.provider.fetch_result(job)
+
+
+class BatchLimits:
+    """
+    Shared CPU and network limits for one batch.
+    """
+
+    def __init__(
+        self, cpu_concurrency: int = BATCH_CPU_CONCURRENCY,
+        network_concurrency: int = BATCH_NETWORK_CONCURRENCY
+    ):
+        if cpu_concurrency < 1 or network_concurrency < 1:
+            raise ValueError("Batch concurrency limits must be >= 1")
+
+        self.cpu_concurrency = cpu_concurrency
+        self.network_concurrency = network_concurrency
+        self.cpu = asyncio.Semaphore(cpu_concurrency)
+        self.network = asyncio.Semaphore(network_concurrency)
+        # Documents loaded at once: enough to keep both stages busy
+        self.in_flight = asyncio.Semaphore(cpu_concurrency + network_concurrency)
+
+    def wrap(self, provider: AsyncOCRProvider) -> AsyncOCRProvider:
+        return LimitedProvider(provider, self.network)
+
+
+DocumentLoader = Callable[[], Awaitable[OCRDocument]]
+
+
+async def process_batch(
+    documents: List[Tuple[str, DocumentLoader]], request: OCRRequest,
+    provider: AsyncOCRProvider, limits: Optional[BatchLimits] = None
+) -> Dict[str, Any]:
+    """
+    Process many documents with separate CPU and network concurrency limits.
+
+    Each entry is (name, loader); loaders are awaited only when the
+    document is admitted, so at most cpu + network documents are held in
+    memory. One failing document does not affect the others.
+
+    Returns
+    -------
+    dict
+        {"documents": [per-document outcome, in input order],
+         "throughput": batch totals and rates}
+    """
+
+    limits = limits or BatchLimits()
+    limited = limits.wrap(provider)
+
+    async def run(name: str, loader: DocumentLoader) -> Dict[str, Any]:
+        async with limits.in_flight:
+            try:
+                document = await loader()
+                result = await process_document_async(
+                    document, request, limited, cpu_slots=limits.cpu
+                )
+            except OCRRejected as e:
+                return {"filename": name, "status": "rejected", "error": str(e)}
+            except Exception as e:
+                return {
+                    "filename": name, "status": "failed",
+                    "error": f"Error processing document: {e}",
+                }
+
+        return {
+            "filename": name,
+            "status": "processed",
+            **result.to_dict(),
+        }
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run(name, loader) for name, loader in documents))
+    elapsed = time.perf_counter() - start
+
+    processed = [o for o in outcomes if o["status"] == "processed"]
+    pages = sum(len(o["pages"]) for o in processed)
+
+    return {
+        "documents": outcomes,
+        "throughput": {
+            "documents": len(outcomes),
+            "processed": len(processed),
+            "rejected": sum(1 for o in outcomes if o["status"] == "rejected"),
+            "failed": sum(1 for o in outcomes if o["status"] == "failed"),
+            "pages": pages,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(len(outcomes) / elapsed, 3) if elapsed else None,
+            "pages_per_second": round(pages / elapsed, 3) if elapsed else None,
+            "cpu_concurrency": limits.cpu_concurrency,
+            "network_concurrency": limits.network_concurrency,
+        },
+    }
@@ -0,0 +1,248 @@
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from typing import Dict, Iterator, List, Tuple
+import contextlib, threading
+import prometheus_client
+
+
+# Latency buckets in seconds, from a single OpenCV call to a slow provider job
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+# Page sizes in megapixels: thumbnails up to A3 at 600 DPI (~70 MP)
+PAGE_MEGAPIXEL_BUCKETS = (0.5, 1, 2, 4, 8, 12, 16, 24, 32, 48, 72, 100)
+PAGE_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Service metrics, served by GET /metrics (see render())
+registry = CollectorRegistry()
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# (metric name, label values, method, value)
+Update = Tuple[str, Tuple[str, ...], str, float]
+
+# Updates collected by recording() on the current thread
+_recording = threading.local()
+# Replayable metrics by name
+_recorded: Dict[str, "_Recorded"] = {}
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[List[Update]]:
+    """
+    Collect the counter and histogram updates this thread makes in the
+    block, besides applying them.
+
+    Work done in a child process updates the child's copy of the metrics;
+    it returns the collected updates so the parent can replay() them.
+    Gauges describe the process that sets them and are not collected.
+    """
+    updates: List[Update] = []
+    previous = getattr(_recording, "updates", None)
+    _recording.updates = updates
+    try:
+        yield updates
+    finally:
+        _recording.updates = previous
+
+
+def replay(updates: List[Update]) -> None:
+    """
+    Apply updates collected by recording(), e.g. in a worker process.
+    """
+    for name, labelvalues, method, value in updates:
+        metric = _recorded[name]
+        if labelvalues:
+            metric = metric.labels(*labelvalues)
+        getattr(metric, method)(value)
+
+
+def render() -> bytes:
+    # Prometheus text exposition format
+    return generate_latest(registry)
+
+
+def sample(name: str, **labels: str) -> float:
+    """
+    Current value of one exposed sample, 0 if it was never recorded.
+    """
+    return registry.get_sample_value(name, {k: str(v) for k, v in labels.items()}) or 0
+
+
+class _Recorded:
+    """
+    Lets recording() see updates; labelled children are created through
+    the same class, so their updates are seen too.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self._labelvalues:
+            _recorded[self._name] = self
+
+    def _collect(self, method: str, value: float) -> None:
+        updates = getattr(_recording, "updates", None)
+        if updates is not None:
+            updates.append((self._name, tuple(self._labelvalues), method, value))
+
+
+class Counter(_Recorded, prometheus_client.Counter):
+    def inc(self, amount: float = 1, exemplar=None) -> None:
+        super().inc(amount, exemplar)
+        self._collect("inc", amount)
+
+
+class Histogram(_Recorded, prometheus_client.Histogram):
+    def __init__(self, *args, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, buckets=buckets, **kwargs)
+
+    def observe(self, amount: float, exemplar=None) -> None:
+        super().observe(amount, exemplar)
+        self._collect("observe", amount)
+
+
+Gauge = prometheus_client.Gauge
+
+
+PREPROCESS_STAGE_SECONDS = Histogram(
+    "questscan_preprocess_stage_seconds",
+    "Time spent computing one preprocessing stage (cache hits excluded).",
+    ["stage"],
+    registry=registry,
+)
+PREPROCESS_STAGE_CACHE = Counter(
+    "questscan_preprocess_stage_cache_total",
+    "Preprocessing stage lookups in the shared-prefix cache, by result.",
+    ["stage", "result"],
+    registry=registry,
+)
+PREPROCESS_ATTEMPT_SECONDS = Histogram(
+    "questscan_preprocess_attempt_seconds",
+    "Time for one preprocessing profile attempt, including quality scoring.",
+    ["profile"],
+    registry=registry,
+)
+PREPROCESS_ATTEMPTS = Counter(
+    "questscan_preprocess_attempts_total",
+    "Preprocessing profile attempts by quality outcome.",
+    ["profile", "outcome"],
+    registry=registry,
+)
+PREPROCESS_RETRIES = Counter(
+    "questscan_preprocess_retries_total",
+    "Attempts with a profile after earlier attempts did not pass the quality gate.",
+    ["profile"],
+    registry=registry,
+)
+PREPROCESS_FIRST_PROFILE = Counter(
+    "questscan_preprocess_first_profile_total",
+    "Profile the predictor chose to try first.",
+    ["profile"],
+    registry=registry,
+)
+PREPROCESS_RETRIES_SKIPPED = Counter(
+    "questscan_preprocess_retries_skipped_total",
+    "Profiles ahead of the passing one in the configured order that the predictor skipped.",
+    registry=registry,
+)
+PIPELINE_POOL_BYTES = Gauge(
+    "questscan_pipeline_pool_bytes",
+    "Stage buffer memory held by idle pooled pipeline contexts.",
+    registry=registry,
+)
+PAGE_MEGAPIXELS = Histogram(
+    "questscan_page_megapixels",
+    "Size of loaded page images before preprocessing.",
+    buckets=PAGE_MEGAPIXEL_BUCKETS,
+    registry=registry,
+)
+PDF_RENDER_SECONDS = Histogram(
+    "questscan_pdf_render_seconds",
+    "Time to rasterize one PDF page.",
+    registry=registry,
+)
+PDF_PAGES = Counter(
+    "questscan_pdf_pages_total",
+    "PDF pages loaded, by source: decoded from the embedded image or rendered.",
+    ["source"],
+    registry=registry,
+)
+DOCUMENT_PAGES = Histogram(
+    "questscan_document_pages",
+    "Pages per preprocessed document.",
+    buckets=PAGE_COUNT_BUCKETS,
+    registry=registry,
+)
+DOCUMENT_STAGE_SECONDS = Histogram(
+    "questscan_document_stage_seconds",
+    "Time per document spent in each orchestration stage.",
+    ["stage"],
+    registry=registry,
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    "questscan_provider_call_seconds",
+    "Latency of individual OCR provider calls.",
+    ["provider", "call"],
+    registry=registry,
+)
+PROVIDER_CALL_ERRORS = Counter(
+    "questscan_provider_call_errors_total",
+    "OCR provider calls that raised.",
+    ["provider", "call"],
+    registry=registry,
+)
+MEMORY_BUDGET_BYTES = Gauge(
+    "questscan_memory_budget_bytes",
+    "Preprocessing memory budget of this worker process.",
+    registry=registry,
+)
+MEMORY_BUDGET_USED_BYTES = Gauge(
+    "questscan_memory_budget_used_bytes",
+    "Estimated preprocessing memory held by admitted documents.",
+    registry=registry,
+)
+MEMORY_BUDGET_WAITING = Gauge(
+    "questscan_memory_budget_waiting",
+    "Documents queued for preprocessing memory.",
+    registry=registry,
+)
+ADMISSION_DECISIONS = Counter(
+    "questscan_admission_total",
+    "Memory admission decisions: admitted, or rejected on timeout or a full queue.",
+    ["outcome"],
+    registry=registry,
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "questscan_admission_wait_seconds",
+    "Time admitted documents waited for preprocessing memory.",
+    registry=registry,
+)
+PROVIDER_ROUTED = Counter(
+    "questscan_provider_routed_total",
+    "OCR jobs the provider router submitted, by provider.",
+    ["provider"],
+    registry=registry,
+)
+PROVIDER_FAILOVERS = Counter(
+    "questscan_provider_failovers_total",
+    "Routed submissions that failed on a provider and moved on to the next candidate.",
+    ["provider"],
+    registry=registry,
+)
+PROVIDER_CIRCUIT_STATE = Gauge(
+    "questscan_provider_circuit_state",
+    "Circuit breaker state per provider: 0 closed, 1 half-open, 2 open.",
+    ["provider"],
+    registry=registry,
+)
+PROVIDER_LATENCY = Gauge(
+    "questscan_provider_latency_seconds",
+    "Moving average of routed provider call latency: submissions, or status and result polls.",
+    ["provider", "call"],
+    registry=registry,
+)
+PROVIDER_ERROR_RATE = Gauge(
+    "questscan_provider_error_rate",
+    "Moving average share of routed provider calls that failed.",
+    ["provider"],
+    registry=registry,
+)
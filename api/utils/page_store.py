@@ -0,0 +1,83 @@
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+import os, shutil, tempfile, threading
+
+
+# Spill processed pages to disk instead of holding them in memory
+PAGE_STORE_ENABLED = os.getenv("PAGE_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Parent of the per-job scratch directories; must not be a tmpfs to save RAM
+PAGE_STORE_DIR = os.getenv(
+    "PAGE_STORE_DIR", os.path.join(tempfile.gettempdir(), "questscan_pages")
+)
+
+
+class PageStore:
+    """
+    Ordered page images of one job, spilled to .npy files in a private
+    scratch directory.
+
+    Only the index (file, shape, dtype) stays in memory; pages are read
+    back as read-only np.memmap views, so the OS pages them in on demand
+    and can drop them again under memory pressure. With spill=False the
+    arrays are simply kept in a list. Close the store (or use it as a
+    context manager) to delete the files.
+    """
+
+    def __init__(self, root: str = PAGE_STORE_DIR, spill: bool = PAGE_STORE_ENABLED):
+        self.spill = spill
+        self._root = root
+        self._dir: Optional[str] = None
+        self._index: List[Tuple[str, Tuple[int, ...], np.dtype]] = []
+        self._pages: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def _path(self, index: int) -> str:
+        if self._dir is None:
+            os.makedirs(self._root, exist_ok=True)
+            self._dir = tempfile.mkdtemp(prefix="job-", dir=self._root)
+        return os.path.join(self._dir, f"page-{index:05d}.npy")
+
+    def append(self, page: np.ndarray) -> None:
+        if not self.spill:
+            self._pages.append(page)
+            return
+
+        with self._lock:
+            path = self._path(len(self._index))
+            out = np.lib.format.open_memmap(path, mode="w+", dtype=page.dtype, shape=page.shape)
+            out[...] = page
+            out.flush()
+            del out
+            self._index.append((path, page.shape, page.dtype))
+
+    def __len__(self) -> int:
+        return len(self._index) if self.spill else len(self._pages)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if not self.spill:
+            return self._pages[index]
+        path, _, _ = self._index[index]
+        return np.load(path, mmap_mode="r")
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def nbytes(self) -> int:
+        if not self.spill:
+            return sum(page.nbytes for page in self._pages)
+        return sum(int(np.prod(shape)) * dtype.itemsize for _, shape, dtype in self._index)
+
+    def close(self) -> None:
+        self._pages.clear()
+        self._index.clear()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
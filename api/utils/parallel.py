@@ -0,0 +1,101 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+from collections import deque
+import os, threading, cv2
+
+
+# "serial", "thread" or "process"
+PREPROCESS_EXECUTOR = os.getenv("PREPROCESS_EXECUTOR", "serial")
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0")) or (os.cpu_count() or 1)
+
+EXECUTOR_KINDS = ("serial", "thread", "process")
+
+_executors: Dict[Tuple[str, int], Executor] = {}
+_executors_lock = threading.Lock()
+
+
+def opencv_threads_per_worker(workers: int) -> int:
+    """
+    Split the CPU budget between page workers and OpenCV's own threads.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_process_worker(cv_threads: int) -> None:
+    cv2.setNumThreads(cv_threads)
+
+
+def get_executor(kind: str, workers: int) -> Optional[Executor]:
+    """
+    Return a shared executor for page-level work, or None for serial mode.
+
+    Executors are created once per (kind, workers) and reused across
+    requests. Thread pools share the process-wide OpenCV thread setting, so
+    creating one lowers cv2.setNumThreads to keep the total at roughly one
+    thread per core; process pools set it in each child instead.
+    """
+
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(
+            f"Unsupported executor '{kind}', expected one of {EXECUTOR_KINDS}"
+        )
+
+    if kind == "serial" or workers <= 1:
+        return None
+
+    with _executors_lock:
+        executor = _executors.get((kind, workers))
+        if executor is not None:
+            return executor
+
+        cv_threads = opencv_threads_per_worker(workers)
+
+        if kind == "thread":
+            cv2.setNumThreads(cv_threads)
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="preprocess"
+            )
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_process_worker,
+                initargs=(cv_threads,),
+            )
+
+        _executors[(kind, workers)] = executor
+        return executor
+
+
+def map_ordered(
+    func: Callable, items: Iterable, executor: Optional[Executor],
+    window: int
+) -> Iterator:
+    """
+    Apply func to items, yielding results in input order.
+
+    At most `window` items are in flight, so lazily produced inputs (e.g.
+    rendered PDF pages) are only pulled as fast as they are consumed. When
+    the consumer stops early, pending work is cancelled.
+    """
+
+    if executor is None:
+        for item in items:
+            yield func(item)
+        return
+
+    pending: Deque[Future] = deque()
+    iterator = iter(items)
+
+    try:
+        for item in iterator:
+            pending.append(executor.submit(func, item))
+            del item
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -1,17 +1,330 @@
-from api.preprocessing.enhance_contrast import enhance_contrast
-from api.preprocessing.threshold import adaptive_threshold
-from api.preprocessing.denoise import median_denoise
-from api.preprocessing.resize import resize_to_ocr
-from api.preprocessing.grayscale import grayscale
-from api.preprocessing.deskew import deskew
+from api.preprocessing.deskew import DESKEW_ANGLE_TOLERANCE, estimate_skew_angle
+from api.preprocessing.resize import ocr_resize_plan
+from api.utils.metrics import PIPELINE_POOL_BYTES, PREPROCESS_STAGE_CACHE, PREPROCESS_STAGE_SECONDS
+from api.utils.parallel import PREPROCESS_WORKERS
+from typing import Dict, Iterator, List, Optional, Tuple
 import numpy as np
+import contextlib, cv2, os, threading
+
+
+DEFAULT_PARAMS = {
+    "denoise_ksize": 3,
+    "clahe_clip_limit": 2.0,
+    "clahe_tile_grid_size": (8, 8),
+    "threshold_block_size": 11,
+    "threshold_C": 2,
+    "target_width": 2480,
+    "resize_after": os.getenv("PREPROCESS_RESIZE_AFTER", "deskew"),
+}
+
+# Smallest kernel / block size a parameter may be scaled down to
+_SCALED_MINIMUMS = {"denoise_ksize": 3, "threshold_block_size": 3}
+
+# Stage buffers an idle pooled context may keep; larger sets (left by an
+# oversized page) are dropped on release. The default fits an A4 page at
+# the OCR target width through every stage.
+PIPELINE_CONTEXT_MAX_IDLE_MB = int(os.getenv("PIPELINE_CONTEXT_MAX_IDLE_MB", "64"))
+
+
+class PipelineContext:
+    """
+    Working memory for the preprocessing pipeline.
+
+    Owns one output buffer per stage, written through OpenCV dst=
+    arguments and reused as long as the page size stays the same, plus
+    CLAHE instances cached per parameter set. Not thread-safe: use one
+    context per worker thread.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._clahe: Dict[tuple, "cv2.CLAHE"] = {}
+        self.allocations = 0
+        # Token of the pipeline whose results the buffers currently hold
+        self.owner: Optional[object] = None
+
+    def buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape, dtype=np.uint8)
+            self.allocations += 1
+        return buffer
+
+    def clahe(self, clip_limit: float, tile_grid_size: tuple) -> "cv2.CLAHE":
+        key = (clip_limit, tuple(tile_grid_size))
+        clahe = self._clahe.get(key)
+        if clahe is None:
+            clahe = self._clahe[key] = cv2.createCLAHE(
+                clipLimit=clip_limit, tileGridSize=tuple(tile_grid_size)
+            )
+        return clahe
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def release_buffers(self) -> None:
+        self._buffers.clear()
+        self.owner = None
+
+    def release(self) -> None:
+        self.release_buffers()
+        self._clahe.clear()
+
+
+class PipelineContextPool:
+    """
+    Hands out PipelineContexts to concurrent workers and keeps at most
+    `max_idle` of them between uses. A returned context whose buffers
+    exceed `max_idle_bytes` keeps only its CLAHE instances, so one huge
+    page does not pin its buffers for the life of the process.
+    """
+
+    def __init__(self, max_idle: int, max_idle_bytes: int = PIPELINE_CONTEXT_MAX_IDLE_MB * 1024 * 1024):
+        self.max_idle = max_idle
+        self.max_idle_bytes = max_idle_bytes
+        self._idle: List[PipelineContext] = []
+        self._lock = threading.Lock()
+
+    @property
+    def idle_bytes(self) -> int:
+        """
+        Buffer memory held by idle contexts.
+        """
+        with self._lock:
+            return sum(context.nbytes for context in self._idle)
+
+    @contextlib.contextmanager
+    def acquire(self) -> Iterator[PipelineContext]:
+        with self._lock:
+            context = self._idle.pop() if self._idle else PipelineContext()
+            idle_bytes = sum(c.nbytes for c in self._idle)
+        PIPELINE_POOL_BYTES.set(idle_bytes)
+        try:
+            yield context
+        finally:
+            if context.nbytes > self.max_idle_bytes:
+                context.release_buffers()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(context)
+                idle_bytes = sum(c.nbytes for c in self._idle)
+            PIPELINE_POOL_BYTES.set(idle_bytes)
+
+
+# Preprocessing scratch buffers, reused across pages; one set kept per worker
+pipeline_contexts = PipelineContextPool(max_idle=PREPROCESS_WORKERS)
+
+
+# Stages mirror api.preprocessing (grayscale, median_denoise,
+# enhance_contrast, adaptive_threshold, deskew, resize_to_ocr) but write
+# into context buffers and skip per-stage validation: inputs and parameters
+# are checked once in PreprocessingPipeline.
+
+def _grayscale(ctx: PipelineContext, image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=ctx.buffer("grayscale", image.shape[:2]))
+
+
+def _denoise(ctx: PipelineContext, image: np.ndarray, ksize: int) -> np.ndarray:
+    return cv2.medianBlur(image, ksize, dst=ctx.buffer("denoise", image.shape))
+
+
+def _contrast(ctx: PipelineContext, image: np.ndarray, clip_limit: float, tile_grid_size: tuple) -> np.ndarray:
+    return ctx.clahe(clip_limit, tile_grid_size).apply(image, dst=ctx.buffer("contrast", image.shape))
+
+
+def _threshold(ctx: PipelineContext, image: np.ndarray, block_size: int, C: int) -> np.ndarray:
+    return cv2.adaptiveThreshold(
+        image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, C,
+        dst=ctx.buffer("threshold", image.shape),
+    )
+
+
+def _deskew(ctx: PipelineContext, image: np.ndarray) -> np.ndarray:
+    angle = estimate_skew_angle(image)
+    if abs(angle) < DESKEW_ANGLE_TOLERANCE:
+        return image
+
+    h, w = image.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(
+        image, M, (w, h), dst=ctx.buffer("deskew", image.shape),
+        flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
+def _resize(ctx: PipelineContext, image: np.ndarray, target_width: int) -> np.ndarray:
+    if image.shape[1] == target_width:
+        return image
+
+    (w, h), interpolation = ocr_resize_plan(image.shape, target_width)
+    return cv2.resize(image, (w, h), dst=ctx.buffer("resize", (h, w)), interpolation=interpolation)
+
+
+# (stage name, function, {pipeline parameter: function keyword})
+# Order matters: a stage's cache key covers its own parameters and those
+# of every stage before it.
+PIPELINE_STAGES = [
+    ("grayscale", _grayscale, {}),
+    ("denoise", _denoise, {"denoise_ksize": "ksize"}),
+    (
+        "contrast",
+        _contrast,
+        {"clahe_clip_limit": "clip_limit", "clahe_tile_grid_size": "tile_grid_size"},
+    ),
+    (
+        "threshold",
+        _threshold,
+        {"threshold_block_size": "block_size", "threshold_C": "C"},
+    ),
+    ("deskew", _deskew, {}),
+    ("resize", _resize, {"target_width": "target_width"}),
+]
+
+# Stages the resize can be moved up behind (see preprocess_for_ocr)
+RESIZE_POINTS = tuple(name for name, _, _ in PIPELINE_STAGES if name != "resize")
+
+
+def _stage_order(resize_after: str) -> list:
+    stages = [stage for stage in PIPELINE_STAGES if stage[0] != "resize"]
+    resize = next(stage for stage in PIPELINE_STAGES if stage[0] == "resize")
+    index = RESIZE_POINTS.index(resize_after) + 1
+    return stages[:index] + [resize] + stages[index:]
+
+
+def _scaled_odd(size: int, scale: float, minimum: int) -> int:
+    """
+    Nearest odd size to `size * scale`, at least `minimum`.
+    """
+    return max(minimum, 2 * round((size * scale - 1) / 2) + 1)
+
+
+def _validate_image(image: np.ndarray) -> None:
+    if image is None:
+        raise ValueError("Input image is None")
+
+    if not isinstance(image, np.ndarray):
+        raise ValueError("Input image must be a NumPy array")
+
+    if image.dtype != np.uint8:
+        raise ValueError(f"Expected a uint8 image, got {image.dtype}")
+
+    if not (image.ndim == 2 or (image.ndim == 3 and image.shape[2] == 3)):
+        raise ValueError(f"Unsupported image shape for preprocessing: {image.shape}")
+
+
+def _validate_params(params: dict) -> None:
+    ksize = params["denoise_ksize"]
+    if not (isinstance(ksize, int) and ksize >= 3 and ksize % 2 == 1):
+        raise ValueError("Kernel size must be an odd integer >= 3")
+
+    if params["clahe_clip_limit"] <= 0:
+        raise ValueError("clip_limit must be > 0")
+
+    block_size = params["threshold_block_size"]
+    if block_size < 11 or block_size % 2 == 0:
+        raise ValueError("block_size must be an odd integer >= 11")
+
+    if params["target_width"] <= 0:
+        raise ValueError("target_width must be > 0")
+
+    if params["resize_after"] not in RESIZE_POINTS:
+        raise ValueError(f"resize_after must be one of {RESIZE_POINTS}")
+
+
+class PreprocessingPipeline:
+    """
+    Staged preprocessing pipeline with shared-prefix memoization.
+
+    Each stage output is cached under the parameters that fed it and every
+    stage before it. Running the same image with another profile therefore
+    only recomputes the stages downstream of the first changed parameter.
+    One entry is kept per stage, so memory stays bounded to a single chain.
+
+    Stages write into the buffers of `context`, so a result is only valid
+    until the next run on a pipeline sharing that context; copy it to keep
+    it. Pass the same context for consecutive pages to avoid reallocating.
+
+    When `resize_after` names an earlier stage and the page is wider than
+    `target_width`, the downscale runs right after that stage. Median and
+    threshold sizes for the stages that follow are scaled down with the
+    page, so they cover the same area of the document as at full size.
+    """
+
+    def __init__(self, image: np.ndarray, context: Optional[PipelineContext] = None):
+        _validate_image(image)
+        self.image = image
+        self.context = context or PipelineContext()
+        self._token = object()
+        self._cache: Dict[str, Tuple[tuple, np.ndarray]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {
+            name: {"hits": 0, "misses": 0} for name, _, _ in PIPELINE_STAGES
+        }
+
+    def run(self, **params) -> np.ndarray:
+        """
+        Run the pipeline with the given parameters (see preprocess_for_ocr).
+        """
+
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise TypeError(f"Unknown preprocessing parameters: {sorted(unknown)}")
+
+        params = {**DEFAULT_PARAMS, **params}
+        _validate_params(params)
+
+        # Another pipeline has written to the shared buffers since our last run
+        if self.context.owner is not self._token:
+            self._cache.clear()
+            self.context.owner = self._token
+
+        stages = PIPELINE_STAGES
+        scaled = {}
+
+        # Only downscales move: upscaling early would make every stage slower
+        scale = params["target_width"] / self.image.shape[1]
+        if params["resize_after"] != RESIZE_POINTS[-1] and scale < 1:
+            stages = _stage_order(params["resize_after"])
+
+        key: tuple = ()
+        current = self.image
+
+        for name, func, arg_map in stages:
+            kwargs = {kw: scaled.get(arg, params[arg]) for arg, kw in arg_map.items()}
+            key += ((name,) + tuple(kwargs.values()),)
+
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == key:
+                current = cached[1]
+                self.stats[name]["hits"] += 1
+                PREPROCESS_STAGE_CACHE.labels(stage=name, result="hit").inc()
+            else:
+                with PREPROCESS_STAGE_SECONDS.labels(stage=name).time():
+                    current = func(self.context, current, **kwargs)
+                self._cache[name] = (key, current)
+                self.stats[name]["misses"] += 1
+                PREPROCESS_STAGE_CACHE.labels(stage=name, result="miss").inc()
+
+            if name == "resize" and scale < 1:
+                scaled = {
+                    arg: _scaled_odd(params[arg], scale, minimum)
+                    for arg, minimum in _SCALED_MINIMUMS.items()
+                }
+
+        return current
+
+    def clear(self) -> None:
+        self._cache.clear()
 
 
 def preprocess_for_ocr(
     image: np.ndarray, *,
     denoise_ksize: int = 3, clahe_clip_limit: float = 2.0,
     clahe_tile_grid_size: tuple = (8, 8), threshold_block_size: int = 11,
-    threshold_C: int = 2, target_width: int = 2480 ) -> np.ndarray:
+    threshold_C: int = 2, target_width: int = 2480,
+    resize_after: str = DEFAULT_PARAMS["resize_after"] ) -> np.ndarray:
     """
     Full preprocessing pipeline for handwriting OCR.
 
@@ -31,6 +344,11 @@ def preprocess_for_ocr(
         Adaptive threshold constant (default: 2).
     target_width : int
         Target width for OCR normalization (default: 2480).
+    resize_after : str
+        Stage after which pages wider than `target_width` are downscaled:
+        one of RESIZE_POINTS. "grayscale" runs the heavy stages at OCR
+        resolution; the default, "deskew", resizes last unless
+        PREPROCESS_RESIZE_AFTER says otherwise.
 
     Returns
     -------
@@ -38,26 +356,13 @@ def preprocess_for_ocr(
         OCR-ready binary image.
     """
 
-    # 1. Grayscale
-    gray = grayscale(image)
-
-    # 2. Noise reduction
-    denoised = median_denoise(gray, ksize=denoise_ksize)
-
-    # 3. Contrast enhancement
-    contrasted = enhance_contrast(
-        denoised, clip_limit=clahe_clip_limit, tile_grid_size=clahe_tile_grid_size
+    # grayscale → denoise → CLAHE → threshold → deskew → resize
+    return PreprocessingPipeline(image).run(
+        denoise_ksize=denoise_ksize,
+        clahe_clip_limit=clahe_clip_limit,
+        clahe_tile_grid_size=clahe_tile_grid_size,
+        threshold_block_size=threshold_block_size,
+        threshold_C=threshold_C,
+        target_width=target_width,
+        resize_after=resize_after,
     )
-
-    # 4. Adaptive thresholding
-    binary = adaptive_threshold(
-        contrasted, block_size=threshold_block_size, C=threshold_C
-    )
-
-    # 5. Deskew
-    deskewed = deskew(binary)
-
-    # 6. Resize to OCR-friendly resolution
-    resized = resize_to_ocr(deskewed, target_width=target_width)
-
-    return resized
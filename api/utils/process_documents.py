@@ -1,11 +1,42 @@
 from api.preprocessing.preprocessing_profiles import PREPROCESSING_PROFILES
 from api.quality.quality_score import compute_quality_score
-from api.utils.pipeline import preprocess_for_ocr
-from api.pdf.extract_pages import pdf_to_images
-import time, shutil, os, uuid, cv2
-from typing import List, Tuple
+from api.utils.pipeline import DEFAULT_PARAMS, PreprocessingPipeline, pipeline_contexts
+from api.utils.tiled import preprocess_tiled, should_tile
+from api.utils.admission import estimate_document_bytes, memory_budget
+from api.utils.page_store import PageStore
+from api.utils.profile_predictor import feature_bucket, image_features, profile_predictor, skipped_retries
+from api.pdf.extract_pages import iter_pdf_pages
+from api.ocr.webhooks import job_waiters, webhook_url
+from api.ocr.providers import create_provider
+from api.utils.result_cache import cache_key, result_cache
+from api.utils.upload_formats import DEFAULT_UPLOAD_FORMAT, UPLOAD_FORMATS, encode_pages
+from api.utils.metrics import (
+    DOCUMENT_PAGES,
+    DOCUMENT_STAGE_SECONDS,
+    PAGE_MEGAPIXELS,
+    PREPROCESS_ATTEMPT_SECONDS,
+    PREPROCESS_ATTEMPTS,
+    PREPROCESS_FIRST_PROFILE,
+    PREPROCESS_RETRIES,
+    PREPROCESS_RETRIES_SKIPPED,
+    PROVIDER_CALL_ERRORS,
+    PROVIDER_CALL_SECONDS,
+    recording,
+    replay,
+)
+from api.utils.parallel import (
+    PREPROCESS_EXECUTOR,
+    PREPROCESS_WORKERS,
+    get_executor,
+    map_ordered,
+)
+import asyncio, contextlib, itertools, random, time, os, cv2
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
 from api.v1.schemas.base import (
-    HandwritingOCRProvider,
+    AsyncOCRProvider,
+    OCRDocument,
+    OCRJob,
     OCRRequest,
     OCRResult,
     OCRStatus,
@@ -14,105 +45,592 @@ from api.v1.schemas.base import (
 import numpy as np
 
 
-POLL_INTERVAL_SECONDS = 2
-MAX_POLL_ATTEMPTS = 60  # ~2 minutes
+# Status polling: the first poll waits POLL_INITIAL_SECONDS plus
+# POLL_SECONDS_PER_PAGE for every page after the first, then each wait grows
+# by POLL_BACKOFF_FACTOR up to POLL_MAX_INTERVAL_SECONDS, jittered by
+# ±POLL_JITTER. A provider Retry-After is always honoured.
+POLL_INITIAL_SECONDS = 1.0
+POLL_SECONDS_PER_PAGE = 0.5
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_INTERVAL_SECONDS = 10.0
+POLL_JITTER = 0.2
+JOB_TIMEOUT_SECONDS = 120
 
+# Safety-net polling while a webhook callback is expected
+WEBHOOK_FALLBACK_POLL_SECONDS = 15
 
-def _load_images(path: str) -> List[np.ndarray]:
+def _load_images(path: Union[str, OCRDocument]) -> Iterator[np.ndarray]:
     """
-    Load document into page-level images.
+    Load document into page-level images, lazily for PDFs. In-memory
+    documents are decoded straight from their bytes.
+
+    PDF pages are rendered in grayscale at the OCR target width, so the
+    pipeline's grayscale conversion and final resize have nothing to do.
     """
-    ext = os.path.splitext(path)[1].lower()
+    document = OCRDocument.coerce(path)
 
-    if ext == ".pdf":
-        return pdf_to_images(path)
+    if document.suffix == ".pdf":
+        return iter_pdf_pages(
+            document.data if document.data is not None else document.path,
+            target_width=DEFAULT_PARAMS["target_width"],
+            grayscale=True,
+        )
+
+    if document.data is not None:
+        image = cv2.imdecode(np.frombuffer(document.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imread(document.path)
 
-    image = cv2.imread(path)
     if image is None:
-        raise ValueError(f"Unsupported or unreadable file: {path}")
+        raise ValueError(f"Unsupported or unreadable file: {document}")
 
-    return [image]
+    return iter([image])
 
 
-def preprocess_with_retry(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+def _page_plan(image: np.ndarray) -> Tuple[str, List[int], List[int]]:
     """
-    Try multiple preprocessing strategies until quality passes.
+    The predictor's plan for a page: its bucket, the profile order, and
+    the profiles it considers futile to retry on such pages.
     """
+    bucket = feature_bucket(image_features(image))
+    order = profile_predictor.order(bucket)
+    futile = [profile for profile in order if not profile_predictor.worth_trying(bucket, [profile])]
+    return bucket, order, futile
 
-    last_quality = None
 
-    for params in PREPROCESSING_PROFILES:
-        processed = preprocess_for_ocr(image, **params)
-        quality = compute_quality_score(processed)
+def _preprocess_planned(
+    image: np.ndarray, bucket: str, order: List[int], futile: List[int]
+) -> Tuple[np.ndarray, dict, List[Tuple[int, bool]]]:
+    """
+    Run the profiles of a page plan until one passes the quality gate.
 
-        if quality["status"] == "pass":
-            return processed, quality
+    Reads no predictor state, so it can run in a worker process; returns
+    the (profile, passed) attempts for the caller to record.
+    """
 
-        last_quality = quality
+    PAGE_MEGAPIXELS.observe(image.shape[0] * image.shape[1] / 1e6)
+    PREPROCESS_FIRST_PROFILE.labels(profile=order[0]).inc()
+
+    attempts = []
+    last = len(PREPROCESSING_PROFILES) - 1
+    tiled = should_tile(image.shape)
+    # (profile, page, quality) returned when no profile passes
+    fallback = None
+
+    # Tiled pages neither use the staged pipeline nor its pooled buffers
+    with contextlib.nullcontext() if tiled else pipeline_contexts.acquire() as context:
+        pipeline = None if tiled else PreprocessingPipeline(image, context)
+
+        for profile in order:
+            if attempts:
+                # A rejected page always gets every profile
+                if quality["status"] != "fail" and profile != last and profile in futile:
+                    continue
+                PREPROCESS_RETRIES.labels(profile=profile).inc()
+
+            with PREPROCESS_ATTEMPT_SECONDS.labels(profile=profile).time():
+                if tiled:
+                    processed = preprocess_tiled(image, **PREPROCESSING_PROFILES[profile])
+                else:
+                    processed = pipeline.run(**PREPROCESSING_PROFILES[profile])
+                quality = compute_quality_score(processed, fast=True, tiled=tiled)
+            if not tiled:
+                quality["stage_cache"] = pipeline.stats
+            PREPROCESS_ATTEMPTS.labels(profile=profile, outcome=quality["status"]).inc()
+
+            passed = quality["status"] == "pass"
+            attempts.append((profile, passed))
+
+            # The buffers are reused by later attempts and go back to the
+            # pool; the returned page must outlive them
+            if passed or fallback is None or profile > fallback[0]:
+                page = processed if tiled else processed.copy()
+                if passed:
+                    break
+                fallback = (profile, page, quality)
+
+    if not passed:
+        _, page, quality = fallback
+
+    tried = [profile for profile, _ in attempts]
+    skipped = skipped_retries(tried, attempts[-1][0] if passed else None, len(PREPROCESSING_PROFILES))
+    if skipped:
+        PREPROCESS_RETRIES_SKIPPED.inc(skipped)
+
+    if tiled:
+        quality["tiled"] = True
+
+    quality["profiles"] = {
+        "bucket": bucket,
+        "order": order,
+        "tried": tried,
+        "retries_skipped": skipped,
+    }
+
+    return page, quality, attempts
 
-    return processed, last_quality
 
+def preprocess_with_retry(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+    """
+    Try multiple preprocessing strategies until quality passes.
 
-def process_document(path: str, request: OCRRequest) -> OCRResult:
+    Profiles run through one staged pipeline, so stages whose parameters
+    are shared with the previous attempt are reused instead of recomputed.
+    Per-stage cache hits are reported under quality["stage_cache"].
+    Stages write into pooled scratch buffers; only the returned page is
+    newly allocated. Very large pages (see should_tile) are instead
+    processed and scored tile by tile, without the stage cache or pooled
+    buffers, and reported with quality["tiled"] and no "stage_cache".
+
+    Profiles are tried in the order the profile predictor expects to pass
+    first on pages like this one, and the outcome is fed back to it. A
+    retry is skipped when the predictor has seen enough of that profile on
+    such pages to call it futile, except on rejected pages and for the
+    last configured profile. As before the predictor, a page no profile
+    passes gets the last configured profile's output; a page several
+    profiles would pass gets the first to pass in the predicted order.
+    quality["profiles"] reports the order, the attempted profiles (indices
+    in PREPROCESSING_PROFILES) and the retries skipped compared with the
+    configured order.
     """
-    Main OCR orchestration entry point.
+
+    bucket, order, futile = _page_plan(image)
+    page, quality, attempts = _preprocess_planned(image, bucket, order, futile)
+    profile_predictor.record(bucket, attempts)
+    return page, quality
+
+
+def _preprocess_in_process(
+    item: Tuple[np.ndarray, Tuple[str, List[int], List[int]]]
+) -> Tuple[np.ndarray, dict, List[Tuple[int, bool]], list]:
+    """
+    Process pool entry point: preprocess one page to a plan made in the
+    parent, returning the metric updates made along the way.
+    """
+    image, plan = item
+    with recording() as updates:
+        page, quality, attempts = _preprocess_planned(image, *plan)
+    return page, quality, attempts, updates
+
+
+def preprocess_document(
+    path: Union[str, OCRDocument], *, executor: Optional[str] = None, workers: Optional[int] = None,
+    store: Optional[PageStore] = None, report: Optional[List[dict]] = None
+) -> Union[List[np.ndarray], PageStore]:
+    """
+    Load and preprocess every page, enforcing the quality gate.
+
+    `executor` ("serial", "thread" or "process") and `workers` control
+    page-parallel preprocessing and default to PREPROCESS_EXECUTOR and
+    PREPROCESS_WORKERS. Pages are processed in order and the first rejected
+    page still aborts the document. In process mode the profile predictor
+    is consulted and taught, and the workers' metrics recorded, in this
+    process.
+
+    Processed pages are returned as a list, or appended to `store` (which
+    is returned) so they need not stay in memory. When `report` is given, a
+    summary of each page is appended to it: its decode path ("embedded"
+    or "rendered" for PDF pages, "image" otherwise), quality status and
+    score, and the profiles tried.
     """
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(path)
+    if not OCRDocument.coerce(path).exists():
+        raise FileNotFoundError(str(path))
 
-    # 1. Load document → pages
+    # 1. Load document → pages (rendered on demand, one at a time)
     pages = _load_images(path)
-    if not pages:
-        raise OCRRejected("Document contains no readable pages")
 
     # 2. Preprocess + quality gate
-    processed_pages = []
+    processed_pages = store if store is not None else []
 
-    for idx, page in enumerate(pages, start=1):
-        preprocessed, quality = preprocess_with_retry(page)
+    workers = workers or PREPROCESS_WORKERS
+    pool = get_executor(executor or PREPROCESS_EXECUTOR, workers)
 
-        if quality["status"] == "fail":
-            raise OCRRejected(
-                f"Page {idx} rejected after preprocessing "
-                f"(metrics={quality['metrics']})"
-            )
+    # Child processes only see copies of the predictor and metrics: pages
+    # are planned here, and their outcomes and metrics recorded here
+    remote = isinstance(pool, ProcessPoolExecutor)
+    # Keep a page queued behind every worker without rendering far ahead
+    if remote:
+        planned = ((image, _page_plan(image)) for image in pages)
+        results = map_ordered(_preprocess_in_process, planned, pool, window=workers * 2)
+    else:
+        results = map_ordered(preprocess_with_retry, pages, pool, window=workers * 2)
 
-        processed_pages.append(preprocessed)
+    try:
+        for idx, result in enumerate(results, start=1):
+            if remote:
+                preprocessed, quality, attempts, updates = result
+                replay(updates)
+                profile_predictor.record(quality["profiles"]["bucket"], attempts)
+            else:
+                preprocessed, quality = result
+
+            # PDF pages record how they were decoded as they are produced
+            source = pages.sources[idx - 1] if hasattr(pages, "sources") else "image"
+
+            if report is not None:
+                report.append({
+                    "page": idx,
+                    "source": source,
+                    "status": quality["status"],
+                    "score": quality["score"],
+                    "profiles": quality["profiles"]["tried"],
+                    "tiled": quality.get("tiled", False),
+                })
+
+            if quality["status"] == "fail":
+                raise OCRRejected(
+                    f"Page {idx} ({source}) rejected after preprocessing "
+                    f"(metrics={quality['metrics']})"
+                )
+
+            processed_pages.append(preprocessed)
+    finally:
+        # Cancel queued pages and stop rendering the rest on rejection
+        results.close()
+        if hasattr(pages, "close"):
+            pages.close()
+
+    if not processed_pages:
+        raise OCRRejected("Document contains no readable pages")
+
+    DOCUMENT_PAGES.observe(len(processed_pages))
+    return processed_pages
 
-    # 3. Provider selection
-    provider = HandwritingOCRProvider()
 
+def _check_capabilities(provider, request: OCRRequest) -> None:
     if request.action.name == "TABLES" and not provider.capabilities.supports_tables:
         raise RuntimeError("Selected OCR provider does not support table extraction")
 
-    # 4. Persist OCR-ready images (future provider support)
-    temp_dir = f"/tmp/ocr_{uuid.uuid4().hex}"
-    os.makedirs(temp_dir, exist_ok=True)
 
-    try:
-        for i, img in enumerate(processed_pages, start=1):
-            cv2.imwrite(os.path.join(temp_dir, f"page_{i}.png"), img)
+def _resolve_upload_format(request: OCRRequest) -> str:
+    upload_format = request.upload_format or DEFAULT_UPLOAD_FORMAT
+    if upload_format not in UPLOAD_FORMATS:
+        raise ValueError(
+            f"Unsupported upload format '{upload_format}', expected one of {UPLOAD_FORMATS}"
+        )
+    return upload_format
+
+
+def _prepare_upload(
+    document: OCRDocument, processed_pages: Union[List[np.ndarray], PageStore], upload_format: str
+) -> OCRDocument:
+    """
+    Pick what to submit: the original upload, or the preprocessed pages
+    packed in memory into a compact bilevel container.
+    """
+    if upload_format == "original":
+        return document
+
+    filename, data = encode_pages(processed_pages, upload_format)
+    return OCRDocument(filename=filename, data=data)
 
-        # 5. Submit OCR job (original document for now)
-        job = provider.submit(path, request)
 
-        # 6. Poll status
-        for _ in range(MAX_POLL_ATTEMPTS):
+def _with_webhook(provider, request: OCRRequest) -> Tuple[OCRRequest, bool]:
+    """
+    Point the provider at our callback route when webhooks are enabled
+    and the caller did not bring its own webhook_url.
+    """
+    url = webhook_url()
+    if not url or request.webhook_url or not provider.capabilities.supports_webhooks:
+        return request, False
+
+    return OCRRequest(
+        action=request.action,
+        extractor_id=request.extractor_id,
+        webhook_url=url,
+        options=request.options,
+        upload_format=request.upload_format,
+    ), True
+
+
+@contextlib.contextmanager
+def _provider_call(provider, call: str) -> Iterator[None]:
+    """
+    Time one provider call and count it if it raises.
+    """
+    with PROVIDER_CALL_SECONDS.labels(provider=provider.name, call=call).time():
+        try:
+            yield
+        except Exception:
+            PROVIDER_CALL_ERRORS.labels(provider=provider.name, call=call).inc()
+            raise
+
+
+def _terminal(status: OCRStatus) -> bool:
+    if status == OCRStatus.FAILED:
+        raise RuntimeError("OCR job failed during processing")
+    return status == OCRStatus.PROCESSED
+
+
+def _poll_delays(pages: int) -> Iterator[float]:
+    """
+    Jittered exponential backoff, starting from a delay that grows with
+    the document's page count.
+    """
+    delay = POLL_INITIAL_SECONDS + POLL_SECONDS_PER_PAGE * max(0, pages - 1)
+
+    while True:
+        capped = min(delay, POLL_MAX_INTERVAL_SECONDS)
+        yield capped * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        delay = capped * POLL_BACKOFF_FACTOR
+
+
+def _next_wait(delays: Iterator[float], job: OCRJob, deadline: float) -> float:
+    """
+    Next wait before polling: the scheduled delay, or the provider's
+    Retry-After if that is longer, but never past the deadline.
+    """
+    delay = max(next(delays), job.retry_after or 0.0)
+    job.retry_after = None
+    return max(0.0, min(delay, deadline - time.monotonic()))
+
+
+def _wait_delays(waiter: Optional[Future], pages: int) -> Iterator[float]:
+    if waiter is not None:
+        # The callback normally ends the wait; polling is only a safety net
+        return itertools.repeat(WEBHOOK_FALLBACK_POLL_SECONDS)
+    return _poll_delays(pages)
+
+
+def _wait_for_job(provider, job: OCRJob, waiter: Optional[Future], pages: int = 1) -> None:
+    """
+    Block until the job is processed: on the webhook callback when one is
+    expected, otherwise (and as a slow fallback) by polling with backoff.
+    """
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    delays = _wait_delays(waiter, pages)
+
+    while time.monotonic() < deadline:
+        wait = _next_wait(delays, job, deadline)
+
+        if waiter is None:
+            time.sleep(wait)
+        else:
+            try:
+                status, _ = waiter.result(timeout=wait)
+                if _terminal(status):
+                    return
+            except FutureTimeoutError:
+                pass
+
+        with _provider_call(provider, "status"):
             status = provider.get_status(job)
+        if _terminal(status):
+            return
+
+    raise TimeoutError("OCR job timed out")
+
 
-            if status == OCRStatus.PROCESSED:
-                break
+async def _wait_for_job_async(provider, job: OCRJob, waiter: Optional[Future], pages: int = 1) -> None:
+    """
+    Async counterpart of _wait_for_job; waits without holding a thread.
+    """
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    delays = _wait_delays(waiter, pages)
+    callback = asyncio.wrap_future(waiter) if waiter else None
 
-            if status == OCRStatus.FAILED:
-                raise RuntimeError("OCR job failed during processing")
+    while time.monotonic() < deadline:
+        wait = _next_wait(delays, job, deadline)
 
-            time.sleep(POLL_INTERVAL_SECONDS)
+        if callback is None:
+            await asyncio.sleep(wait)
         else:
-            raise TimeoutError("OCR job timed out")
+            # asyncio.wait leaves the callback future alive on timeout
+            done, _ = await asyncio.wait({callback}, timeout=wait)
+            if done:
+                status, _ = callback.result()
+                if _terminal(status):
+                    return
+
+        with _provider_call(provider, "status"):
+            status = await provider.get_status(job)
+        if _terminal(status):
+            return
+
+    raise TimeoutError("OCR job timed out")
+
+
+def process_document(
+    path: Union[str, OCRDocument], request: OCRRequest, *,
+    executor: Optional[str] = None, workers: Optional[int] = None,
+    use_cache: bool = True, admission_timeout: Optional[float] = None
+) -> OCRResult:
+    """
+    Main OCR orchestration entry point.
+
+    See preprocess_document for `executor` and `workers`. Identical uploads
+    (same bytes, action, extractor and options) are answered from the
+    result cache without preprocessing or a provider round-trip; such
+    results are marked `cached` and keep the original job_id.
+    `request.upload_format` selects whether the original file or the
+    packed preprocessed pages are sent (see api.utils.upload_formats).
+    `path` may also be an in-memory OCRDocument, in which case nothing
+    touches the disk.
+
+    Preprocessing and encoding hold the document's estimated memory
+    against the same budget as process_document_async, blocking for up
+    to `admission_timeout` seconds (None: indefinitely) for it before
+    raising AdmissionRejected.
+    """
+
+    document = OCRDocument.coerce(path)
+    if not document.exists():
+        raise FileNotFoundError(str(document))
+
+    upload_format = _resolve_upload_format(request)
+
+    # 0. Content-addressed result cache (hashing reads the whole upload,
+    # so it is skipped while the cache is off)
+    key = cache_key(document, request) if use_cache and result_cache.enabled else None
+    if key:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Admission against the memory budget, sized from page geometry
+    nbytes = estimate_document_bytes(document, executor, workers)
+
+    # Processed pages live on disk until they are packed for upload
+    report: List[dict] = []
+    with memory_budget.reserve(nbytes, timeout=admission_timeout), PageStore() as processed_pages:
+        # 1-2. Load + preprocess + quality gate
+        with DOCUMENT_STAGE_SECONDS.labels(stage="preprocess").time():
+            preprocess_document(
+                document, executor=executor, workers=workers, store=processed_pages, report=report
+            )
+
+        # 3. Provider selection
+        provider = create_provider()
+        _check_capabilities(provider, request)
+
+        # 4. Original upload, or preprocessed pages packed for upload
+        with DOCUMENT_STAGE_SECONDS.labels(stage="encode").time():
+            upload = _prepare_upload(document, processed_pages, upload_format)
+        pages = len(processed_pages)
+
+    request, use_webhook = _with_webhook(provider, request)
+    job = None
+
+    try:
+        # 5. Submit OCR job
+        with DOCUMENT_STAGE_SECONDS.labels(stage="submit").time(), _provider_call(provider, "submit"):
+            job = provider.submit(upload, request)
+        waiter = job_waiters.register(job.provider_job_id) if use_webhook else None
+
+        # 6. Wait for webhook callback, or poll status
+        with DOCUMENT_STAGE_SECONDS.labels(stage="wait").time():
+            _wait_for_job(provider, job, waiter, pages)
 
         # 7. Fetch normalized result
-        return provider.fetch_result(job)
+        with DOCUMENT_STAGE_SECONDS.labels(stage="fetch").time(), _provider_call(provider, "result"):
+            result = provider.fetch_result(job)
+        result.preprocessing = report
+
+        if key:
+            result_cache.put(key, result)
+
+        return result
+
+    finally:
+        if job is not None and use_webhook:
+            job_waiters.discard(job.provider_job_id)
+
+
+async def process_document_async(
+    path: Union[str, OCRDocument], request: OCRRequest, provider: AsyncOCRProvider, *,
+    executor: Optional[str] = None, workers: Optional[int] = None,
+    on_submit: Optional[Callable[[OCRJob], Awaitable[None]]] = None,
+    use_cache: bool = True, cpu_slots: Optional[asyncio.Semaphore] = None,
+    admission_timeout: Optional[float] = None
+) -> OCRResult:
+    """
+    Async OCR orchestration for use from async routes.
+
+    CPU-bound preprocessing runs in a worker thread; provider calls go
+    through `provider`, typically built on the application's shared
+    pooled client, and polling sleeps without holding a thread.
+    `on_submit` is awaited with the provider job once it is queued.
+    `cpu_slots`, when given, bounds how many documents preprocess and
+    encode at once across concurrent calls (see api.utils.batch).
+
+    Preprocessing and encoding hold the document's estimated memory
+    against the worker's memory budget (see api.utils.admission). When it
+    is exhausted the call queues for up to `admission_timeout` seconds
+    (None: indefinitely), then raises AdmissionRejected.
+    """
+
+    document = OCRDocument.coerce(path)
+    if not document.exists():
+        raise FileNotFoundError(str(document))
+
+    upload_format = _resolve_upload_format(request)
+
+    # 0. Content-addressed result cache (hashing reads the whole upload,
+    # so it is skipped while the cache is off)
+    use_cache = use_cache and result_cache.enabled
+    key = await asyncio.to_thread(cache_key, document, request) if use_cache else None
+    if key:
+        cached = await asyncio.to_thread(result_cache.get, key)
+        if cached is not None:
+            return cached
+
+    # Admission against the memory budget, sized from page geometry
+    nbytes = await asyncio.to_thread(estimate_document_bytes, document, executor, workers)
+
+    # Only documents holding a CPU slot reserve memory, so those still
+    # queued for one do not keep the budget from other callers
+    async with cpu_slots or contextlib.nullcontext():
+        async with memory_budget.reserve_async(nbytes, timeout=admission_timeout):
+            # Processed pages live on disk until they are packed for upload
+            processed_pages = PageStore()
+            report: List[dict] = []
+            try:
+                # 1-2. Load + preprocess + quality gate
+                with DOCUMENT_STAGE_SECONDS.labels(stage="preprocess").time():
+                    await asyncio.to_thread(
+                        preprocess_document, document, executor=executor, workers=workers,
+                        store=processed_pages, report=report,
+                    )
+
+                # 3. Provider checks
+                _check_capabilities(provider, request)
+
+                # 4. Original upload, or preprocessed pages packed for upload
+                with DOCUMENT_STAGE_SECONDS.labels(stage="encode").time():
+                    upload = await asyncio.to_thread(
+                        _prepare_upload, document, processed_pages, upload_format
+                    )
+                pages = len(processed_pages)
+            finally:
+                await asyncio.to_thread(processed_pages.close)
+
+    request, use_webhook = _with_webhook(provider, request)
+    job = None
+
+    try:
+        # 5. Submit OCR job
+        with DOCUMENT_STAGE_SECONDS.labels(stage="submit").time(), _provider_call(provider, "submit"):
+            job = await provider.submit(upload, request)
+        waiter = job_waiters.register(job.provider_job_id) if use_webhook else None
+
+        if on_submit is not None:
+            await on_submit(job)
+
+        # 6. Wait for webhook callback, or poll status
+        with DOCUMENT_STAGE_SECONDS.labels(stage="wait").time():
+            await _wait_for_job_async(provider, job, waiter, pages)
+
+        # 7. Fetch normalized result
+        with DOCUMENT_STAGE_SECONDS.labels(stage="fetch").time(), _provider_call(provider, "result"):
+            result = await provider.fetch_result(job)
+        result.preprocessing = report
+
+        if key:
+            await asyncio.to_thread(result_cache.put, key, result)
+
+        return result
 
     finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        if job is not None and use_webhook:
+            job_waiters.discard(job.provider_job_id)
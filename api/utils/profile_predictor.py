@@ -0,0 +1,236 @@
+from api.preprocessing.preprocessing_profiles import PREPROCESSING_PROFILES
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import cv2, json, os, threading
+
+
+PROFILE_PREDICTOR_ENABLED = os.getenv("PROFILE_PREDICTOR_ENABLED", "true").lower() in ("1", "true", "yes")
+# JSONL outcome log: replayed on startup, appended to as pages are processed
+PROFILE_PREDICTOR_LOG = os.getenv("PROFILE_PREDICTOR_LOG")
+
+# Histogram statistics are taken on a thumbnail no larger than this, noise
+# on a full-resolution centre crop of this size (downscaling averages it out)
+PREDICTOR_THUMBNAIL_MAX_SIDE = 512
+PREDICTOR_NOISE_CROP = 512
+
+# Bin edges per feature; a page's bucket is its bin index for each
+PREDICTOR_BINS = {
+    "contrast": (60, 120),      # p95 - p5 of gray levels
+    "noise": (2.0, 5.0),        # estimated noise sigma
+    "brightness": (110, 170),   # mean gray level
+}
+
+# Before any outcomes, each profile is assumed to pass at PRIOR_PASS_RATE,
+# weighted as PRIOR_WEIGHT attempts; the list order breaks ties
+PRIOR_PASS_RATE = 0.5
+PRIOR_WEIGHT = 2.0
+
+# A profile is not worth retrying once it has at least FUTILE_MIN_ATTEMPTS
+# attempts in the bucket and a smoothed pass rate below FUTILE_PASS_RATE.
+# Every FUTILE_EXPLORE_EVERY-th page in a bucket still tries them all, so
+# the estimate can recover.
+FUTILE_MIN_ATTEMPTS = 20
+FUTILE_PASS_RATE = 0.05
+FUTILE_EXPLORE_EVERY = 20
+
+# Immerkaer's noise estimation kernel
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def image_features(image: np.ndarray) -> Dict[str, float]:
+    """
+    Cheap page statistics, from a strided thumbnail and a centre crop.
+
+    Returns
+    -------
+    dict
+        contrast (p95 - p5 gray level), noise (estimated sigma) and
+        brightness (mean gray level).
+    """
+
+    if image is None or image.ndim not in (2, 3):
+        raise ValueError("Expected an image with shape (H, W) or (H, W, C)")
+
+    def to_gray(region: np.ndarray) -> np.ndarray:
+        region = np.ascontiguousarray(region)
+        return region if region.ndim == 2 else cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+
+    h, w = image.shape[:2]
+
+    # Median of the kernel response is robust to text edges; for Gaussian
+    # noise the response has standard deviation 6 * sigma
+    y0, x0 = max(0, (h - PREDICTOR_NOISE_CROP) // 2), max(0, (w - PREDICTOR_NOISE_CROP) // 2)
+    crop = to_gray(image[y0:y0 + PREDICTOR_NOISE_CROP, x0:x0 + PREDICTOR_NOISE_CROP])
+
+    noise = 0.0
+    if min(crop.shape) > 2:
+        response = cv2.filter2D(crop.astype(np.float32), -1, _NOISE_KERNEL)[1:-1, 1:-1]
+        noise = float(np.median(np.abs(response)) / (0.6745 * 6))
+
+    # Strided thumbnail: no filtering needed for histogram statistics
+    step = max(1, -(-max(h, w) // PREDICTOR_THUMBNAIL_MAX_SIDE))
+    thumbnail = to_gray(image[::step, ::step])
+
+    p5, p95 = np.percentile(thumbnail, (5, 95))
+
+    return {
+        "contrast": float(p95 - p5),
+        "noise": noise,
+        "brightness": float(thumbnail.mean()),
+    }
+
+
+def feature_bucket(features: Dict[str, float]) -> str:
+    """
+    Discrete bucket for a feature dict, e.g. "contrast1-noise0-brightness2".
+    """
+    return "-".join(
+        f"{name}{int(np.searchsorted(edges, features[name], side='right'))}"
+        for name, edges in PREDICTOR_BINS.items()
+    )
+
+
+class ProfilePredictor:
+    """
+    Orders preprocessing profiles by their observed pass rate on similar
+    pages.
+
+    Pages are grouped into buckets of thumbnail statistics. For each bucket
+    and profile the predictor counts attempts and quality passes, and tries
+    the profiles with the best smoothed pass rate first. Once the remaining
+    profiles have reliably failed in a bucket, retrying them is skipped
+    (see worth_trying). With no outcomes the configured order is kept.
+    Outcomes may be appended to a JSONL log and replayed on startup.
+    """
+
+    def __init__(
+        self, n_profiles: int = len(PREPROCESSING_PROFILES),
+        log_path: Optional[str] = PROFILE_PREDICTOR_LOG, enabled: bool = PROFILE_PREDICTOR_ENABLED
+    ):
+        self.n_profiles = n_profiles
+        self.log_path = log_path
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        # Appends to the outcome log, kept apart so file I/O does not
+        # block order() and worth_trying() on other workers
+        self._log_lock = threading.Lock()
+        # bucket -> per-profile [attempts, passes]
+        self._outcomes: Dict[str, List[List[int]]] = {}
+        self._counters = {"pages": 0, "reordered": 0, "stopped_early": 0, "retries_skipped": 0}
+        self._bucket_pages: Dict[str, int] = {}
+
+        if log_path and os.path.exists(log_path):
+            self._replay(log_path)
+
+    def _replay(self, path: str) -> None:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._record(entry["bucket"], int(entry["profile"]), bool(entry["passed"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _record(self, bucket: str, profile: int, passed: bool) -> None:
+        if not 0 <= profile < self.n_profiles:
+            return
+        counts = self._outcomes.setdefault(bucket, [[0, 0] for _ in range(self.n_profiles)])
+        counts[profile][0] += 1
+        counts[profile][1] += int(passed)
+
+    def _counts(self, bucket: str) -> List[List[int]]:
+        with self._lock:
+            return [list(c) for c in self._outcomes.get(bucket, [[0, 0]] * self.n_profiles)]
+
+    def pass_rates(self, bucket: str) -> List[float]:
+        return [
+            (passes + PRIOR_PASS_RATE * PRIOR_WEIGHT) / (attempts + PRIOR_WEIGHT)
+            for attempts, passes in self._counts(bucket)
+        ]
+
+    def order(self, bucket: str) -> List[int]:
+        """
+        Profile indices, most likely to pass first.
+        """
+        default = list(range(self.n_profiles))
+        if not self.enabled:
+            return default
+
+        rates = self.pass_rates(bucket)
+        # Stable sort keeps the configured order between equal rates
+        return sorted(default, key=lambda i: -rates[i])
+
+    def worth_trying(self, bucket: str, profiles: List[int]) -> bool:
+        """
+        Whether any of `profiles` may still pass on a page from `bucket`.
+        """
+        if not self.enabled or not profiles:
+            return bool(profiles)
+
+        with self._lock:
+            if self._bucket_pages.get(bucket, 0) % FUTILE_EXPLORE_EVERY == 0:
+                return True
+
+        counts = self._counts(bucket)
+        rates = self.pass_rates(bucket)
+        return any(
+            counts[i][0] < FUTILE_MIN_ATTEMPTS or rates[i] >= FUTILE_PASS_RATE
+            for i in profiles
+        )
+
+    def record(self, bucket: str, attempts: List[Tuple[int, bool]]) -> None:
+        """
+        Learn from one page: (profile, passed) for each attempt, in order.
+        """
+        if not self.enabled or not attempts:
+            return
+
+        tried = [profile for profile, _ in attempts]
+        passing = next((profile for profile, passed in attempts if passed), None)
+        skipped = skipped_retries(tried, passing, self.n_profiles)
+
+        with self._lock:
+            for profile, passed in attempts:
+                self._record(bucket, profile, passed)
+
+            self._bucket_pages[bucket] = self._bucket_pages.get(bucket, 0) + 1
+            self._counters["pages"] += 1
+            self._counters["retries_skipped"] += skipped
+            if tried[0] != 0:
+                self._counters["reordered"] += 1
+            if passing is None and skipped:
+                self._counters["stopped_early"] += 1
+
+        if self.log_path:
+            lines = "".join(
+                json.dumps({"bucket": bucket, "profile": profile, "passed": passed}) + "\n"
+                for profile, passed in attempts
+            )
+            with self._log_lock, open(self.log_path, "a") as f:
+                f.write(lines)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                **self._counters,
+                "buckets": {
+                    bucket: [{"attempts": a, "passes": p} for a, p in counts]
+                    for bucket, counts in sorted(self._outcomes.items())
+                },
+            }
+
+
+def skipped_retries(tried: List[int], passing: Optional[int], n_profiles: int) -> int:
+    """
+    Attempts the configured order would have made that were skipped: the
+    untried profiles ahead of the passing one or, when none passed, every
+    untried profile. Assumes the skipped profiles would not have passed, as
+    the predictor expected.
+    """
+    last = passing if passing is not None else n_profiles
+    return sum(1 for profile in range(last) if profile not in tried)
+
+
+profile_predictor = ProfilePredictor()
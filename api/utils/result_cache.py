@@ -0,0 +1,170 @@
+from api.v1.schemas.base import OCRDocument, OCRRequest, OCRResult
+from api.utils.upload_formats import DEFAULT_UPLOAD_FORMAT
+from api.v1.models.ocr_cache import OCRCacheEntry
+from api.db.database import SessionLocal
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Union
+import hashlib, json, os, threading
+
+
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+OCR_CACHE_TTL_SECONDS = int(os.getenv("OCR_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def cache_key(document: Union[str, OCRDocument], request: OCRRequest) -> str:
+    """
+    Content address for an upload: sha256 over the file bytes, the action,
+    the extractor id, the (sorted) request options and the upload format.
+    """
+
+    document = OCRDocument.coerce(document)
+    digest = hashlib.sha256()
+
+    if document.data is not None:
+        digest.update(document.data)
+    else:
+        with open(document.path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+
+    digest.update(b"\0" + request.action.value.encode())
+    digest.update(b"\0" + (request.extractor_id or "").encode())
+    digest.update(b"\0" + json.dumps(request.options, sort_keys=True, default=str).encode())
+    digest.update(b"\0" + (request.upload_format or DEFAULT_UPLOAD_FORMAT).encode())
+
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    """
+    Database-backed cache of normalized OCR results.
+
+    Entries expire after `ttl_seconds`; when the stored results exceed
+    `max_bytes`, the least recently used entries are evicted. Storage
+    errors never fail a request: they are counted and treated as misses.
+    """
+
+    def __init__(
+        self, ttl_seconds: int = OCR_CACHE_TTL_SECONDS,
+        max_bytes: int = OCR_CACHE_MAX_BYTES, enabled: bool = OCR_CACHE_ENABLED
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def get(self, key: str) -> Optional[OCRResult]:
+        if not self.enabled:
+            return None
+
+        db = SessionLocal()
+        try:
+            entry = db.get(OCRCacheEntry, key)
+            now = datetime.now(timezone.utc)
+
+            if entry is None or _aware(entry.created_at) + self.ttl < now:
+                self._count("misses")
+                return None
+
+            entry.hits += 1
+            entry.last_accessed_at = now
+            db.commit()
+
+            self._count("hits")
+            result = OCRResult.from_dict(entry.result)
+            result.cached = True
+            return result
+
+        except SQLAlchemyError:
+            db.rollback()
+            self._count("errors")
+            self._count("misses")
+            return None
+
+        finally:
+            db.close()
+
+    def put(self, key: str, result: OCRResult) -> None:
+        if not self.enabled:
+            return
+
+        payload = result.to_dict()
+        size = len(json.dumps(payload, default=str))
+
+        db = SessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            db.merge(OCRCacheEntry(
+                cache_key=key, result=payload, size_bytes=size,
+                hits=0, created_at=now, last_accessed_at=now,
+            ))
+            db.commit()
+            self._count("stores")
+
+            self._evict(db, now)
+
+        except SQLAlchemyError:
+            db.rollback()
+            self._count("errors")
+
+        finally:
+            db.close()
+
+    def _evict(self, db, now: datetime) -> None:
+        # Expired entries first
+        expired = (
+            db.query(OCRCacheEntry)
+            .filter(OCRCacheEntry.created_at < now - self.ttl)
+            .delete(synchronize_session=False)
+        )
+
+        # Then least recently used until under the size budget
+        total = db.query(func.coalesce(func.sum(OCRCacheEntry.size_bytes), 0)).scalar()
+        evicted = 0
+
+        if total > self.max_bytes:
+            rows = (
+                db.query(OCRCacheEntry.cache_key, OCRCacheEntry.size_bytes)
+                .order_by(OCRCacheEntry.last_accessed_at.asc())
+                .all()
+            )
+            doomed = []
+            for cache_key_, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append(cache_key_)
+                total -= size
+
+            evicted = (
+                db.query(OCRCacheEntry)
+                .filter(OCRCacheEntry.cache_key.in_(doomed))
+                .delete(synchronize_session=False)
+            )
+
+        db.commit()
+
+        if expired or evicted:
+            self._count("evictions", expired + evicted)
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+result_cache = OCRResultCache()
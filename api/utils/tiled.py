@@ -0,0 +1,254 @@
+from api.preprocessing.deskew import DESKEW_ANGLE_TOLERANCE, estimate_skew_angle
+from api.preprocessing.resize import ocr_resize_plan
+from api.utils.metrics import PREPROCESS_STAGE_SECONDS
+from api.utils.pipeline import DEFAULT_PARAMS, RESIZE_POINTS, _validate_image, _validate_params
+from typing import Iterator, Optional, Tuple
+import numpy as np
+import cv2, os
+
+
+# Pages of at least this many megapixels are preprocessed tile by tile
+TILED_MIN_MEGAPIXELS = float(os.getenv("PREPROCESS_TILED_MIN_MEGAPIXELS", "40"))
+# Side of the square output tiles; working memory scales with its square
+TILE_SIZE = int(os.getenv("PREPROCESS_TILE_SIZE", "1024"))
+
+
+def should_tile(shape: Tuple[int, ...], resize_after: str = DEFAULT_PARAMS["resize_after"],
+                target_width: int = DEFAULT_PARAMS["target_width"]) -> bool:
+    """
+    Whether a page is large enough for tiled preprocessing. Pages that are
+    downscaled early (see preprocess_for_ocr) never need it.
+    """
+    h, w = shape[:2]
+    if resize_after != RESIZE_POINTS[-1] and w > target_width:
+        return False
+    return h * w >= TILED_MIN_MEGAPIXELS * 1e6
+
+
+def _tiles(h: int, w: int, tile_size: int) -> Iterator[Tuple[int, int, int, int]]:
+    for y0 in range(0, h, tile_size):
+        for x0 in range(0, w, tile_size):
+            yield y0, min(y0 + tile_size, h), x0, min(x0 + tile_size, w)
+
+
+def _denoised(image: np.ndarray, y0: int, y1: int, x0: int, x1: int, ksize: int) -> np.ndarray:
+    """
+    Grayscale, median-filtered pixels of image[y0:y1, x0:x1], read with
+    enough margin that they match filtering the whole page.
+    """
+    h, w = image.shape[:2]
+    r = ksize // 2
+    top, left = max(0, y0 - r), max(0, x0 - r)
+    crop = image[top:min(h, y1 + r), left:min(w, x1 + r)]
+
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.medianBlur(np.ascontiguousarray(crop), ksize)
+
+    return blurred[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+class _TiledCLAHE:
+    """
+    cv2.CLAHE split into its two passes, so a page can be equalized tile
+    by tile: per-cell histograms are accumulated from any tiling of the
+    page, then every tile is mapped through the interpolated cell LUTs.
+    Follows OpenCV's algorithm (including the reflect-101 padding of pages
+    that do not divide into the grid), up to float rounding.
+    """
+
+    def __init__(self, shape: Tuple[int, int], clip_limit: float, grid: Tuple[int, int]):
+        self.h, self.w = shape
+        self.gx, self.gy = grid
+        # As in OpenCV: once either side needs padding, both are padded,
+        # by a whole cell row or column where that side already divides
+        self.pad_y = self.pad_x = 0
+        if self.h % self.gy or self.w % self.gx:
+            self.pad_y = self.gy - self.h % self.gy
+            self.pad_x = self.gx - self.w % self.gx
+        self.cell_h = (self.h + self.pad_y) // self.gy
+        self.cell_w = (self.w + self.pad_x) // self.gx
+        self.clip_limit = clip_limit
+
+        self.hist = np.zeros((self.gy, self.gx, 256), dtype=np.int64)
+        # Rows / columns the padding reflects, kept to count the padding
+        self._pad_rows = np.empty((self.pad_y, self.w), dtype=np.uint8)
+        self._pad_cols = np.empty((self.h, self.pad_x), dtype=np.uint8)
+        self.luts: Optional[np.ndarray] = None
+
+    def _count(self, values: np.ndarray, y0: int, x0: int) -> None:
+        h, w = values.shape
+        for cy in range(y0 // self.cell_h, min(self.gy, -(-(y0 + h) // self.cell_h))):
+            ys = slice(max(0, cy * self.cell_h - y0), min(h, (cy + 1) * self.cell_h - y0))
+            for cx in range(x0 // self.cell_w, min(self.gx, -(-(x0 + w) // self.cell_w))):
+                xs = slice(max(0, cx * self.cell_w - x0), min(w, (cx + 1) * self.cell_w - x0))
+                self.hist[cy, cx] += np.bincount(values[ys, xs].ravel(), minlength=256)
+
+    def accumulate(self, values: np.ndarray, y0: int, x0: int) -> None:
+        """
+        Add the pixels of one tile, whose top-left corner is (y0, x0).
+        """
+        h, w = values.shape
+        self._count(values, y0, x0)
+
+        # Padding row H + i mirrors row H - 2 - i (likewise for columns)
+        for i in range(self.pad_y):
+            if y0 <= self.h - 2 - i < y0 + h:
+                self._pad_rows[i, x0:x0 + w] = values[self.h - 2 - i - y0]
+        for j in range(self.pad_x):
+            if x0 <= self.w - 2 - j < x0 + w:
+                self._pad_cols[y0:y0 + h, j] = values[:, self.w - 2 - j - x0]
+
+    def _build_luts(self) -> None:
+        if self.pad_y:
+            corner = self._pad_rows[:, [self.w - 2 - j for j in range(self.pad_x)]]
+            self._count(np.hstack([self._pad_rows, corner]), self.h, 0)
+        if self.pad_x:
+            self._count(self._pad_cols, 0, self.w)
+
+        area = self.cell_h * self.cell_w
+        hist = self.hist.reshape(-1, 256)
+
+        clip = max(int(self.clip_limit * area / 256), 1)
+        excess = np.maximum(hist - clip, 0).sum(axis=1, keepdims=True)
+        hist = np.minimum(hist, clip) + excess // 256
+
+        # The remainder goes one count at a time to every step-th bin
+        residual = excess % 256
+        step = np.maximum(256 // np.maximum(residual, 1), 1)
+        bins = np.arange(256)
+        hist += (residual > 0) & (bins % step == 0) & (bins // step < residual)
+
+        scale = np.float32(255 / area)
+        luts = np.rint(np.cumsum(hist, axis=1).astype(np.float32) * scale)
+        self.luts = np.clip(luts, 0, 255).astype(np.uint8).reshape(self.gy, self.gx, 256)
+
+    @staticmethod
+    def _axis(start: int, stop: int, cell: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Index of the cell centre at or before each position, and the
+        interpolation weight of the next one.
+        """
+        f = np.arange(start, stop, dtype=np.float32) * np.float32(1 / cell) - np.float32(0.5)
+        index = np.floor(f).astype(np.intp)
+        return index, f - index
+
+    @staticmethod
+    def _runs(index: np.ndarray) -> Iterator[Tuple[slice, int]]:
+        bounds = [0, *(np.flatnonzero(np.diff(index)) + 1), len(index)]
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            yield slice(start, stop), int(index[start])
+
+    def apply(self, values: np.ndarray, y0: int, x0: int) -> np.ndarray:
+        """
+        Equalize one tile, whose top-left corner is (y0, x0).
+        """
+        if self.luts is None:
+            self._build_luts()
+
+        h, w = values.shape
+        iy, ya = self._axis(y0, y0 + h, self.cell_h)
+        ix, xa = self._axis(x0, x0 + w, self.cell_w)
+        out = np.empty((h, w), dtype=np.uint8)
+
+        # Between two rows and two columns of cell centres the same four
+        # LUTs apply; outside the outermost centres they collapse to one
+        for rows, cy in self._runs(iy):
+            ty1, ty2 = max(cy, 0), min(cy + 1, self.gy - 1)
+            wy = ya[rows, None]
+            for cols, cx in self._runs(ix):
+                tx1, tx2 = max(cx, 0), min(cx + 1, self.gx - 1)
+                wx = xa[None, cols]
+                v = values[rows, cols]
+
+                def lut(ty: int, tx: int) -> np.ndarray:
+                    return cv2.LUT(v, self.luts[ty, tx]).astype(np.float32)
+
+                top = lut(ty1, tx1) * (1 - wx) + lut(ty1, tx2) * wx
+                bottom = lut(ty2, tx1) * (1 - wx) + lut(ty2, tx2) * wx
+                out[rows, cols] = np.clip(np.rint(top * (1 - wy) + bottom * wy), 0, 255)
+
+        return out
+
+
+def preprocess_tiled(image: np.ndarray, *, tile_size: int = TILE_SIZE, **params) -> np.ndarray:
+    """
+    preprocess_for_ocr for pages too large to hold its intermediates.
+
+    The local stages (grayscale, median, CLAHE, adaptive threshold) run on
+    overlapping tiles and are stitched into a single binary page; the only
+    page-sized arrays are the input, that page and, if the page is skewed,
+    its rotation. CLAHE needs statistics from the whole page, so tiles are
+    read twice: once to accumulate its per-cell histograms, once to apply
+    them. The deskew angle comes from estimate_skew_angle's small proxy.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        Raw input image.
+    tile_size : int
+        Side of the output tiles (default: TILE_SIZE).
+    **params
+        Preprocessing parameters, as for preprocess_for_ocr.
+
+    Returns
+    -------
+    np.ndarray
+        OCR-ready binary image, matching preprocess_for_ocr up to CLAHE
+        rounding.
+    """
+
+    _validate_image(image)
+
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise TypeError(f"Unknown preprocessing parameters: {sorted(unknown)}")
+
+    params = {**DEFAULT_PARAMS, **params}
+    _validate_params(params)
+
+    if tile_size <= 0:
+        raise ValueError("tile_size must be > 0")
+
+    h, w = image.shape[:2]
+    ksize = params["denoise_ksize"]
+    block_size = params["threshold_block_size"]
+    clahe = _TiledCLAHE((h, w), params["clahe_clip_limit"], tuple(params["clahe_tile_grid_size"]))
+
+    with PREPROCESS_STAGE_SECONDS.labels(stage="tiled_histograms").time():
+        for y0, y1, x0, x1 in _tiles(h, w, tile_size):
+            clahe.accumulate(_denoised(image, y0, y1, x0, x1, ksize), y0, x0)
+
+    binary = np.empty((h, w), dtype=np.uint8)
+    # Gaussian support of the threshold around each tile
+    r = block_size // 2
+
+    with PREPROCESS_STAGE_SECONDS.labels(stage="tiled_local").time():
+        for y0, y1, x0, x1 in _tiles(h, w, tile_size):
+            top, left = max(0, y0 - r), max(0, x0 - r)
+            bottom, right = min(h, y1 + r), min(w, x1 + r)
+
+            contrast = clahe.apply(_denoised(image, top, bottom, left, right, ksize), top, left)
+            thresholded = cv2.adaptiveThreshold(
+                contrast, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                block_size, params["threshold_C"],
+            )
+            binary[y0:y1, x0:x1] = thresholded[y0 - top:y1 - top, x0 - left:x1 - left]
+
+    with PREPROCESS_STAGE_SECONDS.labels(stage="deskew").time():
+        angle = estimate_skew_angle(binary)
+        if abs(angle) >= DESKEW_ANGLE_TOLERANCE:
+            # warpAffine works in small blocks; its only large allocation
+            # is the output page
+            M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+            binary = cv2.warpAffine(
+                binary, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE
+            )
+
+    target_width = params["target_width"]
+    if w == target_width:
+        return binary
+
+    with PREPROCESS_STAGE_SECONDS.labels(stage="resize").time():
+        size, interpolation = ocr_resize_plan(binary.shape, target_width)
+        return cv2.resize(binary, size, interpolation=interpolation)
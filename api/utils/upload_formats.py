@@ -0,0 +1,97 @@
+from typing import BinaryIO, Iterator, Sequence, Tuple, Union
+from PIL import Image, TiffImagePlugin
+import numpy as np
+import io, os
+
+
+# What process_document uploads to the provider:
+#   original - the file as received
+#   tiff_g4  - preprocessed pages as a multi-page 1-bit TIFF, CCITT G4
+#   pdf      - preprocessed pages as a bilevel PDF (CCITT G4 streams)
+UPLOAD_FORMATS = ("original", "tiff_g4", "pdf")
+DEFAULT_UPLOAD_FORMAT = os.getenv("OCR_UPLOAD_FORMAT", "original")
+
+# Resolution recorded in the container; pages are normalized to ~300 DPI
+UPLOAD_DPI = 300
+
+
+def _bilevel(pages: Sequence[np.ndarray]) -> Iterator[Image.Image]:
+    """
+    1-bit images of the pages, converted one at a time as consumed.
+    """
+    if not len(pages):
+        raise ValueError("No pages to encode")
+
+    for page in pages:
+        if page is None or len(page.shape) != 2:
+            raise ValueError("Pages must be binary images with shape (H, W)")
+        # Boolean arrays map straight to 1-bit images, without dithering
+        yield Image.fromarray(page > 127)
+
+
+def encode_tiff_g4(pages: Sequence[np.ndarray], path: Union[str, BinaryIO]) -> Union[str, BinaryIO]:
+    """
+    Write binary pages to a multi-page 1-bit TIFF with CCITT G4 compression.
+    `path` may be a file path or a writable binary file object. Pages are
+    converted and written one at a time.
+    """
+    with TiffImagePlugin.AppendingTiffWriter(path) as tiff:
+        for image in _bilevel(pages):
+            image.save(tiff, format="TIFF", compression="group4", dpi=(UPLOAD_DPI, UPLOAD_DPI))
+            tiff.newFrame()
+    return path
+
+
+def encode_bilevel_pdf(pages: Sequence[np.ndarray], path: Union[str, BinaryIO]) -> Union[str, BinaryIO]:
+    """
+    Write binary pages to a PDF of 1-bit, CCITT-compressed page images.
+    `path` may be a file path or a writable binary file object. PIL holds
+    every converted page until the PDF is written.
+    """
+    first, *rest = _bilevel(pages)
+    first.save(
+        path, format="PDF", save_all=True, append_images=rest,
+        resolution=UPLOAD_DPI,
+    )
+    return path
+
+
+_ENCODERS = {
+    "tiff_g4": ("document.tif", encode_tiff_g4),
+    "pdf": ("document.pdf", encode_bilevel_pdf),
+}
+
+
+def encode_pages(pages: Sequence[np.ndarray], upload_format: str) -> Tuple[str, bytes]:
+    """
+    Pack preprocessed pages in memory in the given upload format.
+
+    Parameters
+    ----------
+    pages : Sequence[np.ndarray]
+        Binary OCR-ready pages (H, W), values {0, 255}, e.g. a list or a
+        PageStore.
+    upload_format : str
+        "tiff_g4" or "pdf".
+
+    Returns
+    -------
+    tuple[str, bytes]
+        Upload filename and the encoded container.
+
+    Raises
+    ------
+    ValueError
+        If the format is unsupported or the pages are invalid.
+    """
+
+    if upload_format not in _ENCODERS:
+        raise ValueError(
+            f"Cannot encode pages as '{upload_format}', expected 'tiff_g4' or 'pdf'"
+        )
+
+    filename, encoder = _ENCODERS[upload_format]
+    buffer = io.BytesIO()
+    encoder(pages, buffer)
+
+    return filename, buffer.getvalue()
@@ -1 +1,3 @@
-from api.v1.models.user_model import User
+from api.v1.models.user import User
+from api.v1.models.scan_job import ScanJob
+from api.v1.models.ocr_cache import OCRCacheEntry
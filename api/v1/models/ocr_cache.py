@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, DateTime, JSON
+from datetime import datetime, timezone
+
+from api.db.database import Base
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class OCRCacheEntry(Base):
+    __tablename__ = "ocr_result_cache"
+
+    # sha256 of the uploaded bytes + action, extractor_id and options
+    cache_key = Column(String(64), primary_key=True)
+    result = Column(JSON, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
+    last_accessed_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Text, DateTime, JSON
+from datetime import datetime, timezone
+import uuid
+
+from api.db.database import Base
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class ScanJob(Base):
+    __tablename__ = "scan_jobs"
+
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    # queued | processing | processed | rejected | failed
+    status = Column(String(32), nullable=False, default="queued", index=True)
+    action = Column(String(32), nullable=False)
+    filename = Column(String(255), nullable=True)
+    provider = Column(String(64), nullable=True)
+    provider_job_id = Column(String(255), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow, nullable=False)
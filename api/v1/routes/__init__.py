@@ -1,6 +1,11 @@
 from api.v1.routes.scanner import scan_docs
+from api.v1.routes.webhooks import ocr_webhooks
+from api.ocr.webhooks import OCR_WEBHOOK_SECRET
 from fastapi import APIRouter
 
 api_version_one = APIRouter(prefix="/api/v1")
 
 api_version_one.include_router(scan_docs)
+# Unsigned callbacks could fail live jobs, so there is no route without a secret
+if OCR_WEBHOOK_SECRET:
+    api_version_one.include_router(ocr_webhooks)
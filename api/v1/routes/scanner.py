@@ -1,18 +1,40 @@
-from fastapi import APIRouter, File, UploadFile, status, Depends, HTTPException
-from api.utils.process_documents import process_document
-from api.v1.schemas.base import OCRRequest, OCRAction
+from fastapi import APIRouter, BackgroundTasks, File, Form, UploadFile, status, Depends, HTTPException
+from api.v1.services.scan_job import JOB_STORAGE_DIR, run_scan_batch, run_scan_job, scan_job_service
+from api.utils.admission import ADMISSION_QUEUE_TIMEOUT_SECONDS, AdmissionRejected
+from api.utils.batch import (
+    BATCH_CPU_CONCURRENCY,
+    BATCH_MAX_FILES,
+    BATCH_NETWORK_CONCURRENCY,
+    BatchLimits,
+    process_batch,
+)
+from api.utils.profile_predictor import profile_predictor
+from api.utils.process_documents import process_document_async
+from api.v1.schemas.base import AsyncOCRProvider, OCRDocument, OCRRequest, OCRAction
+from api.core.dependencies.ocr import get_ocr_provider
+from api.ocr.registry import provider_registry
+from fastapi.concurrency import run_in_threadpool
+from api.utils.upload_formats import UPLOAD_FORMATS
+from api.utils.result_cache import result_cache
+from typing import List, Optional
+from api.db.database import get_db
 from sqlalchemy.orm import Session
-import tempfile, shutil, uuid
+import tempfile, shutil, uuid, os
 from pathlib import Path
 
+SUPPORTED_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg", ".tiff"}
+
+# Uploads up to this size are processed from memory; larger ones spill to disk
+INMEMORY_UPLOAD_MAX_BYTES = int(os.getenv("INMEMORY_UPLOAD_MAX_BYTES", str(32 * 1024 * 1024)))
+
 
 scan_docs = APIRouter(tags=["scanner"], prefix="/scanner")
 
-# Endpoint to take either scanned images or documents for procesing
-@scan_docs.post("/process", status_code=status.HTTP_200_OK)
-def scan_document(
-    file: UploadFile = File(...)
-):
+
+def _validate_upload(file: UploadFile) -> str:
+    """
+    Reject empty or unsupported uploads; returns the file suffix.
+    """
     # Check to maeke sure something is actually uploaded
     if not file.filename:
         raise HTTPException(
@@ -22,42 +44,251 @@ def scan_document(
 
     # Check if the filetype is supported
     suffix = Path(file.filename).suffix.lower()
-    if suffix not in {".pdf", ".png", ".jpg", ".jpeg", ".tiff"}:
+    if suffix not in SUPPORTED_SUFFIXES:
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             detail=f"Unsupported file type: {suffix}",
         )
 
-    # Temporarily store the file and work on it
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)/f"{uuid.uuid4()}{suffix}"
+    return suffix
 
-        try:
-            with tmp_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
 
-            request = OCRRequest(
-                action=OCRAction.TRANSCRIBE
+def _validate_upload_format(upload_format: Optional[str]) -> Optional[str]:
+    if upload_format is not None and upload_format not in UPLOAD_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported upload format: {upload_format}",
+        )
+    return upload_format
+
+
+# Endpoint to take either scanned images or documents for procesing
+@scan_docs.post("/process", status_code=status.HTTP_200_OK)
+async def scan_document(
+    file: UploadFile = File(...),
+    upload_format: Optional[str] = Form(None),
+    provider: AsyncOCRProvider = Depends(get_ocr_provider),
+):
+    suffix = _validate_upload(file)
+    upload_format = _validate_upload_format(upload_format)
+
+    request = OCRRequest(
+        action=OCRAction.TRANSCRIBE,
+        upload_format=upload_format,
+    )
+
+    try:
+        if file.size is not None and file.size <= INMEMORY_UPLOAD_MAX_BYTES:
+            # Typical uploads are decoded straight from memory
+            document = OCRDocument(
+                filename=f"{uuid.uuid4()}{suffix}", data=await file.read()
             )
 
-            result = process_document(
-                path = str(tmp_path),
-                request=request
+            result = await process_document_async(
+                path=document,
+                request=request,
+                provider=provider,
+                admission_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
             )
 
-        except Exception as e:
+        else:
+            # Temporarily store large files and work on them from disk
+            with tempfile.TemporaryDirectory() as tmpdir:
+                tmp_path = Path(tmpdir)/f"{uuid.uuid4()}{suffix}"
+
+                with tmp_path.open("wb") as buffer:
+                    await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+
+                result = await process_document_async(
+                    path = str(tmp_path),
+                    request=request,
+                    provider=provider,
+                    admission_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                )
+
+    except AdmissionRejected as e:
+        # Over this worker's memory budget: the client should back off
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Server busy: {e}",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing document: {e}"
+        )
+
+    return {
+        "job_id": result.job_id,
+        # A cached result's job_id belongs to the request that produced it
+        "cached": result.cached,
+        "pages": [
+            {
+                "page": i + 1,
+                "text": text,
+            }
+            for i, text in enumerate(result.pages)
+        ]
+    }
+
+
+# Queue a document and return immediately; poll GET /jobs/{job_id} for results
+@scan_docs.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_scan_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    upload_format: Optional[str] = Form(None),
+    provider: AsyncOCRProvider = Depends(get_ocr_provider),
+    db: Session = Depends(get_db),
+):
+    suffix = _validate_upload(file)
+
+    request = OCRRequest(
+        action=OCRAction.TRANSCRIBE,
+        upload_format=_validate_upload_format(upload_format),
+    )
+
+    job = await run_in_threadpool(
+        scan_job_service.create, db, request.action.value, file.filename
+    )
+
+    # Keep the upload until the background job has finished with it
+    os.makedirs(JOB_STORAGE_DIR, exist_ok=True)
+    path = Path(JOB_STORAGE_DIR)/f"{job.job_id}{suffix}"
+
+    with path.open("wb") as buffer:
+        await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+
+    background_tasks.add_task(run_scan_job, job.job_id, str(path), request, provider)
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+    }
+
+
+# Many documents in one request. By default waits and returns per-document
+# results plus batch throughput; with as_jobs=true returns job ids at once.
+@scan_docs.post("/batch", status_code=status.HTTP_200_OK)
+async def scan_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    upload_format: Optional[str] = Form(None),
+    as_jobs: bool = Form(False),
+    cpu_concurrency: Optional[int] = Form(None),
+    network_concurrency: Optional[int] = Form(None),
+    provider: AsyncOCRProvider = Depends(get_ocr_provider),
+    db: Session = Depends(get_db),
+):
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {BATCH_MAX_FILES} files",
+        )
+
+    suffixes = [_validate_upload(file) for file in files]
+
+    request = OCRRequest(
+        action=OCRAction.TRANSCRIBE,
+        upload_format=_validate_upload_format(upload_format),
+    )
+
+    # Callers may lower the server's concurrency limits, never raise them
+    for name, value, limit in (
+        ("cpu_concurrency", cpu_concurrency, BATCH_CPU_CONCURRENCY),
+        ("network_concurrency", network_concurrency, BATCH_NETWORK_CONCURRENCY),
+    ):
+        if value is not None and value > limit:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error processing document: {e}"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{name} must be <= {limit}",
             )
 
+    try:
+        limits = BatchLimits(
+            **{k: v for k, v in (
+                ("cpu_concurrency", cpu_concurrency),
+                ("network_concurrency", network_concurrency),
+            ) if v is not None}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if as_jobs:
+        os.makedirs(JOB_STORAGE_DIR, exist_ok=True)
+        jobs = []
+
+        for file, suffix in zip(files, suffixes):
+            job = await run_in_threadpool(
+                scan_job_service.create, db, request.action.value, file.filename
+            )
+            path = Path(JOB_STORAGE_DIR)/f"{job.job_id}{suffix}"
+
+            with path.open("wb") as buffer:
+                await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+
+            jobs.append((job.job_id, str(path)))
+
+        background_tasks.add_task(run_scan_batch, jobs, request, provider, limits)
+
         return {
-            "job_id": result.job_id,
-            "pages": [
-                {
-                    "page": i + 1,
-                    "text": text,
-                }
-                for i, text in enumerate(result.pages)
+            "jobs": [
+                {"filename": file.filename, "job_id": job_id, "status": "queued"}
+                for file, (job_id, _) in zip(files, jobs)
             ]
         }
+
+    # Large uploads are spooled here, as /process does, instead of being
+    # read into memory
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        def loader(file: UploadFile, suffix: str):
+            async def load() -> OCRDocument:
+                filename = f"{uuid.uuid4()}{suffix}"
+                if file.size is not None and file.size <= INMEMORY_UPLOAD_MAX_BYTES:
+                    return OCRDocument(filename=filename, data=await file.read())
+
+                tmp_path = Path(tmpdir)/filename
+                with tmp_path.open("wb") as buffer:
+                    await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+                return OCRDocument.coerce(str(tmp_path))
+            return load
+
+        return await process_batch(
+            [(file.filename, loader(file, suffix)) for file, suffix in zip(files, suffixes)],
+            request,
+            provider,
+            limits,
+        )
+
+
+@scan_docs.get("/jobs/{job_id}", status_code=status.HTTP_200_OK)
+def get_scan_job(job_id: str, db: Session = Depends(get_db)):
+    job = scan_job_service.fetch(db, job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}",
+        )
+
+    return scan_job_service.to_response(job)
+
+
+# Hit/miss counters for the content-addressed OCR result cache
+@scan_docs.get("/cache/stats", status_code=status.HTTP_200_OK)
+def get_cache_stats():
+    return result_cache.stats()
+
+
+@scan_docs.get("/profiles/stats", status_code=status.HTTP_200_OK)
+def get_profile_stats():
+    return profile_predictor.stats()
+
+
+# Circuit state, latency and error rate of each routed OCR provider
+@scan_docs.get("/providers/stats", status_code=status.HTTP_200_OK)
+def get_provider_stats():
+    return provider_registry.stats()
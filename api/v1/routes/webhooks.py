@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from typing import Optional
+from api.ocr.webhooks import OCR_WEBHOOK_SIGNATURE_HEADER, job_waiters, parse_callback, verify_callback
+import json
+
+
+ocr_webhooks = APIRouter(tags=["webhooks"], prefix="/webhooks")
+
+# Provider callback: completes the matching waiting job immediately.
+# Only mounted when OCR_WEBHOOK_SECRET is set (see api.v1.routes)
+@ocr_webhooks.post("/ocr", status_code=status.HTTP_200_OK)
+async def ocr_callback(
+    request: Request,
+    signature: Optional[str] = Header(None, alias=OCR_WEBHOOK_SIGNATURE_HEADER),
+):
+    body = await request.body()
+    if not verify_callback(body, signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature",
+        )
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+
+    if not isinstance(payload, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Webhook body must be a JSON object",
+        )
+
+    provider_job_id, job_status = parse_callback(payload)
+    if not provider_job_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Webhook body is missing the document id",
+        )
+
+    # Non-terminal updates are acknowledged but do not wake anyone
+    matched = False
+    if job_status is not None:
+        matched = job_waiters.complete(provider_job_id, job_status, payload)
+
+    return {"received": True, "matched": matched}
@@ -1,11 +1,20 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
+from email.utils import parsedate_to_datetime
 from abc import ABC, abstractmethod
 from dotenv import load_dotenv
-import uuid, requests, os
+import asyncio, time, uuid, requests, httpx, os
 from enum import Enum
 load_dotenv(".env")
 
-HANDWRITING_OCR_API_URL = "https://www.handwritingocr.com/api/v3/documents"
+# Overridable to point at a stand-in such as api.ocr.fake_server
+HANDWRITING_OCR_API_URL = os.getenv(
+    "HANDWRITING_OCR_API_URL", "https://www.handwritingocr.com/api/v3/documents"
+)
+
+# Connection pool for the shared async client (see create_http_client)
+OCR_HTTP_MAX_CONNECTIONS = int(os.getenv("OCR_HTTP_MAX_CONNECTIONS", "100"))
+OCR_HTTP_MAX_KEEPALIVE = int(os.getenv("OCR_HTTP_MAX_KEEPALIVE", "20"))
+OCR_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OCR_HTTP_KEEPALIVE_EXPIRY", "30"))
 
 
 class OCRAction(Enum):
@@ -37,12 +46,56 @@ class OCRRequest:
         extractor_id: Optional[str] = None,
         webhook_url: Optional[str] = None,
         options: Optional[Dict[str, Any]] = None,
+        upload_format: Optional[str] = None,
     ):
         self.action = action
         #self.language = language
         self.extractor_id = extractor_id
         self.webhook_url = webhook_url
         self.options = options or {}
+        # "original", "tiff_g4" or "pdf"; None uses OCR_UPLOAD_FORMAT
+        self.upload_format = upload_format
+
+
+class OCRDocument:
+    """
+    An uploaded document, held in memory or stored at a path on disk.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        data: Optional[bytes] = None,
+        path: Optional[str] = None,
+    ):
+        if (data is None) == (path is None):
+            raise ValueError("OCRDocument needs exactly one of data or path")
+
+        self.filename = filename
+        self.data = data
+        self.path = path
+
+    @classmethod
+    def coerce(cls, document: Union[str, "OCRDocument"]) -> "OCRDocument":
+        if isinstance(document, OCRDocument):
+            return document
+        return cls(filename=os.path.basename(document), path=document)
+
+    @property
+    def suffix(self) -> str:
+        return os.path.splitext(self.filename)[1].lower()
+
+    def exists(self) -> bool:
+        return self.data is not None or os.path.exists(self.path)
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def __str__(self) -> str:
+        return self.path or self.filename
 
 
 class OCRJob:
@@ -50,6 +103,8 @@ class OCRJob:
         self.job_id = job_id  # internal UUID
         self.provider = provider  # e.g. "handwritingocr"
         self.provider_job_id = provider_job_id
+        # Seconds the provider asked us to wait before polling again
+        self.retry_after: Optional[float] = None
 
 
 class OCRStatus(Enum):
@@ -74,6 +129,25 @@ class OCRPageResult:
         self.fields = fields or {}
         self.confidence = confidence
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OCRPageResult":
+        return cls(
+            page_number=data["page_number"],
+            text=data.get("text"),
+            tables=data.get("tables"),
+            fields=data.get("fields"),
+            confidence=data.get("confidence"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "page_number": self.page_number,
+            "text": self.text,
+            "tables": self.tables,
+            "fields": self.fields,
+            "confidence": self.confidence,
+        }
+
 
 class OCRResult:
     def __init__(
@@ -81,10 +155,34 @@ class OCRResult:
         job_id: str,
         pages: List[OCRPageResult],
         raw_provider_response: Optional[Dict[str, Any]] = None,
+        preprocessing: Optional[List[Dict[str, Any]]] = None,
+        cached: bool = False,
     ):
         self.job_id = job_id
         self.pages = pages
         self.raw_provider_response = raw_provider_response
+        # Per-page decode path and quality outcome of our own preprocessing
+        self.preprocessing = preprocessing or []
+        # Served from the result cache: job_id is the provider job that
+        # originally produced it, not one made for this request
+        self.cached = cached
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OCRResult":
+        return cls(
+            job_id=data["job_id"],
+            pages=[OCRPageResult.from_dict(page) for page in data.get("pages", [])],
+            preprocessing=data.get("preprocessing"),
+            cached=data.get("cached", False),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "pages": [page.to_dict() for page in self.pages],
+            "preprocessing": self.preprocessing,
+            "cached": self.cached,
+        }
 
 
 class OCRProvider(ABC):
@@ -100,7 +198,7 @@ class OCRProvider(ABC):
         pass
 
     @abstractmethod
-    def submit(self, document_path: str, request: OCRRequest) -> OCRJob:
+    def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
         pass
 
     @abstractmethod
@@ -111,22 +209,102 @@ class OCRProvider(ABC):
     def fetch_result(self, job: OCRJob) -> OCRResult:
         pass
 
+
+class AsyncOCRProvider(ABC):
+    """
+    Non-blocking counterpart of OCRProvider for use from async routes.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def capabilities(self) -> OCRCapabilities:
+        pass
+
+    @abstractmethod
+    async def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        pass
+
+    @abstractmethod
+    async def get_status(self, job: OCRJob) -> OCRStatus:
+        pass
+
+    @abstractmethod
+    async def fetch_result(self, job: OCRJob) -> OCRResult:
+        pass
+
 class OCRRejected(Exception):
     pass
 
 
-class HandwritingOCRProvider(OCRProvider):
+class OCRRequestError(ValueError):
     """
-    HandwritingOCR v3 provider implementation.
+    The request itself is invalid; every provider would refuse it.
     """
 
-    def __init__(self, api_key: str | None = None):
+
+def check_submit_request(document: OCRDocument, request: OCRRequest) -> None:
+    """
+    Raise if `document` and `request` cannot be submitted to any provider.
+    """
+    if not document.exists():
+        raise FileNotFoundError(str(document))
+
+    if request.action == OCRAction.EXTRACT and not request.extractor_id:
+        raise OCRRequestError("extractor_id is required when action='extractor'")
+
+
+def create_http_client(
+    max_connections: int = OCR_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = OCR_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry: float = OCR_HTTP_KEEPALIVE_EXPIRY,
+) -> httpx.AsyncClient:
+    """
+    Build the long-lived pooled client shared by async OCR providers.
+
+    Created once per application (see the lifespan in main.py) so TLS
+    connections are kept alive and reused across requests. Timeouts are
+    set per call by the providers.
+    """
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+
+
+class _HandwritingOCRBase:
+    """
+    Request building and response parsing shared by the sync and async
+    HandwritingOCR v3 providers. Responses may come from requests or
+    httpx; only status_code, text and json() are used.
+    """
+
+    # Per-call timeouts (seconds)
+    SUBMIT_TIMEOUT = 60
+    STATUS_TIMEOUT = 30
+    RESULT_TIMEOUT = 60
+
+    def __init__(
+        self, api_key: str | None = None, api_url: str | None = None,
+        name: str = "handwritingocr"
+    ):
         self.api_key = api_key or os.getenv("HANDWRITING_OCR_API_KEY")
         if not self.api_key:
             raise RuntimeError("HANDWRITING_OCR_API_KEY not configured")
+        self.api_url = api_url or HANDWRITING_OCR_API_URL
+        # Distinct names let several accounts or endpoints be routed between
+        self._name = name
 
-        # Minimal in-memory job tracking (temporary)
-        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Final status responses, kept so fetch_result need not GET again
+        self._final: Dict[str, Any] = {}
 
     # ------------------------------------------------------------------
     # Provider metadata
@@ -134,7 +312,7 @@ class HandwritingOCRProvider(OCRProvider):
 
     @property
     def name(self) -> str:
-        return "handwritingocr"
+        return self._name
 
     @property
     def capabilities(self) -> OCRCapabilities:
@@ -147,26 +325,18 @@ class HandwritingOCRProvider(OCRProvider):
         )
 
     # ------------------------------------------------------------------
-    # Core API calls
+    # Request / response helpers
     # ------------------------------------------------------------------
 
-    def submit(self, document_path: str, request: OCRRequest) -> OCRJob:
-        """
-        Upload a document and queue it for OCR processing.
-        """
-
-        if not os.path.exists(document_path):
-            raise FileNotFoundError(document_path)
-
-        # Validate request
-        if request.action.value == "extractor" and not request.extractor_id:
-            raise ValueError("extractor_id is required when action='extractor'")
-
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "application/json",
         }
 
+    def _submit_data(self, document: OCRDocument, request: OCRRequest) -> Dict[str, Any]:
+        check_submit_request(document, request)
+
         data = {
             "action": request.action.value,
         }
@@ -181,17 +351,9 @@ class HandwritingOCRProvider(OCRProvider):
             # Allow future extension (delete_after, etc.)
             data.update(request.options)
 
-        with open(document_path, "rb") as f:
-            files = {"file": f}
-
-            response = requests.post(
-                HANDWRITING_OCR_API_URL,
-                headers=headers,
-                files=files,
-                data=data,
-                timeout=60,
-            )
+        return data
 
+    def _parse_submit(self, response) -> OCRJob:
         if response.status_code != 201:
             raise RuntimeError(
                 f"HandwritingOCR submit failed "
@@ -204,67 +366,57 @@ class HandwritingOCRProvider(OCRProvider):
         if not provider_job_id:
             raise RuntimeError("Invalid response: missing document id")
 
-        # Track job locally (temporary)
-        #self._jobs[provider_job_id] = {
-        #    "status": OCRStatus.QUEUED,
-        #    "raw": payload,
-        #}
-
         return OCRJob(
             job_id=str(uuid.uuid4()),
             provider=self.name,
             provider_job_id=provider_job_id,
         )
 
-    # ------------------------------------------------------------------
-    # Placeholder lifecycle methods (next step)
-    # ------------------------------------------------------------------
-
-    def get_status(self, job: OCRJob) -> OCRStatus:
-        """
-        Retrieve processing status for a document.
-        """
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-        }
-
-        response = requests.get(
-            f"{HANDWRITING_OCR_API_URL}/{job.provider_job_id}",
-            headers=headers,
-            timeout=30,
-        )
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _parse_status(self, job: OCRJob, response) -> OCRStatus:
+        job.retry_after = self._retry_after(response)
+
+        # Throttled or briefly unavailable: the job is unaffected, keep waiting
+        if response.status_code in (429, 503):
+            return OCRStatus.PROCESSING
 
         if response.status_code == 200:
             payload = response.json()
             status = payload.get("status")
             if status == "processed":
+                # The status document already carries the results
+                self._final[job.provider_job_id] = response
                 return OCRStatus.PROCESSED
+            if status == "failed":
+                return OCRStatus.FAILED
             return OCRStatus.PROCESSING
 
-
         raise RuntimeError(
             f"Unexpected status check response "
             f"(status={response.status_code}): {response.text}"
         )
 
-    def fetch_result(self, job: OCRJob) -> OCRResult:
+    def _final_response(self, job: OCRJob):
         """
-        Fetch finalized OCR result as normalized OCRResult.
+        The processed status response for `job`, if one was seen; taken
+        once, so a later fetch goes back to the provider.
         """
+        return self._final.pop(job.provider_job_id, None)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-        }
-
-        response = requests.get(
-            f"{HANDWRITING_OCR_API_URL}/{job.provider_job_id}",
-            headers=headers,
-            timeout=60,
-        )
-
+    def _parse_result(self, job: OCRJob, response) -> OCRResult:
         if response.status_code == 202:
             raise RuntimeError("OCR job is still processing")
 
@@ -328,8 +480,153 @@ class HandwritingOCRProvider(OCRProvider):
                 )
             )
 
+
         return OCRResult(
             job_id=job.job_id,
             pages=pages,
             raw_provider_response=payload,
         )
+
+
+class HandwritingOCRProvider(_HandwritingOCRBase, OCRProvider):
+    """
+    HandwritingOCR v3 provider implementation.
+    """
+
+    # ------------------------------------------------------------------
+    # Core API calls
+    # ------------------------------------------------------------------
+
+    def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        """
+        Upload a document and queue it for OCR processing.
+        """
+
+        document = OCRDocument.coerce(document)
+        data = self._submit_data(document, request)
+
+        if document.data is not None:
+            response = requests.post(
+                self.api_url,
+                headers=self._headers(),
+                files={"file": (document.filename, document.data)},
+                data=data,
+                timeout=self.SUBMIT_TIMEOUT,
+            )
+        else:
+            with open(document.path, "rb") as f:
+                files = {"file": f}
+
+                response = requests.post(
+                    self.api_url,
+                    headers=self._headers(),
+                    files=files,
+                    data=data,
+                    timeout=self.SUBMIT_TIMEOUT,
+                )
+
+        return self._parse_submit(response)
+
+    def get_status(self, job: OCRJob) -> OCRStatus:
+        """
+        Retrieve processing status for a document.
+        """
+
+        response = requests.get(
+            f"{self.api_url}/{job.provider_job_id}",
+            headers=self._headers(),
+            timeout=self.STATUS_TIMEOUT,
+        )
+
+        return self._parse_status(job, response)
+
+    def fetch_result(self, job: OCRJob) -> OCRResult:
+        """
+        Fetch finalized OCR result as normalized OCRResult, reusing the
+        final status response when there is one.
+        """
+
+        response = self._final_response(job)
+        if response is None:
+            response = requests.get(
+                f"{self.api_url}/{job.provider_job_id}",
+                headers=self._headers(),
+                timeout=self.RESULT_TIMEOUT,
+            )
+
+        return self._parse_result(job, response)
+
+
+class AsyncHandwritingOCRProvider(_HandwritingOCRBase, AsyncOCRProvider):
+    """
+    HandwritingOCR v3 provider on a shared, pooled httpx.AsyncClient.
+
+    The client is owned by the application (see create_http_client); the
+    provider itself is cheap and may be built per request.
+    """
+
+    def __init__(
+        self, client: httpx.AsyncClient, api_key: str | None = None,
+        api_url: str | None = None, name: str = "handwritingocr"
+    ):
+        super().__init__(api_key, api_url, name)
+        self.client = client
+
+    async def submit(self, document: Union[str, OCRDocument], request: OCRRequest) -> OCRJob:
+        """
+        Upload a document and queue it for OCR processing.
+        """
+
+        document = OCRDocument.coerce(document)
+        data = self._submit_data(document, request)
+
+        if document.data is not None:
+            response = await self._post_file(document.filename, document.data, data)
+        else:
+            # Files on disk (e.g. spilled large uploads) stream from the
+            # handle in chunks rather than being read into memory first
+            f = await asyncio.to_thread(open, document.path, "rb")
+            try:
+                response = await self._post_file(document.filename, f, data)
+            finally:
+                f.close()
+
+        return self._parse_submit(response)
+
+    async def _post_file(self, filename: str, content, data: Dict[str, Any]):
+        return await self.client.post(
+            self.api_url,
+            headers=self._headers(),
+            files={"file": (filename, content)},
+            data=data,
+            timeout=self.SUBMIT_TIMEOUT,
+        )
+
+    async def get_status(self, job: OCRJob) -> OCRStatus:
+        """
+        Retrieve processing status for a document.
+        """
+
+        response = await self.client.get(
+            f"{self.api_url}/{job.provider_job_id}",
+            headers=self._headers(),
+            timeout=self.STATUS_TIMEOUT,
+        )
+
+        return self._parse_status(job, response)
+
+    async def fetch_result(self, job: OCRJob) -> OCRResult:
+        """
+        Fetch finalized OCR result as normalized OCRResult, reusing the
+        final status response when there is one.
+        """
+
+        response = self._final_response(job)
+        if response is None:
+            response = await self.client.get(
+                f"{self.api_url}/{job.provider_job_id}",
+                headers=self._headers(),
+                timeout=self.RESULT_TIMEOUT,
+            )
+
+        return self._parse_result(job, response)
@@ -0,0 +1,142 @@
+from api.utils.process_documents import process_document_async
+from api.utils.batch import BatchLimits
+from api.v1.schemas.base import AsyncOCRProvider, OCRJob, OCRRejected, OCRRequest
+from api.core.base.services import Service
+from api.db.database import SessionLocal
+from api.v1.models.scan_job import ScanJob
+from sqlalchemy.orm import Session
+from typing import Any, List, Optional, Tuple
+import asyncio, os, tempfile
+
+
+# Uploads must outlive the submitting request, so they are kept here until
+# their job finishes.
+JOB_STORAGE_DIR = os.getenv(
+    "JOB_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "questscan_jobs")
+)
+
+
+class ScanJobService(Service):
+    """
+    Persistence for asynchronous scan jobs.
+    """
+
+    def create(self, db: Session, action: str, filename: Optional[str] = None) -> ScanJob:
+        job = ScanJob(action=action, filename=filename, status="queued")
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def fetch(self, db: Session, job_id: str) -> Optional[ScanJob]:
+        return db.get(ScanJob, job_id)
+
+    def fetch_all(self, db: Session, status: Optional[str] = None) -> List[ScanJob]:
+        query = db.query(ScanJob)
+        if status:
+            query = query.filter(ScanJob.status == status)
+        return query.order_by(ScanJob.created_at.desc()).all()
+
+    def update(self, db: Session, job_id: str, **fields: Any) -> Optional[ScanJob]:
+        job = db.get(ScanJob, job_id)
+        if job is None:
+            return None
+
+        for key, value in fields.items():
+            setattr(job, key, value)
+
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def delete(self, db: Session, job_id: str) -> bool:
+        job = db.get(ScanJob, job_id)
+        if job is None:
+            return False
+
+        db.delete(job)
+        db.commit()
+        return True
+
+    def to_response(self, job: ScanJob) -> dict:
+        response = {
+            "job_id": job.job_id,
+            "status": job.status,
+            "filename": job.filename,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+        }
+
+        if job.status == "processed":
+            response["result"] = job.result
+        elif job.error:
+            response["error"] = job.error
+
+        return response
+
+
+scan_job_service = ScanJobService()
+
+
+def _update(job_id: str, **fields: Any) -> None:
+    db = SessionLocal()
+    try:
+        scan_job_service.update(db, job_id, **fields)
+    finally:
+        db.close()
+
+
+async def run_scan_job(
+    job_id: str, path: str, request: OCRRequest, provider: AsyncOCRProvider,
+    cpu_slots: Optional[asyncio.Semaphore] = None
+) -> None:
+    """
+    Process a stored upload and record the outcome on its ScanJob row.
+    Runs after the submitting request has returned.
+    """
+
+    async def on_submit(job: OCRJob) -> None:
+        await asyncio.to_thread(
+            _update, job_id, provider=job.provider, provider_job_id=job.provider_job_id
+        )
+
+    try:
+        await asyncio.to_thread(_update, job_id, status="processing")
+
+        result = await process_document_async(
+            path, request, provider, on_submit=on_submit, cpu_slots=cpu_slots
+        )
+
+        await asyncio.to_thread(
+            _update, job_id, status="processed", result=result.to_dict()
+        )
+
+    except OCRRejected as e:
+        await asyncio.to_thread(_update, job_id, status="rejected", error=str(e))
+
+    except Exception as e:
+        await asyncio.to_thread(
+            _update, job_id, status="failed", error=f"Error processing document: {e}"
+        )
+
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def run_scan_batch(
+    jobs: List[Tuple[str, str]], request: OCRRequest, provider: AsyncOCRProvider,
+    limits: Optional[BatchLimits] = None
+) -> None:
+    """
+    Run stored (job_id, path) uploads under shared CPU and network limits.
+    """
+
+    limits = limits or BatchLimits()
+    limited = limits.wrap(provider)
+
+    async def run(job_id: str, path: str) -> None:
+        async with limits.in_flight:
+            await run_scan_job(job_id, path, request, limited, cpu_slots=limits.cpu)
+
+    await asyncio.gather(*(run(job_id, path) for job_id, path in jobs))
@@ -0,0 +1,114 @@
+"""
+Compare the projection-profile deskew estimator against the original
+full-resolution minAreaRect method on the sample pages in tests/.
+
+Each page is binarized, rotated by a set of known angles and, optionally,
+upscaled to OCR width (2480 px) so timings reflect real page sizes. The
+sample pages carry some native skew of their own, so accuracy is measured
+as how well each method tracks the applied rotation relative to its own
+estimate for the unrotated page.
+
+    python benchmarks/deskew_benchmark.py
+"""
+
+import os, sys, time
+import numpy as np
+import cv2
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(project_root)
+
+from api.pdf.extract_pages import pdf_to_images
+from api.preprocessing.deskew import estimate_skew_angle
+from api.preprocessing.grayscale import grayscale
+from api.preprocessing.threshold import adaptive_threshold
+
+SKEW_ANGLES = [-10.0, -4.5, -1.0, 0.0, 0.5, 2.0, 7.0]
+PAGE_WIDTHS = [None, 2480]
+REPEATS = 3
+
+
+def legacy_angle(image: np.ndarray) -> float:
+    """
+    Correction angle computed exactly as the original deskew() did.
+    """
+    coords = np.column_stack(np.where(image > 0))
+    if coords.size == 0:
+        return 0.0
+
+    angle = cv2.minAreaRect(coords)[-1]
+
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+
+    return angle
+
+
+def load_pages():
+    pages = [("test_image.png", cv2.imread(os.path.join(project_root, "tests", "test_image.png")))]
+    for i, page in enumerate(pdf_to_images(os.path.join(project_root, "tests", "test_doc.pdf")), start=1):
+        pages.append((f"test_doc.pdf#{i}", page))
+    return pages
+
+
+def rotate(binary: np.ndarray, angle: float) -> np.ndarray:
+    h, w = binary.shape
+    pad = int(0.15 * max(h, w))
+    # Pad with paper so rotated text stays on the page
+    canvas = cv2.copyMakeBorder(binary, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+    ch, cw = canvas.shape
+    M = cv2.getRotationMatrix2D((cw // 2, ch // 2), angle, 1.0)
+    return cv2.warpAffine(canvas, M, (cw, ch), flags=cv2.INTER_NEAREST, borderValue=255)
+
+
+def timed(func, image):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        value = func(image)
+        best = min(best, time.perf_counter() - start)
+    return value, best
+
+
+def main() -> None:
+    rows = []
+
+    for name, page in load_pages():
+        binary = adaptive_threshold(grayscale(page))
+
+        for width in PAGE_WIDTHS:
+            base = binary
+            if width:
+                scale = width / binary.shape[1]
+                base = cv2.resize(binary, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+            straight = rotate(base, 0.0)
+            legacy_native = legacy_angle(straight)
+            fast_native = estimate_skew_angle(straight)
+
+            for skew in SKEW_ANGLES:
+                image = rotate(base, skew)
+                # Rotating by `skew` adds -skew to the needed correction
+                legacy, legacy_t = timed(legacy_angle, image)
+                fast, fast_t = timed(estimate_skew_angle, image)
+
+                legacy_err = abs(legacy - legacy_native + skew)
+                fast_err = abs(fast - fast_native + skew)
+
+                rows.append((name, image.shape, skew, legacy_err, legacy_t, fast_err, fast_t))
+
+    print(f"{'page':<16}{'size':>12}{'skew':>7}{'legacy err':>12}{'legacy ms':>11}{'fast err':>10}{'fast ms':>9}")
+    for name, shape, skew, l_err, l_t, f_err, f_t in rows:
+        size = f"{shape[1]}x{shape[0]}"
+        print(f"{name:<16}{size:>12}{skew:>7.1f}{l_err:>12.2f}{l_t * 1000:>11.1f}{f_err:>10.2f}{f_t * 1000:>9.1f}")
+
+    legacy_err = np.mean([r[3] for r in rows])
+    fast_err = np.mean([r[5] for r in rows])
+    speedup = sum(r[4] for r in rows) / sum(r[6] for r in rows)
+    print(f"\nmean abs error: legacy {legacy_err:.2f} deg, fast {fast_err:.2f} deg; total speedup {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Micro-benchmarks for the preprocessing stages, the full pipeline, quality
+scoring and PDF rasterization, with a JSON regression baseline.
+
+Pages are synthetic and deterministic. They cover several sizes (phone
+photo, A4 at 300 DPI, A3 at 600 DPI), noise levels and skew angles. Each
+case records the best wall time over a few repeats and the peak memory
+traced during one run. tracemalloc sees NumPy allocations, which include
+every array OpenCV returns, but not OpenCV's internal scratch buffers.
+
+    python benchmarks/preprocessing_benchmark.py                 # compare to baseline
+    python benchmarks/preprocessing_benchmark.py --update        # record a new baseline
+    python benchmarks/preprocessing_benchmark.py --quick -k deskew
+
+Comparing exits with status 1 if any case is slower or uses more memory
+than the baseline allows. Timings depend on the machine and its load, so
+record the baseline on the machine that runs the comparison, while it is
+otherwise idle.
+"""
+
+import argparse, json, os, sys, time, tracemalloc
+from typing import Callable, Dict, Iterator, List, Tuple
+import numpy as np
+import cv2
+import fitz
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(project_root)
+
+from api.pdf.extract_pages import pdf_to_images
+from api.preprocessing.denoise import median_denoise
+from api.preprocessing.deskew import deskew, estimate_skew_angle
+from api.preprocessing.enhance_contrast import enhance_contrast
+from api.preprocessing.grayscale import grayscale
+from api.preprocessing.resize import resize_to_ocr
+from api.preprocessing.threshold import adaptive_threshold
+from api.quality.quality_score import compute_quality_score
+from api.utils.pipeline import preprocess_for_ocr
+from api.utils.tiled import preprocess_tiled
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "preprocessing_baseline.json")
+
+# Allowed slowdown / memory growth relative to the baseline
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+# Timings below this are dominated by noise and never fail the comparison
+MIN_COMPARABLE_SECONDS = 0.005
+MIN_COMPARABLE_BYTES = 2**20
+
+REPEATS = 3
+
+# (name, (height, width), colour, noise sigma, skew degrees, text scale)
+PAGES = [
+    ("phone_clean", (4032, 3024), True, 4.0, 0.0, 2.4),
+    ("phone_noisy_skewed", (4032, 3024), True, 18.0, 4.0, 2.4),
+    ("a4_300dpi_clean", (3508, 2480), False, 2.0, 0.0, 1.6),
+    ("a4_300dpi_noisy", (3508, 2480), False, 14.0, 1.5, 1.6),
+    ("a4_300dpi_skewed", (3508, 2480), False, 4.0, 8.0, 1.6),
+    ("a3_600dpi", (9933, 7016), False, 6.0, 2.0, 4.5),
+]
+# Pages skipped by --quick
+LARGE_PAGES = {"a3_600dpi"}
+# PDF rasterization is benchmarked on these pages, embedded as JPEG
+PDF_PAGES = {"a4_300dpi_clean", "a4_300dpi_noisy"}
+
+
+def synthetic_page(shape: Tuple[int, int], colour: bool, noise: float,
+                   skew: float, text_scale: float, seed: int = 0) -> np.ndarray:
+    """
+    Page of text lines with uneven lighting, sensor noise and a rotation.
+    """
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    thickness = max(1, round(text_scale * 2))
+    line_gap = int(36 * text_scale)
+
+    page = np.full((h, w), 255, np.uint8)
+    for y in range(line_gap * 3, h - line_gap * 2, line_gap):
+        cv2.putText(page, "The quick brown fox jumps over the lazy dog 0123",
+                    (w // 16, y), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, text_scale, 40, thickness)
+
+    if skew:
+        M = cv2.getRotationMatrix2D((w / 2, h / 2), skew, 1.0)
+        page = cv2.warpAffine(page, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+
+    # Brighter in the middle, as under a lamp or a phone flash
+    yy, xx = np.ogrid[-1:1:complex(0, h), -1:1:complex(0, w)]
+    light = (1.0 - 0.18 * (xx ** 2 + yy ** 2)).astype(np.float32)
+    page = page.astype(np.float32) * light
+
+    if colour:
+        page = np.dstack([page * 0.92, page * 0.97, page])
+
+    page += rng.normal(0, noise, page.shape).astype(np.float32)
+    return np.clip(page, 0, 255).astype(np.uint8)
+
+
+def pdf_bytes(image: np.ndarray, dpi: int = 300) -> bytes:
+    """
+    Single-page PDF embedding `image` as JPEG, sized for `dpi`.
+    """
+    h, w = image.shape[:2]
+    doc = fitz.open()
+    page = doc.new_page(width=w * 72 / dpi, height=h * 72 / dpi)
+    page.insert_image(page.rect, stream=cv2.imencode(".jpg", image)[1].tobytes())
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def build_cases(quick: bool) -> Iterator[Tuple[str, Callable[[], object]]]:
+    """
+    Yield (case name, zero-argument callable) for every benchmark case.
+    Inputs for each stage are prepared up front so only the stage is timed;
+    one page is held at a time.
+    """
+    for name, shape, colour, noise, skew, text_scale in PAGES:
+        if quick and name in LARGE_PAGES:
+            continue
+
+        raw = synthetic_page(shape, colour, noise, skew, text_scale)
+        gray = grayscale(raw)
+        denoised = median_denoise(gray)
+        contrast = enhance_contrast(denoised)
+        binary = adaptive_threshold(contrast)
+        ocr_ready = preprocess_for_ocr(raw)
+
+        cases = [
+            (f"{name}/grayscale", lambda raw=raw: grayscale(raw)),
+            (f"{name}/median_denoise", lambda gray=gray: median_denoise(gray)),
+            (f"{name}/enhance_contrast", lambda denoised=denoised: enhance_contrast(denoised)),
+            (f"{name}/adaptive_threshold", lambda contrast=contrast: adaptive_threshold(contrast)),
+            (f"{name}/estimate_skew_angle", lambda binary=binary: estimate_skew_angle(binary)),
+            (f"{name}/deskew", lambda binary=binary: deskew(binary)),
+            (f"{name}/resize_to_ocr", lambda binary=binary: resize_to_ocr(binary)),
+            (f"{name}/preprocess_for_ocr", lambda raw=raw: preprocess_for_ocr(raw)),
+            (f"{name}/preprocess_early_resize",
+             lambda raw=raw: preprocess_for_ocr(raw, resize_after="grayscale")),
+            (f"{name}/quality_score", lambda img=ocr_ready: compute_quality_score(img)),
+            (f"{name}/quality_score_fast", lambda img=ocr_ready: compute_quality_score(img, fast=True)),
+        ]
+
+        if name in LARGE_PAGES:
+            cases.append((f"{name}/preprocess_tiled", lambda raw=raw: preprocess_tiled(raw)))
+
+        if name in PDF_PAGES:
+            data = pdf_bytes(raw)
+            cases.append((f"{name}/pdf_to_images", lambda data=data: pdf_to_images(data)))
+            # Rendering path as the OCR loader uses it: grayscale, at the OCR width
+            cases.append((f"{name}/pdf_render_ocr_width", lambda data=data: pdf_to_images(
+                data, extract_embedded=False, target_width=2480, grayscale=True
+            )))
+
+        yield from cases
+
+
+def measure(func: Callable[[], object], repeats: int) -> Dict[str, float]:
+    # Peak memory from a separate run, so tracing does not slow the timed ones
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return {"seconds": round(best, 5), "peak_bytes": peak}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            time_tolerance: float, memory_tolerance: float) -> List[str]:
+    """
+    Human-readable regressions of `results` against `baseline`.
+    Cases missing from either side are ignored.
+    """
+    regressions = []
+
+    for case, result in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+
+        if (result["seconds"] >= MIN_COMPARABLE_SECONDS
+                and result["seconds"] > base["seconds"] * (1 + time_tolerance)):
+            regressions.append(
+                f"{case}: {result['seconds'] * 1000:.1f} ms vs baseline "
+                f"{base['seconds'] * 1000:.1f} ms (+{time_tolerance:.0%} allowed)"
+            )
+
+        if (result["peak_bytes"] >= MIN_COMPARABLE_BYTES
+                and result["peak_bytes"] > base["peak_bytes"] * (1 + memory_tolerance)):
+            regressions.append(
+                f"{case}: peak {result['peak_bytes'] / 2**20:.1f} MiB vs baseline "
+                f"{base['peak_bytes'] / 2**20:.1f} MiB (+{memory_tolerance:.0%} allowed)"
+            )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--quick", action="store_true", help="skip the A3 600 DPI page")
+    parser.add_argument("-k", dest="pattern", help="only run cases containing this substring")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+
+    results = {}
+    print(f"{'case':<44}{'ms':>10}{'base ms':>10}{'peak MiB':>10}{'base MiB':>10}")
+
+    for case, func in build_cases(args.quick):
+        if args.pattern and args.pattern not in case:
+            continue
+
+        result = results[case] = measure(func, args.repeats)
+        base = baseline.get(case, {})
+        base_ms = f"{base['seconds'] * 1000:.1f}" if base else "-"
+        base_mib = f"{base['peak_bytes'] / 2**20:.1f}" if base else "-"
+        print(f"{case:<44}{result['seconds'] * 1000:>10.1f}{base_ms:>10}"
+              f"{result['peak_bytes'] / 2**20:>10.1f}{base_mib:>10}")
+
+    if args.update:
+        # Keep baseline entries for cases that were filtered out of this run
+        merged = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "opencv": cv2.__version__,
+                "numpy": np.__version__,
+                "cpu_count": os.cpu_count(),
+                "cases": dict(sorted(merged.items())),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("\nNo baseline to compare against; run with --update first")
+        return 0
+
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
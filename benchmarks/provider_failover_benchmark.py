@@ -0,0 +1,106 @@
+"""
+Job throughput and success rate through the provider router while one of
+three local stand-in providers (api.ocr.fake) is slow, erroring or down,
+against sending everything to that one provider.
+
+Each job is submitted, polled until terminal and fetched; a call that
+fails fails the job, as in process_document_async.
+
+    python benchmarks/provider_failover_benchmark.py --jobs 300 --concurrency 30
+"""
+
+import argparse, asyncio, os, sys, time
+from collections import Counter
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(project_root)
+
+from api.ocr.fake import AsyncFakeOCRProvider, FakeOCRBackend
+from api.ocr.registry import AsyncRoutedOCRProvider, ProviderRegistry
+from api.v1.schemas.base import OCRAction, OCRDocument, OCRRequest, OCRStatus
+
+QUEUE_LATENCY = 0.2
+CALL_LATENCY = 0.02
+POLL_SECONDS = 0.05
+# Short enough for the breaker to cycle within one run
+OPEN_SECONDS = 2.0
+
+# Degradations of the third provider: backend and provider settings
+DEGRADATIONS = {
+    "slow": ({}, {"call_latency": 0.5}),
+    "erroring": ({"error_rate": 0.3}, {}),
+    "down": ({"error_rate": 1.0}, {}),
+}
+
+
+def stand_in(name: str, seed: int, backend_options: dict = None, provider_options: dict = None):
+    backend = FakeOCRBackend(queue_latency=QUEUE_LATENCY, seed=seed, **(backend_options or {}))
+    options = {"call_latency": CALL_LATENCY, **(provider_options or {})}
+    return AsyncFakeOCRProvider(backend, name=name, **options)
+
+
+async def run_job(provider, document: OCRDocument, request: OCRRequest) -> str:
+    job = await provider.submit(document, request)
+    while True:
+        await asyncio.sleep(POLL_SECONDS)
+        status = await provider.get_status(job)
+        if status == OCRStatus.FAILED:
+            raise RuntimeError("job failed")
+        if status == OCRStatus.PROCESSED:
+            break
+    await provider.fetch_result(job)
+    return job.provider
+
+
+async def measure(provider, jobs: int, concurrency: int) -> dict:
+    document = OCRDocument("page.png", data=b"\x00" * 1024)
+    request = OCRRequest(action=OCRAction.TRANSCRIBE)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one() -> str:
+        async with slots:
+            try:
+                return await run_job(provider, document, request)
+            except Exception:
+                return "failed"
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(one() for _ in range(jobs)))
+    elapsed = time.perf_counter() - start
+
+    done = Counter(outcomes)
+    failed = done.pop("failed", 0)
+    return {
+        "jobs_per_second": (jobs - failed) / elapsed,
+        "success": 1 - failed / jobs,
+        "served": dict(done),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--jobs", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'degradation':<12}{'setup':<10}{'jobs/s':>8}{'success':>9}  served by / circuits")
+    for degradation, (backend_options, provider_options) in DEGRADATIONS.items():
+        single = stand_in("c", 2, backend_options, provider_options)
+        stats = await measure(single, args.jobs, args.concurrency)
+        print(f"{degradation:<12}{'single':<10}{stats['jobs_per_second']:>8.1f}{stats['success']:>9.1%}")
+
+        registry = ProviderRegistry(open_seconds=OPEN_SECONDS, seed=0)
+        router = AsyncRoutedOCRProvider(
+            [stand_in("a", 0), stand_in("b", 1), stand_in("c", 2, backend_options, provider_options)],
+            registry,
+        )
+        stats = await measure(router, args.jobs, args.concurrency)
+        circuits = {name: health["state"] for name, health in registry.stats().items()}
+        print(
+            f"{'':<12}{'routed':<10}{stats['jobs_per_second']:>8.1f}{stats['success']:>9.1%}"
+            f"  {stats['served']} {circuits}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
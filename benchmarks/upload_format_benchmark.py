@@ -0,0 +1,84 @@
+"""
+Encode time vs upload size for the upload formats in
+api.utils.upload_formats, against submitting the original file.
+
+Uses the sample pages in tests/ plus a synthetic colour A4 scan at 300 DPI
+(saved as JPEG, as phones and scanners typically deliver).
+
+    python benchmarks/upload_format_benchmark.py
+"""
+
+import os, sys, tempfile, time
+import numpy as np
+import cv2
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(project_root)
+
+# process_documents pulls in the DB layer; no connection is ever opened here
+os.environ.setdefault("DB_TYPE", "sqlite")
+
+from api.utils.process_documents import preprocess_document
+from api.utils.upload_formats import encode_pages
+
+FORMATS = ["tiff_g4", "pdf"]
+REPEATS = 3
+
+
+def synthetic_scan(path: str) -> str:
+    """
+    Colour A4 page with lines of text, paper texture and sensor noise.
+    """
+    rng = np.random.default_rng(0)
+    page = np.full((3508, 2480, 3), (232, 238, 242), np.uint8)
+
+    for i in range(55):
+        y = 180 + i * 58
+        cv2.putText(page, "The quick brown fox jumps over the lazy dog 0123",
+                    (160, y), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (90, 40, 30), 3)
+
+    noise = rng.normal(0, 6, page.shape)
+    page = np.clip(page + noise, 0, 255).astype(np.uint8)
+
+    cv2.imwrite(path, page, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return path
+
+
+def measure(path: str) -> list:
+    pages = preprocess_document(path)
+    rows = [("original", 0.0, os.path.getsize(path))]
+
+    # Lossless per-page PNGs, as step 4 used to write
+    start = time.perf_counter()
+    png_bytes = sum(len(cv2.imencode(".png", p)[1]) for p in pages)
+    rows.append(("png (per page)", time.perf_counter() - start, png_bytes))
+
+    for fmt in FORMATS:
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            _, data = encode_pages(pages, fmt)
+            best = min(best, time.perf_counter() - start)
+        rows.append((fmt, best, len(data)))
+
+    return rows
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        inputs = [
+            os.path.join(project_root, "tests", "test_image.png"),
+            os.path.join(project_root, "tests", "test_doc.pdf"),
+            synthetic_scan(os.path.join(tmpdir, "a4_scan.jpg")),
+        ]
+
+        print(f"{'input':<16}{'format':<16}{'encode ms':>10}{'bytes':>12}{'vs original':>13}")
+        for path in inputs:
+            rows = measure(path)
+            original = rows[0][2]
+            for fmt, seconds, size in rows:
+                print(f"{os.path.basename(path):<16}{fmt:<16}{seconds * 1000:>10.1f}{size:>12,}{size / original:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
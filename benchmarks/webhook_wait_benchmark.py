@@ -0,0 +1,73 @@
+"""
+End-to-end process_document_async runs against the in-process fake
+provider, waiting for each job by polling or by its webhook callback.
+
+In webhook mode the fake completes the job waiter (api.ocr.webhooks) when
+the job finishes, as the callback route does, so the Future hand-off and
+the fallback polling around it run exactly as in production.
+
+    python benchmarks/webhook_wait_benchmark.py --documents 20 --queue-latency 1.5
+"""
+
+import argparse, asyncio, os, sys, time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(project_root)
+
+# Webhooks are only requested when a callback URL and signing secret are
+# configured; the fake never calls it, it resolves the waiters directly
+os.environ.setdefault("OCR_WEBHOOK_BASE_URL", "http://localhost:7001")
+os.environ.setdefault("OCR_WEBHOOK_SECRET", "benchmark")
+os.environ.setdefault("DB_TYPE", "sqlite")
+
+from api.ocr.fake import AsyncFakeOCRProvider, FakeOCRBackend
+from api.ocr.webhooks import job_waiters
+from api.utils.metrics import sample
+from api.utils.process_documents import process_document_async
+from api.v1.schemas.base import OCRAction, OCRDocument, OCRRequest
+
+
+async def measure(documents: int, queue_latency: float, webhooks: bool) -> dict:
+    provider = AsyncFakeOCRProvider(
+        FakeOCRBackend(queue_latency=queue_latency, seed=0), call_latency=0.01,
+        name="webhook" if webhooks else "polling", webhooks=webhooks,
+    )
+    data = open(os.path.join(project_root, "tests", "test_image.png"), "rb").read()
+    request = OCRRequest(action=OCRAction.TRANSCRIBE, upload_format="original")
+
+    async def one(i: int) -> float:
+        start = time.perf_counter()
+        result = await process_document_async(
+            OCRDocument(f"page-{i}.png", data=data), request, provider, use_cache=False
+        )
+        assert result.pages, "no pages in result"
+        return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(one(i) for i in range(documents)))
+    return {
+        "mean_seconds": sum(latencies) / len(latencies),
+        "max_seconds": max(latencies),
+        "status_calls": int(sample(
+            "questscan_provider_call_seconds_count", provider=provider.name, call="status"
+        )),
+        "waiters_left": len(job_waiters),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--queue-latency", type=float, default=1.5)
+    args = parser.parse_args()
+
+    print(f"{'wait by':<10}{'mean s':>8}{'max s':>8}{'status calls':>14}{'waiters left':>14}")
+    for webhooks in (False, True):
+        stats = await measure(args.documents, args.queue_latency, webhooks)
+        print(
+            f"{'webhook' if webhooks else 'polling':<10}{stats['mean_seconds']:>8.2f}"
+            f"{stats['max_seconds']:>8.2f}{stats['status_calls']:>14}{stats['waiters_left']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,23 @@
 import uvicorn
 from contextlib import asynccontextmanager
 from typing import Union
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from api.db.database import create_database
 from api.v1.routes import api_version_one
+from api.v1.schemas.base import create_http_client
+from api.utils import metrics
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_database()
+    # One pooled, keep-alive client shared by every request
+    app.state.http_client = create_http_client()
     yield
     ## write shutdown logic below yield
+    await app.state.http_client.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -46,5 +51,10 @@ async def get_root(request: Request) -> dict:
     }
 
 
+@app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", port=7001, reload=True)
@@ -0,0 +1,9 @@
+import os, tempfile
+
+# Settings read at import time; the suite never touches a real database
+# or OCR provider
+os.environ.setdefault("DB_TYPE", "sqlite")
+os.environ.setdefault("DB_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'questscan-tests.db')}")
+os.environ.setdefault("OCR_PROVIDER", "fake")
+os.environ.setdefault("OCR_CACHE_ENABLED", "false")
+os.environ.setdefault("FAKE_OCR_QUEUE_LATENCY_SECONDS", "0")
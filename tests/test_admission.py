@@ -0,0 +1,187 @@
+import asyncio, os, threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.utils import process_documents
+from api.utils.admission import ADMISSION_RETRY_AFTER_SECONDS, AdmissionRejected, MemoryBudget
+from api.v1.routes.scanner import scan_docs
+
+TEST_IMAGE = os.path.join(os.path.dirname(__file__), "test_image.png")
+
+
+def _budget(budget_bytes: int = 100, max_waiting: int = 8) -> MemoryBudget:
+    return MemoryBudget(budget_bytes=budget_bytes, max_waiting=max_waiting, held=lambda: 0)
+
+
+async def _settle():
+    # Let queued tasks run up to their next await
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_in_fifo_order():
+    budget = _budget()
+    admitted = []
+
+    async def document(name, nbytes, done):
+        async with budget.reserve_async(nbytes):
+            admitted.append(name)
+            await done.wait()
+
+    async def main():
+        first, large, small = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        tasks = [asyncio.create_task(document("first", 60, first))]
+        await _settle()
+        # "small" would fit beside "first", but queues behind "large"
+        tasks.append(asyncio.create_task(document("large", 50, large)))
+        await _settle()
+        tasks.append(asyncio.create_task(document("small", 10, small)))
+        await _settle()
+        assert admitted == ["first"]
+        assert budget.waiting == 2
+
+        first.set()
+        await _settle()
+        assert admitted == ["first", "large", "small"]
+        assert budget.used_bytes == 60
+
+        large.set()
+        small.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert budget.used_bytes == 0
+    assert budget.waiting == 0
+
+
+def test_queue_full_is_rejected_at_once():
+    budget = _budget(max_waiting=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            async with budget.reserve_async(100):
+                await release.wait()
+
+        async def queued():
+            async with budget.reserve_async(10):
+                pass
+
+        tasks = [asyncio.create_task(hold())]
+        await _settle()
+        tasks.append(asyncio.create_task(queued()))
+        await _settle()
+
+        with pytest.raises(AdmissionRejected):
+            async with budget.reserve_async(10, timeout=60):
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert budget.used_bytes == 0
+
+
+def test_timed_out_waiter_leaves_the_queue():
+    budget = _budget()
+
+    with budget.reserve(100):
+        with pytest.raises(AdmissionRejected):
+            with budget.reserve(10, timeout=0.05):
+                pass
+        assert budget.waiting == 0
+
+    assert budget.used_bytes == 0
+
+
+def test_oversized_document_runs_alone():
+    budget = _budget()
+    admitted = []
+
+    async def document(name, nbytes, done):
+        async with budget.reserve_async(nbytes):
+            admitted.append(name)
+            await done.wait()
+
+    async def main():
+        small, huge, after = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        tasks = [asyncio.create_task(document("small", 10, small))]
+        await _settle()
+        tasks.append(asyncio.create_task(document("huge", 500, huge)))
+        await _settle()
+        tasks.append(asyncio.create_task(document("after", 10, after)))
+        await _settle()
+        # The oversized document waits for the budget to drain...
+        assert admitted == ["small"]
+
+        small.set()
+        await _settle()
+        # ...then holds it alone, everything behind it queued
+        assert admitted == ["small", "huge"]
+        assert budget.used_bytes == 500
+
+        huge.set()
+        await _settle()
+        assert admitted == ["small", "huge", "after"]
+
+        after.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert budget.used_bytes == 0
+
+
+def test_sync_and_async_callers_share_the_budget():
+    budget = _budget()
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with budget.reserve(100):
+            holding.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    holding.wait()
+
+    async def main():
+        admitted = asyncio.Event()
+
+        async def document():
+            async with budget.reserve_async(10):
+                admitted.set()
+                assert budget.used_bytes == 10
+
+        waiting = asyncio.create_task(document())
+        await _settle()
+        assert not admitted.is_set()
+        assert budget.waiting == 1
+
+        # Released from the other thread, the grant wakes this loop
+        release.set()
+        await asyncio.wait_for(waiting, timeout=5)
+        assert admitted.is_set()
+
+    asyncio.run(main())
+    thread.join()
+
+
+def test_scanner_process_answers_429_with_retry_after(monkeypatch):
+    budget = MemoryBudget(budget_bytes=1, max_waiting=0, held=lambda: 0)
+    monkeypatch.setattr(process_documents, "memory_budget", budget)
+
+    app = FastAPI()
+    app.include_router(scan_docs)
+    app.state.http_client = None
+
+    with budget.reserve(1), open(TEST_IMAGE, "rb") as f:
+        response = TestClient(app).post(
+            "/scanner/process", files={"file": ("page.png", f, "image/png")}
+        )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(ADMISSION_RETRY_AFTER_SECONDS)
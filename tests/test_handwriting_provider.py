@@ -0,0 +1,45 @@
+import asyncio, os, tracemalloc
+
+import httpx
+
+from api.v1.schemas.base import AsyncHandwritingOCRProvider, OCRAction, OCRDocument, OCRRequest
+
+UPLOAD_BYTES = 16 * 1024 * 1024
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """
+    Consumes the request body chunk by chunk, as a socket would.
+    """
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for chunk in request.stream:
+            self.received += len(chunk)
+        return httpx.Response(201, json={"id": "doc-1"})
+
+
+def test_submit_streams_files_from_disk(tmp_path):
+    path = tmp_path / "large.png"
+    path.write_bytes(os.urandom(UPLOAD_BYTES))
+    transport = _CountingTransport()
+
+    async def submit():
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AsyncHandwritingOCRProvider(client, api_key="key")
+            return await provider.submit(
+                OCRDocument("large.png", path=str(path)), OCRRequest(action=OCRAction.TRANSCRIBE)
+            )
+
+    tracemalloc.start()
+    try:
+        job = asyncio.run(submit())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert job.provider_job_id == "doc-1"
+    assert transport.received > UPLOAD_BYTES
+    assert peak < UPLOAD_BYTES / 4
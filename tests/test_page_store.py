@@ -0,0 +1,86 @@
+import importlib, os
+
+import numpy as np
+import pytest
+
+from api.utils import page_store
+from api.utils.page_store import PageStore
+
+
+def _pages():
+    rng = np.random.default_rng(0)
+    return [
+        rng.integers(0, 256, (120, 80), dtype=np.uint8),
+        rng.integers(0, 256, (60, 90, 3), dtype=np.uint8),
+        np.zeros((1, 1), dtype=np.uint8),
+    ]
+
+
+@pytest.mark.parametrize("spill", [True, False])
+def test_pages_read_back_equal(tmp_path, spill):
+    pages = _pages()
+
+    with PageStore(root=str(tmp_path), spill=spill) as store:
+        for page in pages:
+            store.append(page)
+
+        assert len(store) == len(pages)
+        assert store.nbytes == sum(page.nbytes for page in pages)
+        for stored, page in zip(store, pages):
+            assert stored.shape == page.shape and stored.dtype == page.dtype
+            assert np.array_equal(stored, page)
+        assert np.array_equal(store[1], pages[1])
+
+
+def test_spilled_pages_are_memory_mapped(tmp_path):
+    with PageStore(root=str(tmp_path), spill=True) as store:
+        store.append(_pages()[0])
+
+        assert isinstance(store[0], np.memmap)
+        assert not store[0].flags.writeable
+
+
+def test_close_deletes_the_job_directory(tmp_path):
+    store = PageStore(root=str(tmp_path), spill=True)
+    store.append(_pages()[0])
+
+    (job_dir,) = os.listdir(tmp_path)
+    assert os.listdir(tmp_path / job_dir) == ["page-00000.npy"]
+
+    store.close()
+
+    assert os.listdir(tmp_path) == []
+    assert len(store) == 0
+
+
+def test_empty_store_creates_no_directory(tmp_path):
+    with PageStore(root=str(tmp_path / "pages"), spill=True):
+        pass
+
+    assert not os.path.exists(tmp_path / "pages")
+
+
+def test_list_fallback_writes_nothing(tmp_path):
+    with PageStore(root=str(tmp_path), spill=False) as store:
+        page = _pages()[0]
+        store.append(page)
+
+        # Pages are kept as given
+        assert store[0] is page
+        assert os.listdir(tmp_path) == []
+
+
+def test_page_store_disabled_by_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("PAGE_STORE_ENABLED", "0")
+    monkeypatch.setenv("PAGE_STORE_DIR", str(tmp_path))
+    try:
+        reloaded = importlib.reload(page_store)
+
+        assert reloaded.PAGE_STORE_ENABLED is False
+        with reloaded.PageStore() as store:
+            store.append(_pages()[0])
+            assert not store.spill
+        assert os.listdir(tmp_path) == []
+    finally:
+        monkeypatch.undo()
+        importlib.reload(page_store)
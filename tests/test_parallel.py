@@ -0,0 +1,43 @@
+import os
+
+from api.utils.metrics import PREPROCESS_RETRIES, recording, replay, sample
+from api.utils.parallel import map_ordered, get_executor
+from api.utils.process_documents import preprocess_document
+from api.utils.profile_predictor import profile_predictor
+
+TEST_PDF = os.path.join(os.path.dirname(__file__), "test_doc.pdf")
+
+
+def _square(x):
+    return x * x
+
+
+def test_map_ordered_keeps_input_order():
+    executor = get_executor("thread", 4)
+    assert list(map_ordered(_square, range(20), executor, window=3)) == [x * x for x in range(20)]
+    assert list(map_ordered(_square, range(5), None, window=1)) == [0, 1, 4, 9, 16]
+
+
+def test_recorded_updates_replay():
+    name = "questscan_preprocess_retries_total"
+    before = sample(name, profile="recorded")
+
+    with recording() as updates:
+        PREPROCESS_RETRIES.labels(profile="recorded").inc(2)
+    PREPROCESS_RETRIES.labels(profile="recorded").inc()
+
+    assert updates == [("questscan_preprocess_retries", ("recorded",), "inc", 2)]
+    replay(updates)
+    assert sample(name, profile="recorded") - before == 5
+
+
+def test_process_mode_records_in_parent():
+    pages_before = profile_predictor.stats()["pages"]
+    observed_before = sample("questscan_page_megapixels_count")
+    resized_before = sample("questscan_preprocess_stage_seconds_count", stage="resize")
+
+    pages = preprocess_document(TEST_PDF, executor="process", workers=2)
+
+    assert profile_predictor.stats()["pages"] - pages_before == len(pages)
+    assert sample("questscan_page_megapixels_count") - observed_before == len(pages)
+    assert sample("questscan_preprocess_stage_seconds_count", stage="resize") > resized_before
@@ -0,0 +1,82 @@
+import numpy as np
+
+from api.preprocessing.preprocessing_profiles import PREPROCESSING_PROFILES
+from api.utils.pipeline import PipelineContext, PipelineContextPool, PreprocessingPipeline, preprocess_for_ocr
+
+
+def _page(seed: int, shape=(600, 480)) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    page = np.full(shape + (3,), 230, dtype=np.uint8)
+    # Dark strokes on a light background
+    for _ in range(200):
+        y, x = rng.integers(0, shape[0] - 8), rng.integers(0, shape[1] - 40)
+        page[y:y + 3, x:x + 30] = 40
+    return page
+
+
+def test_pool_reuses_idle_context():
+    pool = PipelineContextPool(max_idle=1)
+
+    with pool.acquire() as first:
+        PreprocessingPipeline(_page(0), first).run()
+    held = pool.idle_bytes
+
+    with pool.acquire() as second:
+        assert second is first
+        # The idle context is not counted while it is in use
+        assert pool.idle_bytes == 0
+
+    assert held > 0 and pool.idle_bytes == held
+
+
+def test_pool_drops_buffers_over_the_idle_cap():
+    pool = PipelineContextPool(max_idle=2, max_idle_bytes=1024 * 1024)
+
+    with pool.acquire() as context:
+        PreprocessingPipeline(_page(0, shape=(1200, 960)), context).run()
+        assert context.nbytes > pool.max_idle_bytes
+
+    # The context is kept for its CLAHE instances, without its buffers
+    assert pool.idle_bytes == 0
+    with pool.acquire() as again:
+        assert again is context
+        assert again.nbytes == 0 and again.owner is None
+
+
+def test_pool_keeps_at_most_max_idle_contexts():
+    pool = PipelineContextPool(max_idle=1)
+
+    with pool.acquire() as a, pool.acquire() as b:
+        assert a is not b
+        PreprocessingPipeline(_page(0), a).run()
+        PreprocessingPipeline(_page(1), b).run()
+
+    # b went back first; a found the pool full
+    assert pool.idle_bytes == b.nbytes
+    with pool.acquire() as c, pool.acquire() as d:
+        assert c is b and d is not a
+
+
+def test_stage_cache_reuses_shared_prefix():
+    pipeline = PreprocessingPipeline(_page(0))
+    pipeline.run(**PREPROCESSING_PROFILES[0])
+    # Same denoise and CLAHE parameters, another threshold
+    pipeline.run(**{**PREPROCESSING_PROFILES[0], "threshold_C": 5})
+
+    assert pipeline.stats["denoise"] == {"hits": 1, "misses": 1}
+    assert pipeline.stats["contrast"] == {"hits": 1, "misses": 1}
+    assert pipeline.stats["threshold"] == {"hits": 0, "misses": 2}
+
+
+def test_stage_cache_dropped_after_another_pipeline_uses_the_context():
+    context = PipelineContext()
+    first = PreprocessingPipeline(_page(0), context)
+    first.run()
+
+    # Overwrites the shared stage buffers first's cache points into
+    PreprocessingPipeline(_page(1), context).run()
+
+    result = first.run()
+
+    assert first.stats["denoise"] == {"hits": 0, "misses": 2}
+    assert np.array_equal(result, preprocess_for_ocr(_page(0)))
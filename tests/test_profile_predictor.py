@@ -0,0 +1,136 @@
+import numpy as np
+
+from api.utils import process_documents
+from api.utils.process_documents import _preprocess_planned
+from api.utils.profile_predictor import (
+    FUTILE_EXPLORE_EVERY,
+    FUTILE_MIN_ATTEMPTS,
+    ProfilePredictor,
+    skipped_retries,
+)
+
+BUCKET = "contrast1-noise0-brightness2"
+
+
+def _teach(predictor, outcomes, pages):
+    # `outcomes` is the (profile, passed) sequence every page produces
+    for _ in range(pages):
+        predictor.record(BUCKET, outcomes)
+
+
+def test_order_keeps_configured_order_without_outcomes():
+    assert ProfilePredictor(n_profiles=3, log_path=None).order(BUCKET) == [0, 1, 2]
+
+
+def test_order_prefers_the_profile_that_passes():
+    predictor = ProfilePredictor(n_profiles=3, log_path=None)
+    _teach(predictor, [(0, False), (1, False), (2, True)], pages=5)
+
+    assert predictor.order(BUCKET)[0] == 2
+    # Other buckets are unaffected
+    assert predictor.order("contrast0-noise0-brightness0") == [0, 1, 2]
+
+
+def test_disabled_predictor_keeps_configured_order():
+    predictor = ProfilePredictor(n_profiles=3, log_path=None, enabled=False)
+    _teach(predictor, [(0, False), (1, False), (2, True)], pages=5)
+
+    assert predictor.order(BUCKET) == [0, 1, 2]
+    assert predictor.worth_trying(BUCKET, [0])
+
+
+def test_worth_trying_needs_enough_failures():
+    predictor = ProfilePredictor(n_profiles=3, log_path=None)
+    _teach(predictor, [(0, True), (1, False)], pages=FUTILE_MIN_ATTEMPTS - 1)
+    # Pages that never try profile 1 move past the exploration page
+    _teach(predictor, [(0, True)], pages=2)
+
+    assert predictor.worth_trying(BUCKET, [1])
+
+    _teach(predictor, [(0, True), (1, False)], pages=1)
+    assert not predictor.worth_trying(BUCKET, [1])
+    assert predictor.worth_trying(BUCKET, [0])
+    assert predictor.worth_trying(BUCKET, [1, 2])
+
+
+def test_worth_trying_explores_every_nth_page():
+    predictor = ProfilePredictor(n_profiles=3, log_path=None)
+    _teach(predictor, [(0, True), (1, False)], pages=FUTILE_EXPLORE_EVERY * 2)
+
+    assert predictor.worth_trying(BUCKET, [1])
+    predictor.record(BUCKET, [(0, True)])
+    assert not predictor.worth_trying(BUCKET, [1])
+
+
+def test_outcome_log_is_replayed(tmp_path):
+    log = str(tmp_path / "outcomes.jsonl")
+    predictor = ProfilePredictor(n_profiles=3, log_path=log)
+    _teach(predictor, [(0, False), (1, True)], pages=3)
+
+    replayed = ProfilePredictor(n_profiles=3, log_path=log)
+
+    assert replayed.stats()["buckets"] == predictor.stats()["buckets"]
+    # Untried profiles keep the prior, ahead of a failing one
+    assert replayed.order(BUCKET) == [1, 2, 0]
+
+
+def test_skipped_retries():
+    assert skipped_retries([0, 1], 1, 3) == 0
+    assert skipped_retries([2], 2, 3) == 2
+    assert skipped_retries([0, 2], None, 3) == 1
+
+
+def _fake_profiles(monkeypatch, statuses):
+    """
+    Pipeline stand-in whose output for profile i is a page filled with i,
+    scored statuses[i].
+    """
+    profiles = [{"threshold_C": i} for i in range(len(statuses))]
+    monkeypatch.setattr(process_documents, "PREPROCESSING_PROFILES", profiles)
+
+    class Pipeline:
+        def __init__(self, image, context=None):
+            self.stats = {}
+
+        def run(self, threshold_C):
+            return np.full((8, 8), threshold_C, dtype=np.uint8)
+
+    def score(page, **kwargs):
+        status = statuses[int(page[0, 0])]
+        return {"status": status, "score": 0.0, "metrics": {}}
+
+    monkeypatch.setattr(process_documents, "PreprocessingPipeline", Pipeline)
+    monkeypatch.setattr(process_documents, "compute_quality_score", score)
+
+
+def test_last_profile_is_never_skipped(monkeypatch):
+    _fake_profiles(monkeypatch, ["warn", "warn", "warn"])
+    image = np.zeros((8, 8), dtype=np.uint8)
+
+    # Every retry predicted futile: only the last profile is still tried
+    page, quality, attempts = _preprocess_planned(image, BUCKET, [0, 1, 2], futile=[0, 1, 2])
+
+    assert [profile for profile, _ in attempts] == [0, 2]
+    # No profile passed: the last configured profile's page is returned
+    assert page[0, 0] == 2
+
+
+def test_rejected_page_gets_every_profile(monkeypatch):
+    _fake_profiles(monkeypatch, ["fail", "fail", "fail"])
+    image = np.zeros((8, 8), dtype=np.uint8)
+
+    _, quality, attempts = _preprocess_planned(image, BUCKET, [2, 0, 1], futile=[0, 1, 2])
+
+    assert [profile for profile, _ in attempts] == [2, 0, 1]
+    assert quality["status"] == "fail"
+
+
+def test_first_passing_profile_in_predicted_order_is_returned(monkeypatch):
+    _fake_profiles(monkeypatch, ["pass", "warn", "pass"])
+    image = np.zeros((8, 8), dtype=np.uint8)
+
+    page, quality, attempts = _preprocess_planned(image, BUCKET, [2, 1, 0], futile=[])
+
+    assert attempts == [(2, True)]
+    assert page[0, 0] == 2
+    assert quality["profiles"]["retries_skipped"] == 2
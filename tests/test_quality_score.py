@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+from api.preprocessing.preprocessing_profiles import PREPROCESSING_PROFILES
+from api.quality.quality_score import compute_quality_score
+from api.utils.pipeline import PreprocessingPipeline
+from api.utils.process_documents import _load_images
+
+TESTS_DIR = os.path.dirname(__file__)
+# A4 at the OCR target width
+A4 = (3508, 2480)
+
+
+def _sample_pages():
+    pages = []
+    for name in ("test_image.png", "test_doc.pdf"):
+        for image in _load_images(os.path.join(TESTS_DIR, name)):
+            for profile in PREPROCESSING_PROFILES:
+                pages.append(PreprocessingPipeline(image).run(**profile))
+    return pages
+
+
+SAMPLE_PAGES = _sample_pages()
+
+
+def test_blank_page_fails_in_fast_mode():
+    blank = np.full(A4, 255, dtype=np.uint8)
+
+    full = compute_quality_score(blank)
+    fast = compute_quality_score(blank, fast=True)
+
+    assert fast["mode"] == "sampled"
+    assert full["status"] == fast["status"] == "fail"
+    assert fast["metrics"]["component_count"] == full["metrics"]["component_count"] == 1
+
+
+@pytest.mark.parametrize("page", range(len(SAMPLE_PAGES)))
+def test_fast_mode_agrees_with_full_mode(page):
+    binary = SAMPLE_PAGES[page]
+
+    full = compute_quality_score(binary)
+    fast = compute_quality_score(binary, fast=True)
+
+    assert fast["status"] == full["status"]
+    assert fast["metrics"]["component_count"] == pytest.approx(
+        full["metrics"]["component_count"], rel=0.5
+    )
+
+
+def test_blank_page_fails_when_tiled():
+    blank = np.full(A4, 255, dtype=np.uint8)
+
+    tiled = compute_quality_score(blank, tiled=True)
+
+    assert tiled["mode"] == "tiled"
+    assert tiled["status"] == "fail"
+    assert tiled["metrics"]["component_count"] == 1
+
+
+@pytest.mark.parametrize("page", range(len(SAMPLE_PAGES)))
+def test_tiled_mode_agrees_with_full_mode(page):
+    binary = SAMPLE_PAGES[page]
+
+    full = compute_quality_score(binary)
+    tiled = compute_quality_score(binary, tiled=True)
+
+    assert tiled["mode"] == "tiled"
+    assert tiled["status"] == full["status"]
+    assert tiled["metrics"]["component_count"] == pytest.approx(
+        full["metrics"]["component_count"], rel=0.1
+    )
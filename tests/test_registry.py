@@ -0,0 +1,128 @@
+import pytest
+
+from api.ocr.fake import FakeOCRBackend, FakeOCRProvider
+from api.ocr.providers import create_provider
+from api.ocr.registry import CLOSED, HALF_OPEN, OPEN, ProviderRegistry, RoutedOCRProvider
+from api.utils.metrics import sample
+from api.v1.schemas.base import OCRAction, OCRDocument, OCRRequest
+
+DOCUMENT = OCRDocument("page.png", data=b"\x00" * 1024)
+REQUEST = OCRRequest(action=OCRAction.TRANSCRIBE)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _provider(name: str, error_rate: float = 0.0) -> FakeOCRProvider:
+    backend = FakeOCRBackend(queue_latency=0, error_rate=error_rate, seed=0)
+    return FakeOCRProvider(backend, call_latency=0, name=name)
+
+
+def _registry(clock: Clock, **options) -> ProviderRegistry:
+    options = {"failure_threshold": 2, "open_seconds": 30, "seed": 0, **options}
+    return ProviderRegistry(clock=clock, **options)
+
+
+def test_failed_submission_fails_over_to_the_next_candidate():
+    registry = _registry(Clock(), failure_threshold=100)
+    router = RoutedOCRProvider([_provider("reg-down", error_rate=1.0), _provider("reg-up")], registry)
+
+    jobs = [router.submit(DOCUMENT, REQUEST) for _ in range(20)]
+
+    assert {job.provider for job in jobs} == {"reg-up"}
+    # Some submissions tried the broken provider first and moved on
+    failovers = sample("questscan_provider_failovers_total", provider="reg-down")
+    assert failovers == registry.health("reg-down").consecutive_failures > 0
+
+
+def test_candidates_follow_submit_latency():
+    registry = _registry(Clock())
+    fast, slow = _provider("reg-fast"), _provider("reg-slow")
+    for _ in range(10):
+        registry.health("reg-fast").record(0.01, ok=True)
+        registry.health("reg-slow").record(1.0, ok=True)
+        # Polls carry no upload and do not steer routing
+        registry.health("reg-fast").record(5.0, ok=True, call="status")
+
+    firsts = [registry.candidates([slow, fast], REQUEST)[0].name for _ in range(200)]
+
+    assert firsts.count("reg-fast") > 180
+    assert registry.health("reg-fast").poll_latency > registry.health("reg-fast").submit_latency
+
+
+def test_circuit_opens_after_consecutive_failures():
+    registry = _registry(Clock())
+    down = _provider("reg-open", error_rate=1.0)
+    router = RoutedOCRProvider([down], registry)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="All OCR providers failed"):
+            router.submit(DOCUMENT, REQUEST)
+
+    assert registry.health("reg-open").state == OPEN
+    # An open circuit refuses new jobs without calling the provider
+    with pytest.raises(RuntimeError, match="every circuit is open"):
+        router.submit(DOCUMENT, REQUEST)
+    assert registry.health("reg-open").consecutive_failures == 2
+
+
+def test_half_open_trial_closes_or_reopens_the_circuit():
+    clock = Clock()
+    registry = _registry(clock)
+    down = _provider("reg-trial", error_rate=1.0)
+    router = RoutedOCRProvider([down], registry)
+    health = registry.health("reg-trial")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            router.submit(DOCUMENT, REQUEST)
+    assert health.state == OPEN
+
+    # A failed trial opens the circuit again
+    clock.now += 30
+    with pytest.raises(RuntimeError, match="All OCR providers failed"):
+        router.submit(DOCUMENT, REQUEST)
+    assert health.state == OPEN
+
+    # Only one trial is handed out while half-open
+    clock.now += 30
+    assert health.acquire()
+    assert health.state == HALF_OPEN
+    assert not health.acquire()
+    health.release()
+
+    # A successful trial closes it
+    down.backend.error_rate = 0.0
+    job = router.submit(DOCUMENT, REQUEST)
+    assert job.provider == "reg-trial"
+    assert health.state == CLOSED
+
+
+def test_named_instances_are_routed_with_their_own_settings(monkeypatch):
+    monkeypatch.setenv("HANDWRITING_OCR_API_KEY", "shared-key")
+    monkeypatch.setenv("HANDWRITING_OCR_API_URL_PRIMARY", "http://primary/api/v3/documents")
+    monkeypatch.setenv("HANDWRITING_OCR_API_KEY_BACKUP", "backup-key")
+
+    router = create_provider("handwritingocr:primary,handwritingocr:backup")
+
+    assert isinstance(router, RoutedOCRProvider)
+    primary = router.providers["handwritingocr:primary"]
+    backup = router.providers["handwritingocr:backup"]
+    assert (primary.api_url, primary.api_key) == ("http://primary/api/v3/documents", "shared-key")
+    assert backup.api_key == "backup-key"
+    assert backup.api_url != primary.api_url
+
+
+def test_fake_is_only_routed_with_fakes(monkeypatch):
+    monkeypatch.setenv("HANDWRITING_OCR_API_KEY", "shared-key")
+
+    router = create_provider("fake:a,fake:b")
+    assert sorted(router.providers) == ["fake:a", "fake:b"]
+
+    with pytest.raises(RuntimeError, match="cannot be routed"):
+        create_provider("fake,handwritingocr")
@@ -0,0 +1,38 @@
+import asyncio, os, uuid
+
+from api.db.database import create_database
+from api.ocr.fake import AsyncFakeOCRProvider, FakeOCRBackend
+from api.utils import process_documents
+from api.utils.process_documents import process_document_async
+from api.utils.result_cache import OCRResultCache, result_cache
+from api.v1.schemas.base import OCRAction, OCRDocument, OCRPageResult, OCRRequest, OCRResult
+
+TEST_IMAGE = os.path.join(os.path.dirname(__file__), "test_image.png")
+
+
+def test_cache_hit_is_marked_cached():
+    create_database()
+    cache = OCRResultCache(enabled=True)
+    key = uuid.uuid4().hex
+
+    cache.put(key, OCRResult(job_id="original-job", pages=[OCRPageResult(page_number=1, text="hi")]))
+    hit = cache.get(key)
+
+    assert hit.cached is True
+    assert hit.job_id == "original-job"
+    assert hit.to_dict()["cached"] is True
+
+
+def test_upload_is_not_hashed_while_cache_is_off(monkeypatch):
+    assert not result_cache.enabled
+
+    def hashed(*args):
+        raise AssertionError("cache_key called with the cache disabled")
+
+    monkeypatch.setattr(process_documents, "cache_key", hashed)
+    provider = AsyncFakeOCRProvider(FakeOCRBackend(queue_latency=0, seed=0), call_latency=0)
+    request = OCRRequest(action=OCRAction.TRANSCRIBE, upload_format="original")
+
+    result = asyncio.run(process_document_async(OCRDocument.coerce(TEST_IMAGE), request, provider))
+
+    assert result.cached is False
@@ -0,0 +1,94 @@
+import asyncio, json, os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.ocr import webhooks
+from api.ocr.fake import AsyncFakeOCRProvider, FakeOCRBackend
+from api.ocr.webhooks import OCR_WEBHOOK_SIGNATURE_HEADER, job_waiters, sign_callback
+from api.utils.metrics import sample
+from api.utils.process_documents import process_document_async
+from api.v1.routes.webhooks import ocr_webhooks
+from api.v1.schemas.base import OCRAction, OCRDocument, OCRRequest, OCRStatus
+
+TEST_IMAGE = os.path.join(os.path.dirname(__file__), "test_image.png")
+SECRET = "test-secret"
+
+
+def _enable_webhooks(monkeypatch):
+    monkeypatch.setattr(webhooks, "OCR_WEBHOOK_BASE_URL", "http://localhost:7001")
+    monkeypatch.setattr(webhooks, "OCR_WEBHOOK_SECRET", SECRET)
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(ocr_webhooks)
+    return TestClient(app)
+
+
+def test_no_webhook_url_without_secret(monkeypatch):
+    monkeypatch.setattr(webhooks, "OCR_WEBHOOK_BASE_URL", "http://localhost:7001")
+    monkeypatch.setattr(webhooks, "OCR_WEBHOOK_SECRET", None)
+    assert webhooks.webhook_url() is None
+
+
+def test_webhook_url_carries_no_secret(monkeypatch):
+    _enable_webhooks(monkeypatch)
+    assert webhooks.webhook_url() == "http://localhost:7001/api/v1/webhooks/ocr"
+
+
+def test_process_document_async_waits_on_fake_webhook(monkeypatch):
+    _enable_webhooks(monkeypatch)
+    provider = AsyncFakeOCRProvider(
+        FakeOCRBackend(queue_latency=0.2, seed=0), call_latency=0, name="webhook-test", webhooks=True
+    )
+    with open(TEST_IMAGE, "rb") as f:
+        document = OCRDocument("page.png", data=f.read())
+    request = OCRRequest(action=OCRAction.TRANSCRIBE, upload_format="original")
+
+    result = asyncio.run(process_document_async(document, request, provider, use_cache=False))
+
+    assert result.pages
+    assert sample("questscan_provider_call_seconds_count", provider="webhook-test", call="status") == 0
+    assert len(job_waiters) == 0
+
+
+def test_signed_callback_completes_waiter(monkeypatch):
+    _enable_webhooks(monkeypatch)
+    waiter = job_waiters.register("signed-job")
+    body = json.dumps({"id": "signed-job", "status": "processed"}).encode()
+
+    response = _client().post(
+        "/webhooks/ocr", content=body,
+        headers={OCR_WEBHOOK_SIGNATURE_HEADER: sign_callback(body, SECRET)},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["matched"] is True
+    assert waiter.result(timeout=0)[0] == OCRStatus.PROCESSED
+
+
+def test_forged_callback_is_rejected(monkeypatch):
+    _enable_webhooks(monkeypatch)
+    waiter = job_waiters.register("live-job")
+    body = json.dumps({"id": "live-job", "status": "failed"}).encode()
+
+    try:
+        client = _client()
+        assert client.post("/webhooks/ocr", content=body).status_code == 401
+        forged = {OCR_WEBHOOK_SIGNATURE_HEADER: sign_callback(body, "guessed")}
+        assert client.post("/webhooks/ocr", content=body, headers=forged).status_code == 401
+        assert not waiter.done()
+    finally:
+        job_waiters.discard("live-job")
+
+
+def test_callback_rejected_while_no_secret_is_configured(monkeypatch):
+    monkeypatch.setattr(webhooks, "OCR_WEBHOOK_SECRET", None)
+    body = json.dumps({"id": "any-job", "status": "failed"}).encode()
+
+    response = _client().post(
+        "/webhooks/ocr", content=body, headers={OCR_WEBHOOK_SIGNATURE_HEADER: sign_callback(body, "")}
+    )
+
+    assert response.status_code == 401